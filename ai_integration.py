@@ -1,7 +1,10 @@
 import os
 import google.generativeai as genai
 import asyncio
+import weakref
 from data_retrieval import get_current_crypto_price, get_current_stock_forex_price
+from conversation_store import conversation_store
+from response_cache import response_cache
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -44,84 +47,169 @@ tools_for_gemini = [
 
 model = genai.GenerativeModel('gemini-2.0-flash', tools=tools_for_gemini)
 
-conversation_histories = {}
+# Fungsi (coroutine) yang dijalankan untuk setiap tool yang dideklarasikan di tools_for_gemini
+TOOL_HANDLERS = {
+    "get_current_crypto_price": get_current_crypto_price,
+    "get_current_stock_forex_price": get_current_stock_forex_price,
+}
+# Batas waktu (detik) untuk semua function call dalam satu giliran
+TOOL_TURN_TIMEOUT = float(os.getenv('ROSA_TOOL_TURN_TIMEOUT', '15'))
+
+# Jumlah permintaan Gemini yang boleh berjalan bersamaan untuk seluruh bot
+GEMINI_MAX_CONCURRENCY = int(os.getenv('ROSA_GEMINI_MAX_CONCURRENCY', '64'))
+# Batas waktu (detik) satu permintaan ke Gemini
+GEMINI_REQUEST_TIMEOUT = float(os.getenv('ROSA_GEMINI_REQUEST_TIMEOUT', '60'))
+
+# Permintaan memakai client async bawaan SDK (gRPC asyncio), sehingga tidak memakai thread
+# executor default yang juga dipakai get_yfinance_data. Semaphore dibuat saat pertama dipakai
+# agar terikat ke event loop bot.
+_gemini_slots = None
+# Satu lock per pengguna agar pertanyaan beruntun dari pengguna yang sama diproses berurutan dan
+# riwayatnya tidak saling menimpa; lock dibuang otomatis ketika tidak ada lagi yang memakainya
+_user_locks = weakref.WeakValueDictionary()
+
+
+def _user_lock(user_id: int) -> asyncio.Lock:
+    lock = _user_locks.get(user_id)
+    if lock is None:
+        lock = asyncio.Lock()
+        _user_locks[user_id] = lock
+    return lock
+
+
+async def _stream_message(chat, content):
+    """
+    Mengirim pesan ke Gemini lewat API async dengan stream=True dan menghasilkan bagian (Part) respons
+    saat tiba. Slot GEMINI_MAX_CONCURRENCY dipegang sampai stream selesai.
+    """
+    global _gemini_slots
+    if _gemini_slots is None:
+        _gemini_slots = asyncio.Semaphore(max(1, GEMINI_MAX_CONCURRENCY))
+    async with _gemini_slots:
+        response = await chat.send_message_async(content, stream=True, request_options={"timeout": GEMINI_REQUEST_TIMEOUT})
+        async for chunk in response:
+            if chunk.candidates and chunk.candidates[0].content:
+                for part in chunk.candidates[0].content.parts:
+                    yield part
+
+
+async def _call_tool(function_name: str, function_args: dict) -> str:
+    print(f"AI meminta untuk memanggil fungsi: {function_name} dengan argumen: {function_args}")
+    handler = TOOL_HANDLERS.get(function_name)
+    if handler is None:
+        return "Fungsi tidak dikenali atau tidak didukung."
+    try:
+        function_result = await handler(**function_args)
+    except Exception as e:
+        print(f"Error running tool {function_name}: {e}")
+        function_result = f"Terjadi kesalahan saat menjalankan {function_name}."
+    print(f"Hasil fungsi: {function_result}")
+    return function_result
+
+
+async def dispatch_tool_calls(function_calls: list) -> list:
+    """
+    Menjalankan semua function call [(nama, argumen), ...] dalam satu giliran secara bersamaan,
+    sehingga pertanyaan tentang beberapa aset hanya menunggu satu kali latensi fetch.
+    Panggilan yang belum selesai setelah TOOL_TURN_TIMEOUT dibatalkan dan dilaporkan ke AI.
+    Mengembalikan hasil dengan urutan yang sama dengan `function_calls`.
+    """
+    tasks = [asyncio.ensure_future(_call_tool(name, args)) for name, args in function_calls]
+    done, pending = await asyncio.wait(tasks, timeout=TOOL_TURN_TIMEOUT)
+    for task in pending:
+        task.cancel()
+    return [
+        task.result() if task in done else f"Waktu habis saat menjalankan {name}."
+        for task, (name, _) in zip(tasks, function_calls)
+    ]
 
 
 async def get_gemini_response(user_id: int, prompt: str) -> str:
+    return "".join([text async for text in stream_gemini_response(user_id, prompt)])
+
+
+async def stream_gemini_response(user_id: int, prompt: str):
+    """
+    Menghasilkan potongan teks jawaban Gemini untuk `prompt` saat diterima (streaming), termasuk
+    jawaban akhir setelah function call dijalankan. Riwayat disimpan setelah jawaban lengkap.
+    """
+    async with _user_lock(user_id):
+        async for text in _stream_gemini_turn(user_id, prompt):
+            yield text
+
+
+async def _stream_gemini_turn(user_id: int, prompt: str):
+    answered = False
     try:
-        history = conversation_histories.get(user_id, [])
+        # Riwayat sudah dibatasi anggaran token sehingga ukuran prompt tidak tumbuh tanpa batas
+        history = conversation_store.get(user_id)
         history.append({'role': 'user', 'parts': [prompt]})
+
+        # Pertanyaan pertama (tanpa riwayat) tidak bergantung pada konteks, sehingga jawabannya bisa dipakai ulang
+        first_turn = len(history) == 1
+        cached_answer = response_cache.get(prompt) if first_turn else None
+        if cached_answer is not None:
+            yield cached_answer
+            history.append({'role': 'model', 'parts': [cached_answer]})
+            conversation_store.put(user_id, history)
+            return
+
         chat = model.start_chat(history=history[:-1])
-        
-        # Kirim prompt terbaru
-        response = await asyncio.to_thread(chat.send_message, prompt)
+
+        # Kirim prompt terbaru; teks diteruskan langsung, function call dikumpulkan
+        answer, function_calls = [], []
+        async for part in _stream_message(chat, prompt):
+            if part.function_call:
+                function_calls.append((part.function_call.name, {key: value for key, value in part.function_call.args.items()}))
+            elif part.text:
+                answer.append(part.text)
+                answered = True
+                yield part.text
 
         # ==========================================================
         # LOGIKA PENANGANAN TOOL USE
         # ==========================================================
-        # Buat daftar untuk menyimpan semua function_responses jika ada banyak panggilan
-        function_responses_parts = []
-        
-        if response.candidates and response.candidates[0].content and response.candidates[0].content.parts:
-            # Periksa setiap bagian dari respons AI
-            for part in response.candidates[0].content.parts:
-                if part.function_call:
-                    function_call = part.function_call
-                    function_name = function_call.name
-                    function_args = {key: value for key, value in function_call.args.items()}
-                    
-                    print(f"AI meminta untuk memanggil fungsi: {function_name} dengan argumen: {function_args}")
-
-                    function_result = None
-                    if function_name == "get_current_crypto_price":
-                        function_result = await get_current_crypto_price(**function_args)
-                    elif function_name == "get_current_stock_forex_price":
-                        function_result = await get_current_stock_forex_price(**function_args)
-                    else:
-                        function_result = "Fungsi tidak dikenali atau tidak didukung."
-                    
-                    print(f"Hasil fungsi: {function_result}")
-
-                    # Tambahkan hasil fungsi ke dalam daftar function_responses_parts
-                    function_responses_parts.append(
-                        genai.protos.Part(function_response=genai.protos.FunctionResponse(
-                            name=function_name,
-                            response={
-                                "result": function_result
-                            }
-                        ))
-                    )
-            
-            # Jika ada function_calls yang perlu direspons
-            if function_responses_parts:
-                # Tambahkan giliran AI yang meminta fungsi ke riwayat
-                history.append({'role': 'model', 'parts': response.candidates[0].content.parts}) # Simpan permintaan fungsi AI di history
-
-                # Tambahkan respons dari tool call ke riwayat
-                history.append({'role': 'tool', 'parts': function_responses_parts}) # <--- PENTING: role='tool'
-
-                # Kirim riwayat yang diperbarui kembali ke AI untuk mendapatkan respons akhir
-                # send_message berikutnya harus berupa tool response
-                final_response_gemini = await asyncio.to_thread(chat.send_message, function_responses_parts) # <--- Kirim list of Parts
-
-                # Tambahkan respons final dari AI ke riwayat sebelum menyimpan
-                history.append({'role': 'model', 'parts': [final_response_gemini.text]})
-                
-                conversation_histories[user_id] = history
-                return final_response_gemini.text
-        
-        # Jika tidak ada pemanggilan fungsi, kembalikan respons asli AI
-        # atau jika respons.candidates[0].content atau respons.candidates[0].content.parts tidak ada
-        history.append({'role': 'model', 'parts': [response.text]})
-        conversation_histories[user_id] = history
-        return response.text
+        if function_calls:
+            # Simpan permintaan fungsi AI (bagian respons yang sudah digabung oleh SDK) di history
+            history.append({'role': 'model', 'parts': chat.history[-1].parts})
+
+            # Jalankan semua function call bersamaan
+            function_results = await dispatch_tool_calls(function_calls)
+            function_responses_parts = [
+                genai.protos.Part(function_response=genai.protos.FunctionResponse(
+                    name=function_name,
+                    response={
+                        "result": function_result
+                    }
+                ))
+                for (function_name, _), function_result in zip(function_calls, function_results)
+            ]
+            history.append({'role': 'tool', 'parts': function_responses_parts}) # <--- PENTING: role='tool'
+
+            # Kirim hasil fungsi kembali ke AI dan teruskan jawaban akhirnya
+            answer = []
+            async for part in _stream_message(chat, function_responses_parts):
+                if part.text:
+                    answer.append(part.text)
+                    answered = True
+                    yield part.text
+
+        # Tambahkan respons final dari AI ke riwayat sebelum menyimpan
+        history.append({'role': 'model', 'parts': ["".join(answer)]})
+        conversation_store.put(user_id, history)
+
+        if first_turn:
+            # Jawaban dengan function call berisi data live (harga) sehingga tidak boleh di-cache
+            if function_calls:
+                response_cache.bypass()
+            else:
+                response_cache.put(prompt, "".join(answer))
 
     except Exception as e:
         print(f"Error getting Gemini response: {e}")
-        return "Maaf, ada masalah saat memproses permintaan Anda."
+        apology = "Maaf, ada masalah saat memproses permintaan Anda."
+        yield f"\n\n{apology}" if answered else apology
+
 
 async def reset_gemini_history(user_id: int):
-    if user_id in conversation_histories:
-        del conversation_histories[user_id]
-        return True
-    return False
\ No newline at end of file
+    return conversation_store.reset(user_id)
\ No newline at end of file
@@ -1,20 +1,216 @@
 import pandas as pd
 import mplfinance as mpf
+import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection, PolyCollection
+import hashlib
+import io
 import os
 import numpy as np
 
-# Untuk visualisasi SMC yang lebih kompleks, Anda mungkin perlu membuat `addplot` khusus
-# atau memproses data SMC untuk menghasilkan garis atau area yang akan diplot.
+# Direktori cache PNG grafik berdasarkan hash isi data (kosongkan untuk menonaktifkan)
+CHART_CACHE_DIR = os.getenv('ROSA_CHART_CACHE_DIR', '')
+# Jumlah file maksimum di cache grafik; file terlama dihapus lebih dulu
+CHART_CACHE_MAX_FILES = int(os.getenv('ROSA_CHART_CACHE_MAX_FILES', '500'))
+# Naikkan jika tampilan grafik berubah agar PNG lama di cache tidak dipakai lagi
+CHART_CACHE_VERSION = "3"
 
-def generate_chart(df: pd.DataFrame, symbol: str, timeframe: str, smc_data: dict = None) -> str:
+# Preset ukuran grafik: figsize (inci) dan DPI. "default" sama dengan figscale=1.5 bawaan mplfinance
+CHART_PRESETS = {
+    "default": {"figsize": (12, 8.62), "dpi": 100},
+    "mobile": {"figsize": (7.2, 6.4), "dpi": 110},
+    "hd": {"figsize": (12, 8.62), "dpi": 160},
+}
+# Preset grafik yang dipakai jika pengguna tidak memilih
+CHART_DEFAULT_PRESET = os.getenv('ROSA_CHART_PRESET', 'default')
+# Posisi axes harga di dalam figure (left, bottom, width, height), sama dengan layout mplfinance
+CHART_AXES_RECT = [0.18, 0.18, 0.72, 0.70]
+
+#light mode
+# LIGHT_STYLE = mpf.make_mpf_style(marketcolors=mpf.make_marketcolors(up='g', down='r', inherit=True), gridcolor='gray', figcolor='whitesmoke', y_on_right=True)
+
+#dark mode
+DARK_STYLE = {
+    "base_mpl_style": "dark_background",
+    "marketcolors": {
+        "candle": {"up": "#3dc985", "down": "#ef4f60"},  
+        "edge": {"up": "#3dc985", "down": "#ef4f60"},  
+        "wick": {"up": "#3dc985", "down": "#ef4f60"},  
+        "ohlc": {"up": "green", "down": "red"},
+        "volume": {"up": "#247252", "down": "#82333f"},  
+        "vcedge": {"up": "green", "down": "red"},  
+        "vcdopcod": False,
+        "alpha": 1,
+    },
+    "mavcolors": ("#ad7739", "#a63ab2", "#62b8ba"),
+    "facecolor": "#1b1f24",
+    "gridcolor": "#2c2e31",
+    "gridstyle": "--",
+    "y_on_right": True,
+    "rc": {
+        "axes.grid": True,
+        "axes.grid.axis": "y",
+        "axes.edgecolor": "#474d56",
+        "axes.titlecolor": "red",
+        "figure.facecolor": "#161a1e",
+        "figure.titlesize": "x-large",
+        "figure.titleweight": "semibold",
+    },
+    "base_mpf_style": "binance-dark",
+}
+
+# Warna overlay SMC
+ZONE_COLORS = {("fvg", 1): "#2f7ed8", ("fvg", -1): "#ef4f60", ("ob", 1): "#3dc985", ("ob", -1): "#d6454f"}
+SWING_HIGH_COLOR = "purple"
+SWING_LOW_COLOR = "orange"
+
+
+def _zone_boxes(zones: pd.DataFrame, column: str, kind: str, offset: int, candles: int) -> tuple:
+    """
+    Mengubah baris FVG/OB menjadi kotak (x0, x1, bottom, top) dalam koordinat sumbu mplfinance
+    (posisi candle). Kotak dimulai di candle zona dan berakhir di candle mitigasi, atau di candle
+    terakhir jika zona belum dimitigasi. Mengembalikan (kotak, warna).
+    """
+    zones = zones.dropna(subset=[column])
+    if zones.empty:
+        return np.empty((0, 4)), []
+    start = zones.index.to_numpy() - offset
+    mitigated = zones["MitigatedIndex"].fillna(0).to_numpy()
+    end = np.where(mitigated > 0, mitigated - offset, candles - 1)
+    boxes = np.column_stack([start, end, zones["Bottom"].to_numpy(), zones["Top"].to_numpy()]).astype(float)
+    colors = [ZONE_COLORS[(kind, int(direction))] for direction in zones[column]]
+    return boxes, colors
+
+
+def draw_smc_overlay(ax, smc_data: dict, offset: int, candles: int):
+    """
+    Menggambar FVG, OB, dan swing high/low di atas grafik candlestick dalam beberapa artist saja:
+    satu PolyCollection untuk area zona, satu LineCollection untuk tepi zona, dan satu scatter
+    untuk setiap jenis swing. Biayanya sebanding dengan jumlah zona, bukan zona x jumlah candle.
+    """
+    boxes, colors, styles = [], [], []
+    for kind, column, linestyle in (("fvg", "FVG", "--"), ("ob", "OB", ":")):
+        zones = smc_data.get(kind)
+        if zones is None or zones.empty:
+            continue
+        kind_boxes, kind_colors = _zone_boxes(zones, column, kind, offset, candles)
+        boxes.append(kind_boxes)
+        colors += kind_colors
+        styles += [linestyle] * len(kind_colors)
+
+    if colors:
+        x0, x1, bottom, top = np.concatenate(boxes).T
+        ax.add_collection(PolyCollection(
+            [[(a, b), (c, b), (c, d), (a, d)] for a, c, b, d in zip(x0, x1, bottom, top)],
+            facecolors=colors, edgecolors="none", alpha=0.15,
+        ))
+        ax.add_collection(LineCollection(
+            [[(a, y), (c, y)] for a, c, b, d in zip(x0, x1, bottom, top) for y in (b, d)],
+            colors=[color for color in colors for _ in range(2)],
+            linestyles=[style for style in styles for _ in range(2)], linewidths=0.8,
+        ))
+
+    swing_hl = smc_data.get("swing_hl")
+    if swing_hl is not None and not swing_hl.empty:
+        for direction, marker, color in ((1, "v", SWING_HIGH_COLOR), (-1, "^", SWING_LOW_COLOR)):
+            points = swing_hl[swing_hl["HighLow"] == direction]
+            if not points.empty:
+                ax.scatter(points.index.to_numpy() - offset, points["Level"].to_numpy(),
+                           marker=marker, color=color, s=60, zorder=3)
+
+
+def _chart_cache_key(df: pd.DataFrame, symbol: str, timeframe: str, smc_data: dict, preset: str) -> str:
+    """Hash dari semua data yang digambar dan preset ukurannya, sehingga permintaan identik menghasilkan kunci yang sama."""
+    digest = hashlib.blake2b(f"{CHART_CACHE_VERSION}|{symbol}|{timeframe}|{preset}".encode(), digest_size=20)
+    frames = [df] + [smc_data[key] for key in sorted(smc_data or {}) if isinstance(smc_data[key], (pd.DataFrame, pd.Series))]
+    for frame in frames:
+        digest.update(pd.util.hash_pandas_object(frame).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _read_cached_chart(key: str) -> bytes:
+    try:
+        with open(os.path.join(CHART_CACHE_DIR, f"{key}.png"), "rb") as f:
+            return f.read()
+    except OSError:
+        return b""
+
+
+def _write_cached_chart(key: str, png: bytes):
+    try:
+        os.makedirs(CHART_CACHE_DIR, exist_ok=True)
+        path = os.path.join(CHART_CACHE_DIR, f"{key}.png")
+        # Tulis ke file sementara lalu rename karena beberapa proses worker bisa menulis bersamaan
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(png)
+        os.replace(tmp_path, path)
+
+        entries = [entry for entry in os.scandir(CHART_CACHE_DIR) if entry.name.endswith(".png")]
+        if len(entries) > CHART_CACHE_MAX_FILES:
+            entries.sort(key=lambda entry: entry.stat().st_mtime)
+            for entry in entries[:len(entries) - CHART_CACHE_MAX_FILES]:
+                os.remove(entry.path)
+    except OSError as e:
+        print(f"Error writing chart cache: {e}")
+
+
+class ChartRenderer:
+    """
+    Merender grafik candlestick + overlay SMC menjadi PNG bytes. Style dipakai dari DARK_STYLE dan
+    figure dibuat sekali per preset, lalu dipakai ulang di setiap render dengan membersihkan axes,
+    sehingga biaya membuat figure dan menerapkan style hanya dibayar sekali per proses worker.
+    """
+
+    def __init__(self, style: dict = DARK_STYLE):
+        self.style = style
+        self._figures = {}  # preset -> (figure, axes)
+
+    def _figure(self, preset: str):
+        entry = self._figures.get(preset)
+        if entry is None:
+            options = CHART_PRESETS.get(preset, CHART_PRESETS["default"])
+            fig = mpf.figure(style=self.style, figsize=options["figsize"], dpi=options["dpi"])
+            entry = fig, fig.add_axes(CHART_AXES_RECT)
+            self._figures[preset] = entry
+        return entry
+
+    def render(self, df: pd.DataFrame, symbol: str, timeframe: str, smc_data: dict = None,
+               offset: int = 0, preset: str = CHART_DEFAULT_PRESET) -> bytes:
+        fig, ax = self._figure(preset)
+        ax.clear()
+        mpf.plot(df, type='candle', ax=ax, ylabel='Harga')
+        fig.suptitle(f"{symbol} {timeframe}")
+        if smc_data:
+            draw_smc_overlay(ax, smc_data, offset, len(df))
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png')
+        return buffer.getvalue()
+
+    def close(self):
+        for fig, _ in self._figures.values():
+            plt.close(fig)
+        self._figures.clear()
+
+
+# Satu renderer per proses (worker compute_pool); figure dibuat saat render pertama
+chart_renderer = ChartRenderer()
+
+
+def generate_chart(df: pd.DataFrame, symbol: str, timeframe: str, smc_data: dict = None,
+                   preset: str = CHART_DEFAULT_PRESET) -> bytes:
     """
-    Menghasilkan grafik candlestick dan menyimpannya sebagai gambar,
+    Menghasilkan grafik candlestick sebagai PNG bytes (dirender di memori, tanpa file sementara),
     dengan opsi untuk menambahkan indikator SMC.
+    Jika CHART_CACHE_DIR diisi, PNG disimpan di disk berdasarkan hash data yang digambar
+    sehingga permintaan identik tidak perlu dirender ulang.
+    `preset` memilih ukuran/DPI dari CHART_PRESETS. Mengembalikan b"" jika grafik gagal dibuat.
     """
     if df.empty:
-        return ""
+        return b""
     
     max_candles_to_plot = 250
+    # Posisi candle pertama yang digambar; kolom indeks SMC (MitigatedIndex) dihitung dari awal data
+    offset = max(0, len(df) - max_candles_to_plot)
     if len(df) > max_candles_to_plot:
         df = df.tail(max_candles_to_plot)
         # Anda juga perlu memotong data SMC agar sesuai dengan df yang sudah dipotong
@@ -25,114 +221,19 @@ def generate_chart(df: pd.DataFrame, symbol: str, timeframe: str, smc_data: dict
                 elif isinstance(smc_data[key], pd.Series):
                     smc_data[key] = smc_data[key].tail(max_candles_to_plot)
 
-
-    filename = f"chart_{symbol}_{timeframe}.png"
-    filepath = os.path.join(os.getcwd(), filename)
-
-    mc = mpf.make_marketcolors(up='g', down='r', inherit=True)
-
-    #light mode
-    # s_mode = mpf.make_mpf_style(marketcolors=mc, gridcolor='gray', figcolor='whitesmoke', y_on_right=True)
-    
-    #dark mode
-    s_mode = {
-        "base_mpl_style": "dark_background",
-        "marketcolors": {
-            "candle": {"up": "#3dc985", "down": "#ef4f60"},  
-            "edge": {"up": "#3dc985", "down": "#ef4f60"},  
-            "wick": {"up": "#3dc985", "down": "#ef4f60"},  
-            "ohlc": {"up": "green", "down": "red"},
-            "volume": {"up": "#247252", "down": "#82333f"},  
-            "vcedge": {"up": "green", "down": "red"},  
-            "vcdopcod": False,
-            "alpha": 1,
-        },
-        "mavcolors": ("#ad7739", "#a63ab2", "#62b8ba"),
-        "facecolor": "#1b1f24",
-        "gridcolor": "#2c2e31",
-        "gridstyle": "--",
-        "y_on_right": True,
-        "rc": {
-            "axes.grid": True,
-            "axes.grid.axis": "y",
-            "axes.edgecolor": "#474d56",
-            "axes.titlecolor": "red",
-            "figure.facecolor": "#161a1e",
-            "figure.titlesize": "x-large",
-            "figure.titleweight": "semibold",
-        },
-        "base_mpf_style": "binance-dark",
-    }
-
-    addplots = []
-
-    if smc_data:
-        # Contoh: Menambahkan FVG ke grafik
-        fvg = smc_data.get("fvg")
-        if fvg is not None and not fvg.empty:
-            # Filter FVG yang belum dimitigasi atau FVG terakhir
-            unmitigated_fvg = fvg[(fvg["MitigatedIndex"].isna()) | (fvg.index == fvg.index.max())]
-
-            for idx, row in unmitigated_fvg.iterrows():
-                if np.isnan(row["FVG"]):
-                    continue
-                
-                color = 'blue' if row["FVG"] == 1 else 'red'
-                
-                # Buat rectangles untuk FVG
-                # Anda perlu menentukan koordinat (x, y, width, height)
-                # Untuk FVG, ini biasanya area antara Top dan Bottom
-
-                # mplfinance.make_addplot supports plotting lines. For rectangles,
-                # you might need to draw them over the plot using matplotlib directly
-                # or find a workaround with fill_between if you want to stick to addplot.
-                # Here's a simplified approach for FVG as lines or area:
-
-                # Option 1: Plot FVG Top/Bottom as dashed lines
-                if row["FVG"] == 1: # Bullish FVG
-                    addplots.append(mpf.make_addplot(pd.Series(row['Top'], index=df.index), color=color, linestyle='--', width=0.7, panel=0))
-                    addplots.append(mpf.make_addplot(pd.Series(row['Bottom'], index=df.index), color=color, linestyle='--', width=0.7, panel=0))
-                elif row["FVG"] == -1: # Bearish FVG
-                    addplots.append(mpf.make_addplot(pd.Series(row['Top'], index=df.index), color=color, linestyle='--', width=0.7, panel=0))
-                    addplots.append(mpf.make_addplot(pd.Series(row['Bottom'], index=df.index), color=color, linestyle='--', width=0.7, panel=0))
-                
-                # Option 2 (lebih kompleks): Isi area FVG. Ini memerlukan matplotlib axes
-                # yang dapat diakses melalui `ax=` parameter plot.
-                # Untuk fungsionalitas ini, kita mungkin perlu memodifikasi cara plot dipanggil
-                # atau menggunakan pendekatan yang lebih canggih dengan `matplotlib.pyplot.figure`
-                # dan `add_axes` untuk kontrol yang lebih granular.
-
-        # Contoh: Menambahkan Order Block ke grafik
-        ob = smc_data.get("ob")
-        if ob is not None and not ob.empty:
-            unmitigated_ob = ob[ob["MitigatedIndex"].isna()].dropna(subset=["OB"])
-            for idx, row in unmitigated_ob.iterrows():
-                if np.isnan(row["OB"]):
-                    continue
-                color = 'green' if row["OB"] == 1 else 'red'
-                # OBs juga bisa digambar sebagai garis horizontal atau area
-                addplots.append(mpf.make_addplot(pd.Series(row['Top'], index=df.index), color=color, linestyle=':', width=1.0, panel=0))
-                addplots.append(mpf.make_addplot(pd.Series(row['Bottom'], index=df.index), color=color, linestyle=':', width=1.0, panel=0))
-
-        # TODO: Tambahkan visualisasi untuk BOS/CHoCH, Liquidity, Swing Highs/Lows
-        # Ini bisa menjadi tanda panah, garis, atau area kecil di grafik.
-        # Misalnya untuk Swing Highs/Lows:
-        swing_hl_data = smc_data.get("swing_hl")
-        if swing_hl_data is not None and not swing_hl_data.empty:
-            swing_points = swing_hl_data.dropna(subset=["HighLow"])
-            for idx, row in swing_points.iterrows():
-                if row["HighLow"] == 1: # Swing High
-                    # Plot point atau tanda di level Swing High
-                    addplots.append(mpf.make_addplot(pd.Series(row['Level'], index=df.index), scatter=True, marker='v', color='purple', markersize=100, panel=0))
-                elif row["HighLow"] == -1: # Swing Low
-                    # Plot point atau tanda di level Swing Low
-                    addplots.append(mpf.make_addplot(pd.Series(row['Level'], index=df.index), scatter=True, marker='^', color='orange', markersize=100, panel=0))
+    cache_key = None
+    if CHART_CACHE_DIR:
+        cache_key = _chart_cache_key(df, symbol, timeframe, smc_data, preset)
+        cached_png = _read_cached_chart(cache_key)
+        if cached_png:
+            return cached_png
 
     try:
-        mpf.plot(df, type='candle', style=s_mode, title=f"{symbol} {timeframe}", 
-                 ylabel='Harga', savefig=filepath, figscale=1.5, addplot=addplots)
-        return filepath
+        png = chart_renderer.render(df, symbol, timeframe, smc_data, offset, preset)
     except Exception as e:
         print(f"Error generating chart for {symbol} {timeframe}: {e}")
-        return ""
-    
\ No newline at end of file
+        return b""
+
+    if cache_key is not None:
+        _write_cached_chart(cache_key, png)
+    return png
@@ -1,13 +1,22 @@
 import discord
 import asyncio
+import io
 import os
 from discord import app_commands
 from discord.ext import commands
-from ai_integration import get_gemini_response, reset_gemini_history
-from data_retrieval import get_binance_klines, get_yfinance_data # Akan menambahkan fungsi untuk crypto, metals, dan energy
-from smc_analysis import analyze_smc
-from chart_generator import generate_chart
-from smc_analysis import analyze_smc
+from ai_integration import get_gemini_response, stream_gemini_response, reset_gemini_history
+from message_stream import StreamingReply, split_message
+from conversation_store import conversation_store
+from response_cache import response_cache
+from data_retrieval import get_binance_klines, get_yfinance_data, ohlcv_cache, ohlcv_store, ASSET_SOURCES, MAX_CANDLES # Akan menambahkan fungsi untuk crypto, metals, dan energy
+from compute_pool import compute_stage, ComputeBusyError
+from chart_generator import CHART_PRESETS, CHART_DEFAULT_PRESET
+from market_watcher import market_watcher, is_supported_timeframe, WatchLimitError, WatchCapacityError
+from market_scanner import scan_markets, format_scan, resolve_symbols, SCAN_MAX_SYMBOLS
+from mtf_analysis import run_mtf, parse_timeframes, MTF_BASE_CANDLES, MTF_DEFAULT_TIMEFRAMES
+
+# Tampilkan jawaban /tanya secara streaming (1) atau sekaligus setelah selesai (0)
+TANYA_STREAMING = os.getenv('ROSA_TANYA_STREAM', '1') == '1'
 
 def setup_commands(bot: commands.Bot):
 
@@ -28,9 +37,21 @@ def setup_commands(bot: commands.Bot):
             * `jenis_aset`: `crypto`, `forex`, `metals`, `energy`
             * `simbol`: Contoh: `BTCUSDT` (crypto), `EURUSD` (forex), `XAUUSD` (metals), `CL=F` (energy)
             * `timeframe`: Contoh: `1m`, `5m`, `15m`, `30m`, `1h`, `4h`, `1d`, `1w`, `1M`
-            * Contoh: `/rosa crypto BTCUSDT 1h`
+            * `candles` (opsional): Jumlah candle yang dianalisis, maksimum `5000`. Default `500` untuk crypto; forex/metals/energy memakai seluruh data Yahoo Finance yang tersedia.
+            * `grafik` (opsional): Ukuran grafik, `default`, `mobile` (lebih kecil untuk layar HP), atau `hd`.
+            * Contoh: `/rosa crypto BTCUSDT 1h` atau `/rosa crypto BTCUSDT 15m candles:5000 grafik:mobile`
+        * `/rosa_mtf <jenis_aset> <simbol> [timeframes]`: Analisis SMC multi-timeframe dari satu kali fetch timeframe terendah, beserta zona FVG/OB yang sejalan antar timeframe.
+            * `timeframes`: Dipisah koma, default `15m,1h,4h`. Contoh: `/rosa_mtf crypto BTCUSDT 15m,1h,4h,1d`
+        * `/scan <jenis_aset> <timeframe> <simbol>`: Menjalankan scan SMC untuk banyak simbol sekaligus dan mengurutkannya dari yang paling dekat dengan zona FVG/OB yang belum dimitigasi.
+            * `simbol`: Daftar simbol dipisah koma, atau nama watchlist (`top10`, `layer1`, `defi`, `majors`, `crosses`, `metals`, `energy`)
+            * Contoh: `/scan crypto 1h BTCUSDT,ETHUSDT,SOLUSDT` atau `/scan crypto 4h top10`
         * `/tanya <pertanyaan>`: Mengajukan pertanyaan terbuka kepada Gemini AI.
             * Contoh: `/tanya Apa itu inflasi?`
+        * `/watch <jenis_aset> <simbol> <timeframe>`: Mengirim alert di channel ini setiap kali candle baru menghasilkan BOS/CHoCH, FVG terisi, atau likuiditas tersapu.
+            * Contoh: `/watch crypto BTCUSDT 1h`
+        * `/unwatch <jenis_aset> <simbol> <timeframe>`: Menghentikan alert untuk pasar tersebut di channel ini.
+        * `/watches`: Menampilkan daftar pasar yang Anda pantau.
+        * `/stats`: Menampilkan statistik cache data pasar, watcher, dan riwayat /tanya.
         """
         await interaction.response.send_message(help_text, ephemeral=True) # ephemeral=True agar hanya user yang melihat
 
@@ -39,9 +60,14 @@ def setup_commands(bot: commands.Bot):
     @app_commands.describe(
         jenis_aset="Jenis aset (crypto, forex, metals, energy)",
         simbol="Simbol aset (misalnya BTCUSDT, EURUSD=X, GC=F)",
-        timeframe="Jangka waktu (misalnya 1h, 4h, 1d)"
+        timeframe="Jangka waktu (misalnya 1h, 4h, 1d)",
+        candles="Jumlah candle yang dianalisis (default 500 untuk crypto)",
+        grafik="Ukuran grafik (default, mobile, hd)"
     )
-    async def rosa(interaction: discord.Interaction, jenis_aset: str, simbol: str, timeframe: str):
+    @app_commands.choices(grafik=[app_commands.Choice(name=name, value=name) for name in CHART_PRESETS])
+    async def rosa(interaction: discord.Interaction, jenis_aset: str, simbol: str, timeframe: str,
+                   candles: app_commands.Range[int, 50, MAX_CANDLES] = None,
+                   grafik: app_commands.Choice[str] = None):
         await interaction.response.defer(thinking=True) # Menunjukkan bot sedang berpikir
 
         jenis_aset = jenis_aset.lower()
@@ -50,9 +76,9 @@ def setup_commands(bot: commands.Bot):
 
         data = None
         if jenis_aset == "crypto":
-            data = await get_binance_klines(simbol, timeframe)
+            data = await get_binance_klines(simbol, timeframe, limit=candles or 500, incremental=True)
         elif jenis_aset in ["forex", "metals", "energy"]:
-            data = await get_yfinance_data(simbol, timeframe)
+            data = await get_yfinance_data(simbol, timeframe, incremental=True)
         else:
             await interaction.followup.send(f"Jenis aset '{jenis_aset}' tidak didukung. Pilihan yang valid: `crypto`, `forex`, `metals`, `energy`.")
             return
@@ -60,25 +86,208 @@ def setup_commands(bot: commands.Bot):
         if data is None or data.empty:
             await interaction.followup.send(f"Gagal mendapatkan data untuk `{simbol}` pada timeframe `{timeframe}`. Pastikan simbol dan timeframe benar, dan coba format simbol `yfinance` yang tepat (misalnya `EURUSD=X` untuk forex, `GC=F` untuk emas).")
             return
+        if candles is not None:
+            data = data.tail(candles)
 
         try:
-            # Perbarui panggilan analyze_smc untuk mendapatkan data analisis dan teks
-            analysis_text, smc_indicators = analyze_smc(data, simbol, timeframe)
-            
-            # Teruskan data SMC ke generate_chart
-            chart_file_path = generate_chart(data, simbol, timeframe, smc_indicators)
-
-            if chart_file_path and os.path.exists(chart_file_path):
-                file = discord.File(chart_file_path, filename=f"{simbol}_{timeframe}_chart.png")
+            # Analisis SMC dan render grafik dijalankan di process pool agar event loop tidak terblokir
+            preset = grafik.value if grafik is not None else CHART_DEFAULT_PRESET
+            analysis_text, smc_indicators, chart_png = await compute_stage.run(data, simbol, timeframe, preset)
+
+            if chart_png:
+                file = discord.File(io.BytesIO(chart_png), filename=f"{simbol}_{timeframe}_chart.png")
                 await interaction.followup.send(content=analysis_text, file=file)
-                os.remove(chart_file_path)
             else:
                 await interaction.followup.send(content=f"Analisis untuk {simbol} ({timeframe}):\n\n{analysis_text}\n\nGagal menghasilkan grafik atau grafik tidak ditemukan.")
 
+        except ComputeBusyError:
+            await interaction.followup.send("ROSA sedang menangani banyak analisis sekaligus. Silakan coba lagi dalam beberapa saat.")
         except Exception as e:
             print(f"Error during SMC analysis or chart generation for {simbol} {timeframe}: {e}")
             await interaction.followup.send(f"Terjadi kesalahan saat menganalisis {simbol} ({timeframe}). Silakan coba lagi nanti. Detail error: `{e}`")
 
+    # Perintah /rosa_mtf
+    @bot.tree.command(name="rosa_mtf", description="Analisis SMC multi-timeframe dari satu kali fetch.")
+    @app_commands.describe(
+        jenis_aset="Jenis aset (crypto, forex, metals, energy)",
+        simbol="Simbol aset (misalnya BTCUSDT, EURUSD=X, GC=F)",
+        timeframes="Daftar timeframe dipisah koma (misalnya 15m,1h,4h,1d)"
+    )
+    async def rosa_mtf(interaction: discord.Interaction, jenis_aset: str, simbol: str, timeframes: str = MTF_DEFAULT_TIMEFRAMES):
+        await interaction.response.defer(thinking=True)
+
+        jenis_aset = jenis_aset.lower()
+        simbol = simbol.upper()
+
+        try:
+            timeframe_list = parse_timeframes(timeframes)
+        except ValueError as e:
+            await interaction.followup.send(str(e))
+            return
+        base = timeframe_list[0]
+
+        # Hanya timeframe terendah yang diambil dari bursa; timeframe lain dibentuk dengan resample
+        if jenis_aset == "crypto":
+            data = await get_binance_klines(simbol, base, limit=MTF_BASE_CANDLES, incremental=True)
+        elif jenis_aset in ["forex", "metals", "energy"]:
+            data = await get_yfinance_data(simbol, base, incremental=True)
+        else:
+            await interaction.followup.send(f"Jenis aset '{jenis_aset}' tidak didukung. Pilihan yang valid: `crypto`, `forex`, `metals`, `energy`.")
+            return
+
+        if data is None or data.empty:
+            await interaction.followup.send(f"Gagal mendapatkan data untuk `{simbol}` pada timeframe `{base}`. Pastikan simbol dan timeframe benar.")
+            return
+
+        try:
+            summary, details = await run_mtf(data, simbol, timeframe_list)
+            file = discord.File(io.BytesIO(details.encode("utf-8")), filename=f"{simbol}_mtf_analysis.md")
+            await interaction.followup.send(content=summary[:2000], file=file)
+        except ComputeBusyError:
+            await interaction.followup.send("ROSA sedang menangani banyak analisis sekaligus. Silakan coba lagi dalam beberapa saat.")
+        except Exception as e:
+            print(f"Error during multi-timeframe analysis for {simbol} {timeframes}: {e}")
+            await interaction.followup.send(f"Terjadi kesalahan saat menganalisis {simbol} ({timeframes}). Silakan coba lagi nanti. Detail error: `{e}`")
+
+    # Perintah /scan
+    @bot.tree.command(name="scan", description="Scan SMC untuk banyak simbol, diurutkan dari yang paling dekat dengan zona FVG/OB.")
+    @app_commands.describe(
+        jenis_aset="Jenis aset (crypto, forex, metals, energy)",
+        timeframe="Jangka waktu (misalnya 1h, 4h, 1d)",
+        simbol="Daftar simbol dipisah koma (misalnya BTCUSDT,ETHUSDT) atau nama watchlist (misalnya top10)"
+    )
+    async def scan(interaction: discord.Interaction, jenis_aset: str, timeframe: str, simbol: str):
+        await interaction.response.defer(thinking=True)
+
+        jenis_aset = jenis_aset.lower()
+        timeframe = timeframe.lower()
+
+        if jenis_aset not in ASSET_SOURCES:
+            await interaction.followup.send(f"Jenis aset '{jenis_aset}' tidak didukung. Pilihan yang valid: `crypto`, `forex`, `metals`, `energy`.")
+            return
+
+        symbols = resolve_symbols(jenis_aset, simbol)
+        if not symbols:
+            await interaction.followup.send("Masukkan minimal satu simbol atau nama watchlist.")
+            return
+        if len(symbols) > SCAN_MAX_SYMBOLS:
+            await interaction.followup.send(f"Maksimum {SCAN_MAX_SYMBOLS} simbol per scan (Anda memasukkan {len(symbols)}).")
+            return
+
+        try:
+            results, failed = await scan_markets(jenis_aset, timeframe, symbols)
+            await interaction.followup.send(format_scan(jenis_aset, timeframe, results, failed))
+        except Exception as e:
+            print(f"Error during /scan {jenis_aset} {timeframe}: {e}")
+            await interaction.followup.send(f"Terjadi kesalahan saat menjalankan scan. Silakan coba lagi nanti. Detail error: `{e}`")
+
+    # Perintah /stats
+    @bot.tree.command(name="stats", description="Menampilkan statistik cache data pasar, watcher, dan riwayat /tanya.")
+    async def stats(interaction: discord.Interaction):
+        cache_stats = ohlcv_cache.stats()
+        store_stats = ohlcv_store.stats()
+        watch_stats = market_watcher.stats()
+        history_stats = conversation_store.stats()
+        answer_stats = response_cache.stats()
+        if store_stats['enabled']:
+            store_text = (
+                f"- Seri dimuat dari disk: `{store_stats['hits']}`/`{store_stats['loads']}` | "
+                f"Segmen ditulis: `{store_stats['writes']}` | Dilewati (tidak berubah): `{store_stats['skipped']}` | "
+                f"Digabung: `{store_stats['compactions']}`\n"
+            )
+        else:
+            store_text = "- Nonaktif (pyarrow tidak terpasang atau ROSA_OHLCV_STORE_DIR kosong)\n"
+        stats_text = (
+            "**Statistik Cache OHLCV:**\n"
+            f"- Entri tersimpan: `{cache_stats['entries']}` (fetch berjalan: `{cache_stats['inflight']}`)\n"
+            f"- Hit: `{cache_stats['hits']}` | Miss: `{cache_stats['misses']}` | Digabung: `{cache_stats['coalesced']}`\n"
+            f"- Hit rate: `{cache_stats['hit_rate']:.1%}`\n"
+            "**Statistik Store OHLCV di Disk:**\n"
+            f"{store_text}"
+            "**Statistik Watcher:**\n"
+            f"- Langganan: `{watch_stats['subscriptions']}` pada `{watch_stats['markets']}`/`{watch_stats['max_markets']}` pasar\n"
+            f"- Fetch per penutupan candle: `{watch_stats['polls']}` | Alert terkirim: `{watch_stats['alerts']}`\n"
+            "**Statistik Riwayat /tanya:**\n"
+            f"- Pengguna: `{history_stats['users']}` | Pesan: `{history_stats['messages']}` | Token tersimpan: `~{history_stats['resident_tokens']}`\n"
+            f"- Token riwayat per prompt: rata-rata `~{history_stats['avg_prompt_tokens']:.0f}`, maksimum `~{history_stats['max_prompt_tokens']}`\n"
+            f"- Giliran dipangkas: `{history_stats['trimmed_turns']}` | Pengguna dibuang (LRU/TTL): `{history_stats['evicted_users']}`/`{history_stats['expired_users']}`\n"
+            "**Statistik Cache Jawaban /tanya:**\n"
+            f"- Entri: `{answer_stats['entries']}` | Hit: `{answer_stats['hits']}` (mirip: `{answer_stats['similar_hits']}`) | Miss: `{answer_stats['misses']}`\n"
+            f"- Hit rate: `{answer_stats['hit_rate']:.1%}` | Tidak di-cache (function call): `{answer_stats['bypassed']}`"
+        )
+        await interaction.response.send_message(stats_text, ephemeral=True)
+
+    # Perintah /watch
+    @bot.tree.command(name="watch", description="Memantau pasar dan mengirim alert saat ada event SMC baru.")
+    @app_commands.describe(
+        jenis_aset="Jenis aset (crypto, forex, metals, energy)",
+        simbol="Simbol aset (misalnya BTCUSDT, EURUSD=X, GC=F)",
+        timeframe="Jangka waktu (misalnya 1h, 4h, 1d)"
+    )
+    async def watch(interaction: discord.Interaction, jenis_aset: str, simbol: str, timeframe: str):
+        await interaction.response.defer(thinking=True)
+
+        jenis_aset = jenis_aset.lower()
+        simbol = simbol.upper()
+        timeframe = timeframe.lower()
+
+        if jenis_aset not in ASSET_SOURCES:
+            await interaction.followup.send(f"Jenis aset '{jenis_aset}' tidak didukung. Pilihan yang valid: `crypto`, `forex`, `metals`, `energy`.")
+            return
+        if not is_supported_timeframe(timeframe):
+            await interaction.followup.send(f"Timeframe `{timeframe}` belum didukung untuk `/watch`.")
+            return
+
+        key = market_watcher.market_key(jenis_aset, simbol, timeframe)
+        # Ambil data sekarang untuk memastikan simbol valid dan mengisi stream SMC sebelum candle berikutnya ditutup
+        data = await market_watcher.fetch(key)
+        if data is None or data.empty:
+            await interaction.followup.send(f"Gagal mendapatkan data untuk `{simbol}` pada timeframe `{timeframe}`. Pastikan simbol dan timeframe benar.")
+            return
+
+        try:
+            added = market_watcher.subscribe(jenis_aset, simbol, timeframe, interaction.channel_id, interaction.user.id)
+        except WatchLimitError as e:
+            await interaction.followup.send(f"{e} Hapus salah satu dengan `/unwatch` terlebih dahulu.")
+            return
+        except WatchCapacityError as e:
+            await interaction.followup.send(f"{e} Pilih pasar yang sudah dipantau atau coba lagi nanti.")
+            return
+
+        if not added:
+            await interaction.followup.send(f"Anda sudah memantau `{simbol}` ({timeframe}) di channel ini.")
+            return
+        market_watcher.prime(key, data)
+        await interaction.followup.send(f"ROSA akan mengirim alert untuk `{simbol}` ({timeframe}) di channel ini setiap kali candle baru menghasilkan event SMC.")
+
+    # Perintah /unwatch
+    @bot.tree.command(name="unwatch", description="Menghentikan alert untuk sebuah pasar di channel ini.")
+    @app_commands.describe(
+        jenis_aset="Jenis aset (crypto, forex, metals, energy)",
+        simbol="Simbol aset (misalnya BTCUSDT, EURUSD=X, GC=F)",
+        timeframe="Jangka waktu (misalnya 1h, 4h, 1d)"
+    )
+    async def unwatch(interaction: discord.Interaction, jenis_aset: str, simbol: str, timeframe: str):
+        jenis_aset = jenis_aset.lower()
+        simbol = simbol.upper()
+        timeframe = timeframe.lower()
+
+        if jenis_aset in ASSET_SOURCES and market_watcher.unsubscribe(jenis_aset, simbol, timeframe, interaction.channel_id, interaction.user.id):
+            await interaction.response.send_message(f"Alert untuk `{simbol}` ({timeframe}) di channel ini telah dihentikan.", ephemeral=True)
+        else:
+            await interaction.response.send_message(f"Anda tidak memantau `{simbol}` ({timeframe}) di channel ini.", ephemeral=True)
+
+    # Perintah /watches
+    @bot.tree.command(name="watches", description="Menampilkan daftar pasar yang Anda pantau.")
+    async def watches(interaction: discord.Interaction):
+        subscriptions = market_watcher.subscriptions_for(interaction.user.id)
+        if not subscriptions:
+            await interaction.response.send_message("Anda belum memantau pasar apa pun. Gunakan `/watch` untuk mulai.", ephemeral=True)
+            return
+
+        lines = [f"- `{simbol}` ({timeframe}, {jenis_aset}) di <#{channel_id}>" for jenis_aset, simbol, timeframe, channel_id in subscriptions]
+        await interaction.response.send_message("**Pasar yang Anda pantau:**\n" + "\n".join(lines), ephemeral=True)
+
    # Perintah /tanya
     @bot.tree.command(name="tanya", description="Mengajukan pertanyaan terbuka kepada Gemini AI.")
     @app_commands.describe(
@@ -91,9 +300,17 @@ def setup_commands(bot: commands.Bot):
         user_id = interaction.user.id
 
         try:
-            # Panggil fungsi dengan user_id
-            response_text = await get_gemini_response(user_id, pertanyaan)
-            await interaction.followup.send(response_text)
+            if TANYA_STREAMING:
+                # Jawaban ditampilkan sambil ditulis; pesan diedit bertahap dan dilanjutkan ke pesan baru jika melewati 2000 karakter
+                reply = StreamingReply(interaction)
+                async for text in stream_gemini_response(user_id, pertanyaan):
+                    await reply.append(text)
+                await reply.finish(fallback="Maaf, AI tidak memberikan jawaban. Silakan coba lagi.")
+            else:
+                # Panggil fungsi dengan user_id
+                response_text = await get_gemini_response(user_id, pertanyaan)
+                for page in split_message(response_text):
+                    await interaction.followup.send(page)
         except Exception as e:
             print(f"Error handling /tanya command: {e}")
             await interaction.followup.send("Maaf, terjadi kesalahan saat mencoba menjawab pertanyaan Anda. Silakan coba lagi nanti.")
@@ -0,0 +1,116 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pandas as pd
+
+from smc_analysis import analyze_smc
+from chart_generator import generate_chart, CHART_DEFAULT_PRESET
+
+# Jumlah proses worker untuk analisis SMC dan render grafik
+COMPUTE_WORKERS = int(os.getenv('ROSA_COMPUTE_WORKERS', str(os.cpu_count() or 1)))
+# Jumlah job yang boleh menunggu di antrean di luar job yang sedang dikerjakan worker
+COMPUTE_MAX_PENDING = int(os.getenv('ROSA_COMPUTE_MAX_PENDING', '16'))
+# Berapa lama (detik) sebuah job boleh menunggu tempat di antrean sebelum ditolak
+COMPUTE_QUEUE_TIMEOUT = float(os.getenv('ROSA_COMPUTE_QUEUE_TIMEOUT', '10'))
+
+
+class ComputeBusyError(Exception):
+    """Dilempar ketika antrean compute penuh lebih lama dari COMPUTE_QUEUE_TIMEOUT."""
+
+
+def frame_to_arrays(df: pd.DataFrame) -> dict:
+    """Mengubah DataFrame OHLCV menjadi array NumPy yang murah untuk dikirim ke proses worker."""
+    index = pd.DatetimeIndex(df.index).as_unit("ns")
+    return {
+        "index": index.asi8,
+        "tz": str(index.tz) if index.tz is not None else None,
+        "open": np.ascontiguousarray(df["open"].to_numpy(dtype=np.float64)),
+        "high": np.ascontiguousarray(df["high"].to_numpy(dtype=np.float64)),
+        "low": np.ascontiguousarray(df["low"].to_numpy(dtype=np.float64)),
+        "close": np.ascontiguousarray(df["close"].to_numpy(dtype=np.float64)),
+        "volume": np.ascontiguousarray(df["volume"].to_numpy(dtype=np.float64)),
+    }
+
+
+def arrays_to_frame(arrays: dict) -> pd.DataFrame:
+    """Kebalikan dari frame_to_arrays, dijalankan di dalam proses worker."""
+    index = pd.to_datetime(arrays["index"], utc=arrays["tz"] is not None)
+    if arrays["tz"] is not None:
+        index = index.tz_convert(arrays["tz"])
+    index.name = "timestamp"
+    return pd.DataFrame(
+        {column: arrays[column] for column in ("open", "high", "low", "close", "volume")},
+        index=index,
+    )
+
+
+def _analyze_and_render(arrays: dict, symbol: str, timeframe: str, preset: str = CHART_DEFAULT_PRESET):
+    """Job worker: analisis SMC lalu render grafik. Mengembalikan (teks, indikator, PNG bytes)."""
+    df = arrays_to_frame(arrays)
+    analysis_text, smc_indicators = analyze_smc(df, symbol, timeframe)
+
+    chart_png = generate_chart(df, symbol, timeframe, dict(smc_indicators), preset=preset)
+    return analysis_text, smc_indicators, chart_png
+
+
+class ComputeStage:
+    """
+    Menjalankan analisis SMC dan render grafik di ProcessPoolExecutor agar tidak memblokir
+    event loop discord.py. Jumlah job yang diterima dibatasi (worker + antrean); job yang
+    tidak mendapat tempat dalam COMPUTE_QUEUE_TIMEOUT detik ditolak dengan ComputeBusyError.
+    """
+
+    def __init__(self, max_workers: int = COMPUTE_WORKERS, max_pending: int = COMPUTE_MAX_PENDING,
+                 queue_timeout: float = COMPUTE_QUEUE_TIMEOUT):
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(0, max_pending)
+        self.queue_timeout = queue_timeout
+        self._executor = None
+        self._slots = None
+
+    def start(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers + self.max_pending)
+
+    async def submit(self, func, *args):
+        """Menjalankan `func(*args)` di proses worker dengan backpressure."""
+        self.start()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise ComputeBusyError("Antrean analisis sedang penuh.")
+
+        executor = self._executor
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor, func, *args)
+        except BrokenProcessPool:
+            # Worker mati (misalnya kehabisan memori): buat pool baru untuk job berikutnya. Jika
+            # beberapa job gagal bersamaan, hanya job pertama yang masih melihat pool rusak ini
+            # sebagai pool aktif yang menggantinya
+            if self._executor is executor:
+                self._executor = None
+                # Hentikan thread manajemen dan sisa worker pool lama tanpa menunggu
+                executor.shutdown(wait=False, cancel_futures=True)
+                self.start()
+            raise
+        finally:
+            self._slots.release()
+
+    async def run(self, df: pd.DataFrame, symbol: str, timeframe: str, preset: str = CHART_DEFAULT_PRESET):
+        """Analisis SMC + grafik untuk `df`. Mengembalikan (teks analisis, indikator SMC, PNG bytes)."""
+        return await self.submit(_analyze_and_render, frame_to_arrays(df), symbol, timeframe, preset)
+
+    async def close(self):
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+
+
+# Satu compute stage untuk seluruh proses bot
+compute_stage = ComputeStage()
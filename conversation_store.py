@@ -0,0 +1,110 @@
+import os
+import time
+from collections import OrderedDict
+
+# Batas token (perkiraan) riwayat percakapan per pengguna yang dikirim ulang ke Gemini setiap giliran
+HISTORY_MAX_TOKENS = int(os.getenv('ROSA_HISTORY_MAX_TOKENS', '4000'))
+# Jumlah pengguna maksimum yang riwayatnya disimpan di memori; yang paling lama tidak aktif dibuang lebih dulu
+HISTORY_MAX_USERS = int(os.getenv('ROSA_HISTORY_MAX_USERS', '1000'))
+# Riwayat yang tidak dipakai selama ini (detik) dianggap kedaluwarsa
+HISTORY_TTL = float(os.getenv('ROSA_HISTORY_TTL', '3600'))
+
+# Perkiraan jumlah karakter per token; cukup untuk anggaran tanpa memanggil count_tokens ke API
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(message: dict) -> int:
+    """Perkiraan jumlah token satu pesan riwayat ({'role': ..., 'parts': [...]})."""
+    return sum(len(part if isinstance(part, str) else str(part)) for part in message["parts"]) // CHARS_PER_TOKEN + 1
+
+
+def split_turns(history: list) -> list:
+    """
+    Memecah riwayat menjadi giliran: satu pesan 'user' beserta semua pesan model/tool setelahnya.
+    Riwayat dipotong per giliran agar pasangan function call dan function response tidak terpisah.
+    """
+    turns = []
+    for message in history:
+        if message["role"] == "user" or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+class ConversationStore:
+    """
+    Riwayat percakapan /tanya per pengguna dengan batas memori:
+    - setiap riwayat dibatasi HISTORY_MAX_TOKENS (perkiraan); giliran terlama dibuang lebih dulu
+      (sliding window), sehingga ukuran prompt per pertanyaan tidak tumbuh tanpa batas;
+    - jumlah pengguna dibatasi secara LRU dan riwayat yang tidak aktif selama HISTORY_TTL dibuang.
+    """
+
+    def __init__(self, max_tokens: int = HISTORY_MAX_TOKENS, max_users: int = HISTORY_MAX_USERS,
+                 ttl: float = HISTORY_TTL):
+        self.max_tokens = max_tokens
+        self.max_users = max(1, max_users)
+        self.ttl = ttl
+        self._histories = OrderedDict()  # user_id -> (last_used, tokens, history)
+        self.trimmed_turns = 0
+        self.evicted_users = 0
+        self.expired_users = 0
+        self.prompts = 0
+        self.prompt_tokens = 0
+        self.max_prompt_tokens = 0
+
+    def _expire(self, now: float):
+        while self._histories:
+            user_id, (last_used, _, _) = next(iter(self._histories.items()))
+            if now - last_used < self.ttl:
+                break
+            del self._histories[user_id]
+            self.expired_users += 1
+
+    def get(self, user_id: int) -> list:
+        """Salinan riwayat pengguna (kosong jika belum ada atau kedaluwarsa) untuk dipakai sebagai prompt."""
+        self._expire(time.monotonic())
+        entry = self._histories.get(user_id)
+        history, tokens = (list(entry[2]), entry[1]) if entry is not None else ([], 0)
+
+        self.prompts += 1
+        self.prompt_tokens += tokens
+        self.max_prompt_tokens = max(self.max_prompt_tokens, tokens)
+        return history
+
+    def put(self, user_id: int, history: list):
+        """Menyimpan riwayat setelah satu giliran selesai, dipotong sesuai anggaran token."""
+        turns = split_turns(history)
+        turn_tokens = [sum(estimate_tokens(message) for message in turn) for turn in turns]
+        tokens = sum(turn_tokens)
+        # Giliran terakhir selalu disimpan walaupun sendirian melebihi anggaran
+        while len(turns) > 1 and tokens > self.max_tokens:
+            turns.pop(0)
+            tokens -= turn_tokens.pop(0)
+            self.trimmed_turns += 1
+
+        now = time.monotonic()
+        self._histories[user_id] = (now, tokens, [message for turn in turns for message in turn])
+        self._histories.move_to_end(user_id)
+        self._expire(now)
+        while len(self._histories) > self.max_users:
+            self._histories.popitem(last=False)
+            self.evicted_users += 1
+
+    def reset(self, user_id: int) -> bool:
+        return self._histories.pop(user_id, None) is not None
+
+    def stats(self) -> dict:
+        return {
+            "users": len(self._histories),
+            "messages": sum(len(history) for _, _, history in self._histories.values()),
+            "resident_tokens": sum(tokens for _, tokens, _ in self._histories.values()),
+            "avg_prompt_tokens": self.prompt_tokens / self.prompts if self.prompts else 0.0,
+            "max_prompt_tokens": self.max_prompt_tokens,
+            "trimmed_turns": self.trimmed_turns,
+            "evicted_users": self.evicted_users,
+            "expired_users": self.expired_users,
+        }
+
+
+# Satu store riwayat untuk seluruh proses bot
+conversation_store = ConversationStore()
@@ -3,14 +3,450 @@ import ccxt.async_support as ccxt
 import yfinance as yf
 import asyncio
 import os
-from datetime import datetime, timedelta
-
-async def get_binance_klines(symbol: str, timeframe: str, limit: int = 500) -> pd.DataFrame:
-    exchange = ccxt.binance({
-        'apiKey': os.getenv('BINANCE_API_KEY'),
-        'secret': os.getenv('BINANCE_API_SECRET'),
-        'enableRateLimit': True,
-    })
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from ohlcv_store import ohlcv_store
+
+# Berapa lama metadata market Binance (hasil load_markets) dianggap masih segar
+BINANCE_MARKETS_TTL = int(os.getenv('BINANCE_MARKETS_TTL', '3600'))
+
+
+class BinanceExchangeManager:
+    """
+    Mengelola satu instance ccxt.binance (async) untuk seluruh proses bot.
+    Client dibuat sekali saat bot start sehingga sesi HTTP (TCP/TLS) dipakai ulang,
+    metadata market dimuat sekali lalu di-refresh setelah TTL habis, dan client
+    ditutup dengan bersih saat bot shutdown.
+    """
+
+    def __init__(self, markets_ttl: int = BINANCE_MARKETS_TTL):
+        self.markets_ttl = markets_ttl
+        self._exchange = None
+        self._markets_loaded_at = None
+        self._lock = asyncio.Lock()
+
+    def _create_exchange(self):
+        return ccxt.binance({
+            'apiKey': os.getenv('BINANCE_API_KEY'),
+            'secret': os.getenv('BINANCE_API_SECRET'),
+            'enableRateLimit': True,
+        })
+
+    def _markets_stale(self) -> bool:
+        return self._markets_loaded_at is None or time.monotonic() - self._markets_loaded_at >= self.markets_ttl
+
+    async def start(self):
+        """Membuat client dan memuat metadata market. Dipanggil saat bot start."""
+        await self.get_exchange()
+
+    async def get_exchange(self):
+        """
+        Mengembalikan client bersama. Jika belum dibuat (misalnya dipanggil sebelum start)
+        client dibuat saat itu juga; jika metadata market sudah kedaluwarsa, dimuat ulang.
+        """
+        if self._exchange is not None and not self._markets_stale():
+            return self._exchange
+
+        async with self._lock:
+            if self._exchange is None:
+                self._exchange = self._create_exchange()
+            if self._markets_stale():
+                try:
+                    await self._exchange.load_markets(reload=self._markets_loaded_at is not None)
+                    self._markets_loaded_at = time.monotonic()
+                except Exception as e:
+                    # Jangan gagalkan permintaan; fetch_ohlcv akan mencoba memuat market sendiri
+                    print(f"Failed to load Binance markets: {e}")
+            return self._exchange
+
+    async def close(self):
+        """Menutup sesi HTTP client. Dipanggil saat bot shutdown."""
+        async with self._lock:
+            if self._exchange is not None:
+                try:
+                    await self._exchange.close()
+                finally:
+                    self._exchange = None
+                    self._markets_loaded_at = None
+
+
+# Satu manager untuk seluruh proses
+binance_manager = BinanceExchangeManager()
+
+
+# Jumlah candle maksimum per request fetch_ohlcv Binance
+BINANCE_PAGE_LIMIT = 1000
+# Jumlah request halaman fetch_ohlcv paralel maksimum untuk satu fetch riwayat panjang
+BINANCE_PAGE_CONCURRENCY = int(os.getenv('ROSA_BINANCE_PAGE_CONCURRENCY', '4'))
+# Berapa kali halaman kosong di tengah rentang (error jaringan/rate limit) dicoba ulang sebelum fetch dianggap gagal
+BINANCE_PAGE_RETRIES = int(os.getenv('ROSA_BINANCE_PAGE_RETRIES', '2'))
+# Jumlah candle maksimum yang boleh diminta lewat /rosa candles:
+MAX_CANDLES = int(os.getenv('ROSA_MAX_CANDLES', '5000'))
+
+# Jumlah maksimum entri OHLCV yang disimpan di memori
+OHLCV_CACHE_MAX_ENTRIES = int(os.getenv('OHLCV_CACHE_MAX_ENTRIES', '256'))
+# Berapa lama (detik) hasil tool harga terkini boleh dipakai ulang; tidak mengikuti penutupan candle
+PRICE_CACHE_TTL = float(os.getenv('ROSA_PRICE_CACHE_TTL', '5'))
+
+# Durasi satu candle (detik) untuk timeframe Binance dan Yahoo Finance
+TIMEFRAME_SECONDS = {
+    "1m": 60, "2m": 120, "3m": 180, "5m": 300, "15m": 900, "30m": 1800,
+    "60m": 3600, "90m": 5400, "1h": 3600, "2h": 7200, "4h": 14400,
+    "6h": 21600, "8h": 28800, "12h": 43200,
+    "1d": 86400, "3d": 259200, "5d": 432000,
+    "1w": 604800, "1wk": 604800,
+}
+
+# Candle mingguan Binance dibuka setiap Senin 00:00 UTC (epoch jatuh pada hari Kamis)
+WEEK_OFFSET_SECONDS = 4 * 86400
+
+
+def timeframe_to_seconds(timeframe: str):
+    """Mengembalikan durasi satu candle dalam detik, atau None jika timeframe tidak dikenal."""
+    return TIMEFRAME_SECONDS.get(timeframe)
+
+
+def next_candle_close(timeframe: str, now: float = None) -> float:
+    """
+    Mengembalikan waktu (epoch detik, UTC) saat candle yang sedang berjalan pada timeframe ini ditutup.
+    """
+    now = time.time() if now is None else now
+
+    if timeframe in ("1M", "1mo", "3mo"):
+        months = 3 if timeframe == "3mo" else 1
+        current = datetime.fromtimestamp(now, tz=timezone.utc)
+        month_index = current.year * 12 + current.month - 1
+        month_index = month_index - month_index % months + months
+        return datetime(month_index // 12, month_index % 12 + 1, 1, tzinfo=timezone.utc).timestamp()
+
+    seconds = timeframe_to_seconds(timeframe)
+    if seconds is None:
+        # Timeframe tidak dikenal: anggap data valid selama satu menit
+        return now + 60
+
+    offset = WEEK_OFFSET_SECONDS if seconds == 604800 else 0
+    return ((now - offset) // seconds + 1) * seconds + offset
+
+
+def resample_ohlcv(df: pd.DataFrame, timeframe: str, start=None) -> pd.DataFrame:
+    """
+    Membentuk candle timeframe yang lebih tinggi dari candle timeframe yang lebih rendah
+    (open pertama, high tertinggi, low terendah, close terakhir, volume dijumlah).
+    Batas candle mengikuti Binance: kelipatan durasi sejak epoch, minggu dimulai hari Senin,
+    bulan dimulai tanggal 1. Candle pertama yang datanya tidak lengkap dibuang; candle terakhir
+    adalah candle yang masih berjalan. Jika `start` (awal sebuah candle) diberikan, `df` dianggap
+    lengkap sejak `start` sehingga hanya candle yang dimulai sebelum `start` yang dibuang.
+    """
+    if timeframe in ("1M", "1mo"):
+        rule, options = "MS", {}
+    elif timeframe == "3mo":
+        rule, options = "QS", {}
+    else:
+        seconds = timeframe_to_seconds(timeframe)
+        if seconds is None:
+            raise ValueError(f"Timeframe tidak dikenal: {timeframe}")
+        if seconds == 604800:
+            rule, options = "W-MON", {"closed": "left", "label": "left"}
+        else:
+            rule, options = f"{seconds}s", {"origin": "epoch"}
+
+    aggregation = {"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"}
+    resampled = df[list(aggregation)].resample(rule, **options).agg(aggregation).dropna(subset=["open"])
+    first_complete = df.index[0] if start is None else start
+    if len(resampled) and resampled.index[0] < first_complete:
+        resampled = resampled.iloc[1:]
+    resampled.index.name = df.index.name
+    return resampled
+
+
+class OHLCVCache:
+    """
+    Cache OHLCV di memori dengan batas LRU. Setiap entri kedaluwarsa ketika candle berikutnya
+    pada timeframe-nya ditutup (atau setelah `ttl` detik jika diberikan, misalnya untuk harga
+    terkini), dan permintaan identik yang datang bersamaan digabungkan menjadi satu fetch
+    yang sedang berjalan.
+    """
+
+    def __init__(self, max_entries: int = OHLCV_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, DataFrame)
+        self._inflight = {}  # key -> asyncio.Task
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _store(self, key, timeframe: str, ttl: float, task: asyncio.Task):
+        self._inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        df = task.result()
+        # Jangan simpan hasil kosong (error jaringan, simbol tidak valid, dll.)
+        if df is None or df.empty:
+            return
+        expires_at = time.time() + ttl if ttl is not None else next_candle_close(timeframe)
+        self._entries[key] = (expires_at, df)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_fetch(self, key, timeframe: str, fetch, ttl: float = None) -> pd.DataFrame:
+        """
+        Mengembalikan salinan DataFrame dari cache jika masih valid, atau menjalankan
+        `fetch()` (coroutine function) dan menyimpan hasilnya.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, df = entry
+            if time.time() < expires_at:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return df.copy()
+            del self._entries[key]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(fetch())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._store(key, timeframe, ttl, t))
+
+        # shield: pembatalan satu pemanggil tidak membatalkan fetch milik pemanggil lain
+        df = await asyncio.shield(task)
+        return df.copy()
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        requests = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": (self.hits + self.coalesced) / requests if requests else 0.0,
+        }
+
+
+ohlcv_cache = OHLCVCache()
+
+
+class KlineSeriesStore:
+    """
+    Menyimpan DataFrame terakhir per (source, symbol, timeframe) untuk mode incremental,
+    dibatasi secara LRU seperti OHLCVCache.
+    """
+
+    def __init__(self, max_entries: int = OHLCV_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._series = OrderedDict()  # key -> (window, DataFrame)
+
+    def get(self, key):
+        entry = self._series.get(key)
+        if entry is not None:
+            self._series.move_to_end(key)
+        return entry
+
+    def put(self, key, window: int, df: pd.DataFrame):
+        self._series[key] = (window, df)
+        self._series.move_to_end(key)
+        while len(self._series) > self.max_entries:
+            self._series.popitem(last=False)
+
+    def clear(self):
+        self._series.clear()
+
+
+kline_series_store = KlineSeriesStore()
+
+
+def merge_klines(cached: pd.DataFrame, new: pd.DataFrame, window: int) -> pd.DataFrame:
+    """
+    Menggabungkan candle baru ke seri yang tersimpan. Candle lama dengan timestamp yang sama
+    atau lebih baru dari candle pertama `new` (termasuk candle terakhir yang masih berjalan)
+    diganti, lalu hasilnya dipotong menjadi `window` candle terakhir.
+    """
+    if new.empty:
+        return cached.tail(window)
+    merged = pd.concat([cached[cached.index < new.index[0]], new])
+    merged = merged[~merged.index.duplicated(keep='last')]
+    return merged.tail(window)
+
+
+def _has_gap(cached: pd.DataFrame, timeframe: str, window: int) -> bool:
+    """True jika candle yang hilang sejak candle terakhir tersimpan lebih banyak dari window."""
+    seconds = timeframe_to_seconds(timeframe)
+    if seconds is None:
+        return True
+    return time.time() - cached.index[-1].timestamp() > seconds * (window - 1)
+
+
+async def get_binance_klines(symbol: str, timeframe: str, limit: int = 500, incremental: bool = False) -> pd.DataFrame:
+    key = ("binance", symbol.upper(), timeframe, limit)
+    if incremental:
+        fetch = lambda: _fetch_binance_klines_incremental(symbol, timeframe, limit)
+    else:
+        fetch = lambda: _fetch_binance_klines(symbol, timeframe, limit)
+    return await ohlcv_cache.get_or_fetch(key, timeframe, fetch)
+
+
+async def get_yfinance_data(symbol: str, timeframe: str, incremental: bool = False) -> pd.DataFrame:
+    key = ("yfinance", symbol.upper(), timeframe, None)
+    if incremental:
+        fetch = lambda: _fetch_yfinance_data_incremental(symbol, timeframe)
+    else:
+        fetch = lambda: _fetch_yfinance_data(symbol, timeframe)
+    return await ohlcv_cache.get_or_fetch(key, timeframe, fetch)
+
+
+# Sumber data untuk setiap jenis aset yang didukung /rosa, /watch dan /scan
+ASSET_SOURCES = {"crypto": "binance", "forex": "yfinance", "metals": "yfinance", "energy": "yfinance"}
+
+
+async def get_market_data(source: str, symbol: str, timeframe: str) -> pd.DataFrame:
+    """Mengambil OHLCV dari `source` ("binance" atau "yfinance") dalam mode incremental lewat cache bersama."""
+    if source == "binance":
+        return await get_binance_klines(symbol, timeframe, incremental=True)
+    return await get_yfinance_data(symbol, timeframe, incremental=True)
+
+
+async def _stored_series(key, limit: int = None):
+    """
+    Seri dari store disk dalam format entri kline_series_store, dipakai ketika seri belum ada di
+    memori (misalnya setelah bot restart) agar cukup mengambil candle yang baru.
+    """
+    window, stored = await ohlcv_store.load(key, limit)
+    if stored.empty:
+        return None
+    return (len(stored) if limit is not None else window), stored
+
+
+def _is_continuation(entry, df: pd.DataFrame) -> bool:
+    """True jika `df` bersambung (tumpang tindih) dengan seri tersimpan `entry`."""
+    return entry is not None and not df.empty and df.index[0] <= entry[1].index[-1]
+
+
+async def _fetch_binance_klines_incremental(symbol: str, timeframe: str, limit: int) -> pd.DataFrame:
+    """
+    Hanya mengambil candle sejak timestamp terakhir yang tersimpan (di memori atau di disk).
+    Fetch penuh dilakukan jika belum ada seri tersimpan, seri lebih pendek dari `limit`,
+    atau jarak waktunya melebihi window.
+    """
+    key = ("binance", symbol.upper(), timeframe)
+    entry = kline_series_store.get(key) or await _stored_series(key, limit)
+    if entry is None or entry[0] < limit or _has_gap(entry[1], timeframe, entry[0]):
+        df = await _fetch_binance_klines(symbol, timeframe, limit)
+        # Seri yang lebih pendek dari `limit` (simbol baru listing) disimpan dengan window sepanjang
+        # isinya, agar tidak dianggap lengkap dan permintaan berikutnya kembali melakukan fetch penuh
+        window, new = min(limit, len(df)), df
+    else:
+        window, cached = entry
+        since = int(cached.index[-1].timestamp() * 1000)
+        # Ukuran fetch mengikuti window tersimpan (bisa lebih besar dari `limit` peminta saat ini):
+        # _has_gap hanya menjamin candle yang terlewat kurang dari window, bukan kurang dari `limit`.
+        # _fetch_binance_klines memotongnya menjadi jumlah candle sejak `since`
+        new = await _fetch_binance_klines(symbol, timeframe, window, since=since)
+        if new.empty:
+            return new
+        df = merge_klines(cached, new, window)
+
+    if not df.empty:
+        kline_series_store.put(key, window, df)
+        # Hanya candle baru yang ditulis ke disk; seri diganti jika fetch penuh tidak bersambung
+        await ohlcv_store.save(key, new, window, replace=not _is_continuation(entry, new))
+    return df.tail(limit)
+
+
+async def _fetch_yfinance_data_incremental(symbol: str, timeframe: str) -> pd.DataFrame:
+    """Versi incremental get_yfinance_data; window mengikuti panjang hasil fetch penuh pertama."""
+    key = ("yfinance", symbol.upper(), timeframe)
+    entry = kline_series_store.get(key) or await _stored_series(key)
+    if entry is None or _has_gap(entry[1], timeframe, entry[0]):
+        df = await _fetch_yfinance_data(symbol, timeframe)
+        window, new = len(df), df
+    else:
+        window, cached = entry
+        # Untuk 4h, timestamp terakhir adalah awal candle 4h terakhir, sehingga semua candle 60m
+        # candle tersebut diambil ulang dan candle 4h itu dibentuk ulang secara lengkap
+        new = await _fetch_yfinance_data(symbol, timeframe, start=cached.index[-1])
+        if new.empty:
+            return new
+        df = merge_klines(cached, new, window)
+
+    if not df.empty:
+        kline_series_store.put(key, window, df)
+        await ohlcv_store.save(key, new, window, replace=not _is_continuation(entry, new))
+    return df
+
+
+async def _fetch_binance_klines(symbol: str, timeframe: str, limit: int = 500, since: int = None) -> pd.DataFrame:
+    """
+    Mengambil `limit` candle terakhir (atau `limit` candle mulai dari `since`, epoch ms).
+    Permintaan di atas BINANCE_PAGE_LIMIT dipecah menjadi beberapa halaman berdasarkan waktu
+    yang diambil paralel (dibatasi BINANCE_PAGE_CONCURRENCY; ccxt tetap menjaga rate limit
+    Binance), lalu disambung menjadi satu DataFrame tanpa candle ganda.
+    """
+    seconds = timeframe_to_seconds(timeframe)
+    if limit <= BINANCE_PAGE_LIMIT or seconds is None:
+        return await _fetch_binance_page(symbol, timeframe, min(limit, BINANCE_PAGE_LIMIT), since)
+
+    step = seconds * 1000
+    now = int(time.time() * 1000)
+    latest = since is None
+    if latest:
+        # Candle terakhir adalah candle yang sedang berjalan
+        current_open = int(next_candle_close(timeframe, now / 1000) * 1000) - step
+        since = current_open - (limit - 1) * step
+    else:
+        limit = max(1, min(limit, (now - since) // step + 1))
+
+    starts = range(since, since + limit * step, BINANCE_PAGE_LIMIT * step)
+    semaphore = asyncio.Semaphore(max(1, BINANCE_PAGE_CONCURRENCY))
+
+    async def fetch_page(start: int):
+        async with semaphore:
+            page_limit = min(BINANCE_PAGE_LIMIT, (since + limit * step - start) // step)
+            return await _fetch_binance_page(symbol, timeframe, page_limit, start)
+
+    pages = list(await asyncio.gather(*(fetch_page(start) for start in starts)))
+
+    # Halaman kosong hanya wajar di awal rentang, sebelum simbol listing. Halaman kosong setelah
+    # halaman berisi berarti error (_fetch_binance_page mengembalikan DataFrame kosong): coba ulang,
+    # dan jika tetap kosong gagalkan seluruh fetch agar seri berlubang tidak di-cache atau disimpan
+    first = next((i for i, page in enumerate(pages) if not page.empty), None)
+    if first is None:
+        return pd.DataFrame()
+    for i in range(first + 1, len(pages)):
+        for attempt in range(BINANCE_PAGE_RETRIES):
+            if not pages[i].empty:
+                break
+            await asyncio.sleep(attempt + 1)
+            pages[i] = await fetch_page(starts[i])
+        if pages[i].empty:
+            print(f"Binance page {i + 1}/{len(pages)} for {symbol} {timeframe} stayed empty; fetch failed")
+            return pd.DataFrame()
+    # Jika halaman berisi pertama sudah punya candle tepat di awal halamannya, simbol sudah listing
+    # sebelumnya, sehingga halaman kosong sebelumnya kemungkinan error: coba sekali lagi
+    while first > 0 and int(pages[first].index[0].timestamp() * 1000) <= starts[first]:
+        previous = await fetch_page(starts[first - 1])
+        if previous.empty:
+            break
+        first -= 1
+        pages[first] = previous
+    pages = pages[first:]
+
+    df = pd.concat(pages)
+    df = df[~df.index.duplicated(keep='last')].sort_index()
+    return df.tail(limit) if latest else df.head(limit)
+
+
+async def _fetch_binance_page(symbol: str, timeframe: str, limit: int = 500, since: int = None) -> pd.DataFrame:
+    exchange = await binance_manager.get_exchange()
     try:
         # ccxt memerlukan symbol dalam format 'BTC/USDT'
         # Ubah BTCUSDT menjadi BTC/USDT
@@ -23,7 +459,7 @@ async def get_binance_klines(symbol: str, timeframe: str, limit: int = 500) -> p
         else:
             formatted_symbol = symbol # Biarkan seperti apa adanya jika tidak cocok
 
-        ohlcv = await exchange.fetch_ohlcv(formatted_symbol, timeframe, limit=limit)
+        ohlcv = await exchange.fetch_ohlcv(formatted_symbol, timeframe, since=since, limit=limit)
         df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
         df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
         df.set_index('timestamp', inplace=True)
@@ -42,11 +478,9 @@ async def get_binance_klines(symbol: str, timeframe: str, limit: int = 500) -> p
     except Exception as e:
         print(f"An unexpected error occurred with Binance API: {e}")
         return pd.DataFrame()
-    finally:
-        await exchange.close()
 
 # Fungsi get_yfinance_data (MODIFIKASI PENTING DI SINI)
-async def get_yfinance_data(symbol: str, timeframe: str) -> pd.DataFrame:
+async def _fetch_yfinance_data(symbol: str, timeframe: str, start=None) -> pd.DataFrame:
     symbol = symbol.upper()
     try:
         interval_map = {
@@ -79,6 +513,12 @@ async def get_yfinance_data(symbol: str, timeframe: str) -> pd.DataFrame:
             'interval': yf_interval,
             'period': fetch_period
         }
+        if start is not None:
+            # Mode incremental: hanya ambil candle sejak timestamp terakhir yang tersimpan
+            history_args = {
+                'interval': yf_interval,
+                'start': start
+            }
 
         # Panggil ticker.history() menggunakan asyncio.to_thread
         df = await asyncio.to_thread(ticker.history, **history_args)
@@ -90,6 +530,11 @@ async def get_yfinance_data(symbol: str, timeframe: str) -> pd.DataFrame:
         # Pastikan kolom adalah lowercase
         df.columns = [col.lower() for col in df.columns]
         df.index.name = 'timestamp'
+        if timeframe == "4h":
+            # Yahoo Finance tidak punya interval 4h: bentuk dari candle 60m. Pada mode incremental
+            # `start` adalah awal candle 4h, jadi candle pertama tidak boleh dibuang walaupun bar 60m
+            # pertamanya dimulai setelah `start` (misalnya bar saham AS yang dimulai menit :30)
+            df = resample_ohlcv(df, timeframe, start)
         return df
     except Exception as e:
         print(f"Error fetching yfinance data for {symbol}: {e}")
@@ -117,7 +562,11 @@ async def get_current_crypto_price(symbol: str) -> str:
         potential_symbols.append(symbol_upper)
 
     for binance_symbol_try in potential_symbols:
-        df = await get_binance_klines(binance_symbol_try, '1m', limit=1)
+        # Kunci terpisah dari seri OHLCV dengan TTL pendek: candle 1m yang masih berjalan terus berubah
+        df = await ohlcv_cache.get_or_fetch(
+            ("price", "binance", binance_symbol_try), '1m',
+            lambda: _fetch_binance_klines(binance_symbol_try, '1m', limit=1), ttl=PRICE_CACHE_TTL,
+        )
         if not df.empty:
             price = df['close'].iloc[-1]
             # Berikan respons yang jelas, menggunakan simbol yang dikenali pengguna
@@ -150,7 +599,11 @@ async def get_current_stock_forex_price(symbol: str, timeframe: str = "1d") -> s
     elif symbol_upper in ['SPX', 'S&P500']:
         yahoo_symbol = '^GSPC' # S&P 500 Index
 
-    df = await get_yfinance_data(yahoo_symbol, timeframe)
+    # Close candle yang masih berjalan (untuk 1d bisa berubah sepanjang hari), jadi hanya di-cache sebentar
+    df = await ohlcv_cache.get_or_fetch(
+        ("price", "yfinance", yahoo_symbol, timeframe), timeframe,
+        lambda: _fetch_yfinance_data(yahoo_symbol, timeframe), ttl=PRICE_CACHE_TTL,
+    )
     if not df.empty:
         price = df['close'].iloc[-1]
         return f"Harga penutupan terakhir {symbol_upper} ({yahoo_symbol}) adalah ${price:.2f}."
@@ -4,16 +4,36 @@ import os
 from dotenv import load_dotenv
 
 from commands import setup_commands
+from data_retrieval import binance_manager
+from compute_pool import compute_stage
+from market_watcher import market_watcher
 
 load_dotenv()
 
+
+class RosaBot(commands.Bot):
+    async def setup_hook(self):
+        # Buat client Binance sekali di awal agar koneksi dan metadata market dipakai ulang
+        await binance_manager.start()
+        # Siapkan process pool untuk analisis SMC dan render grafik
+        compute_stage.start()
+        # Mulai scheduler /watch yang mengambil data setiap penutupan candle
+        market_watcher.start(self)
+
+    async def close(self):
+        await market_watcher.close()
+        await binance_manager.close()
+        await compute_stage.close()
+        await super().close()
+
+
 # Konfigurasi intents untuk Discord bot
 intents = discord.Intents.default()
 intents.message_content = True  # Diperlukan untuk mengakses konten pesan, jika Anda menggunakannya di masa depan
 intents.members = True # Diperlukan jika Anda ingin mengambil informasi member
 
 # Inisialisasi bot
-bot = commands.Bot(command_prefix="!", intents=intents)
+bot = RosaBot(command_prefix="!", intents=intents)
 
 @bot.event
 async def on_ready():
@@ -0,0 +1,125 @@
+import asyncio
+import os
+import re
+
+import numpy as np
+
+from compute_pool import compute_stage, frame_to_arrays, arrays_to_frame
+from data_retrieval import get_market_data, ASSET_SOURCES
+from smc_analysis import active_zones, zone_distance
+from smc_pipeline import SMCPipeline
+
+# Jumlah simbol maksimum dalam satu /scan
+SCAN_MAX_SYMBOLS = int(os.getenv('ROSA_SCAN_MAX_SYMBOLS', '50'))
+# Jumlah fetch data pasar paralel maksimum dalam satu /scan
+SCAN_FETCH_CONCURRENCY = int(os.getenv('ROSA_SCAN_FETCH_CONCURRENCY', '8'))
+# Jumlah baris hasil yang ditampilkan
+SCAN_TOP_RESULTS = int(os.getenv('ROSA_SCAN_TOP_RESULTS', '15'))
+
+# Watchlist bawaan yang bisa dipakai sebagai pengganti daftar simbol
+WATCHLISTS = {
+    "crypto": {
+        "top10": ["BTCUSDT", "ETHUSDT", "BNBUSDT", "SOLUSDT", "XRPUSDT", "DOGEUSDT", "ADAUSDT", "TRXUSDT", "AVAXUSDT", "LINKUSDT"],
+        "layer1": ["BTCUSDT", "ETHUSDT", "SOLUSDT", "AVAXUSDT", "ADAUSDT", "DOTUSDT", "NEARUSDT", "APTUSDT", "SUIUSDT", "ATOMUSDT"],
+        "defi": ["UNIUSDT", "AAVEUSDT", "MKRUSDT", "LDOUSDT", "CRVUSDT", "COMPUSDT", "SNXUSDT", "DYDXUSDT"],
+    },
+    "forex": {
+        "majors": ["EURUSD=X", "GBPUSD=X", "USDJPY=X", "USDCHF=X", "AUDUSD=X", "USDCAD=X", "NZDUSD=X"],
+        "crosses": ["EURJPY=X", "GBPJPY=X", "EURGBP=X", "AUDJPY=X", "EURAUD=X", "GBPAUD=X"],
+    },
+    "metals": {
+        "metals": ["GC=F", "SI=F", "PL=F", "PA=F", "HG=F"],
+    },
+    "energy": {
+        "energy": ["CL=F", "BZ=F", "NG=F", "RB=F", "HO=F"],
+    },
+}
+
+
+def resolve_symbols(jenis_aset: str, simbol: str) -> list:
+    """Mengubah nama watchlist atau daftar simbol (dipisah koma/spasi) menjadi daftar simbol unik."""
+    watchlist = WATCHLISTS.get(jenis_aset, {}).get(simbol.strip().lower())
+    if watchlist is not None:
+        return list(watchlist)
+    symbols = [s.upper() for s in re.split(r"[,\s]+", simbol) if s]
+    return list(dict.fromkeys(symbols))
+
+
+def _nearest_zone(arrays: dict):
+    """
+    Job worker: cari zona FVG/OB yang belum dimitigasi paling dekat dengan harga penutupan terakhir.
+    Mengembalikan dict hasil (jarak dalam persen, 0 jika harga berada di dalam zona).
+    """
+    df = arrays_to_frame(arrays)
+    indicators = SMCPipeline(df).run(["fvg", "ob"])
+    close = float(df["close"].iloc[-1])
+
+    best = None
+    for zone in active_zones(indicators["fvg"], indicators["ob"]):
+        position, distance = zone_distance(zone, close)
+        if best is None or distance < best["distance"]:
+            best = {**zone, "position": position, "distance": distance}
+
+    return {"close": close, "zone": best}
+
+
+async def scan_markets(jenis_aset: str, timeframe: str, symbols: list) -> tuple:
+    """
+    Menjalankan scan SMC untuk banyak simbol sekaligus. Fetch berjalan paralel (dibatasi
+    SCAN_FETCH_CONCURRENCY) dan perhitungan zona berjalan di process pool (dibatasi jumlah worker
+    agar /rosa pengguna lain tetap mendapat tempat di antrean).
+    Mengembalikan (hasil terurut dari zona terdekat, daftar (simbol, alasan) yang gagal).
+    """
+    source = ASSET_SOURCES[jenis_aset]
+    fetch_slots = asyncio.Semaphore(max(1, SCAN_FETCH_CONCURRENCY))
+    compute_slots = asyncio.Semaphore(compute_stage.max_workers)
+
+    async def scan_symbol(symbol: str):
+        async with fetch_slots:
+            data = await get_market_data(source, symbol, timeframe)
+        if data is None or data.empty:
+            raise LookupError("data tidak tersedia")
+        async with compute_slots:
+            result = await compute_stage.submit(_nearest_zone, frame_to_arrays(data))
+        return {"symbol": symbol, **result}
+
+    outcomes = await asyncio.gather(*(scan_symbol(symbol) for symbol in symbols), return_exceptions=True)
+
+    results, failed = [], []
+    for symbol, outcome in zip(symbols, outcomes):
+        if isinstance(outcome, BaseException):
+            failed.append((symbol, str(outcome) or type(outcome).__name__))
+        else:
+            results.append(outcome)
+
+    # Simbol tanpa zona aktif diletakkan paling bawah
+    results.sort(key=lambda r: r["zone"]["distance"] if r["zone"] is not None else np.inf)
+    return results, failed
+
+
+def format_scan(jenis_aset: str, timeframe: str, results: list, failed: list) -> str:
+    """Menyusun teks hasil /scan."""
+    lines = [
+        f"**Hasil Scan SMC {jenis_aset} ({timeframe}):** {len(results)} simbol, "
+        "diurutkan dari yang paling dekat dengan zona FVG/OB yang belum dimitigasi\n"
+    ]
+    for rank, result in enumerate(results[:SCAN_TOP_RESULTS], 1):
+        zone = result["zone"]
+        prefix = f"{rank}. `{result['symbol']}` `{result['close']:.2f}`"
+        if zone is None:
+            lines.append(f"{prefix} — tidak ada zona FVG/OB aktif")
+            continue
+        direction = "Bullish" if zone["direction"] == 1 else "Bearish"
+        area = f"{zone['kind']} {direction} `{zone['bottom']:.2f} - {zone['top']:.2f}`"
+        if zone["position"] == "inside":
+            lines.append(f"{prefix} — di dalam {area}")
+        else:
+            side = "di atas" if zone["position"] == "above" else "di bawah"
+            lines.append(f"{prefix} — {zone['distance']:.2f}% {side} {area}")
+
+    if len(results) > SCAN_TOP_RESULTS:
+        lines.append(f"... dan {len(results) - SCAN_TOP_RESULTS} simbol lainnya")
+    if failed:
+        lines.append("\nGagal: " + ", ".join(f"`{symbol}` ({reason})" for symbol, reason in failed))
+
+    return "\n".join(lines)[:2000]
@@ -0,0 +1,265 @@
+import asyncio
+import os
+import time
+
+import discord
+import pandas as pd
+
+from data_retrieval import get_market_data, next_candle_close, ASSET_SOURCES, TIMEFRAME_SECONDS
+from smc_stream import smc_streams
+
+# Jeda (detik) setelah candle ditutup sebelum data diambil, agar bursa sempat memfinalkan candle
+WATCH_CLOSE_DELAY = float(os.getenv('ROSA_WATCH_CLOSE_DELAY', '5'))
+# Jumlah maksimum langganan /watch per pengguna
+WATCH_MAX_PER_USER = int(os.getenv('ROSA_WATCH_MAX_PER_USER', '10'))
+# Jumlah pasar (sumber, simbol, timeframe) maksimum yang dipantau seluruh bot; satu stream SMC per pasar
+WATCH_MAX_MARKETS = int(os.getenv('ROSA_WATCH_MAX_MARKETS', '256'))
+# Jumlah fetch paralel maksimum dalam satu putaran scheduler
+WATCH_FETCH_CONCURRENCY = int(os.getenv('ROSA_WATCH_FETCH_CONCURRENCY', '8'))
+# Jumlah baris event maksimum dalam satu pesan alert
+WATCH_MAX_ALERT_LINES = 15
+
+# Sumber data yang candle-nya dibuka tepat pada kelipatan timeframe sejak epoch UTC (seperti next_candle_close).
+# Yahoo Finance tidak: candle harian forex dibuka 22:00/23:00 UTC, bar 60m saham AS dimulai pada menit :30
+UTC_ALIGNED_SOURCES = {"binance"}
+
+# Event stream SMC yang dikirim sebagai alert
+ALERT_EVENTS = {("bos", "new"), ("choch", "new"), ("fvg", "mitigated"), ("liquidity", "swept")}
+
+
+class WatchLimitError(Exception):
+    """Dilempar ketika pengguna sudah mencapai WATCH_MAX_PER_USER langganan."""
+
+
+class WatchCapacityError(Exception):
+    """Dilempar ketika bot sudah memantau WATCH_MAX_MARKETS pasar dan pasar baru diminta."""
+
+
+def is_supported_timeframe(timeframe: str) -> bool:
+    """True jika waktu penutupan candle timeframe ini bisa dihitung oleh scheduler."""
+    return timeframe in TIMEFRAME_SECONDS or timeframe in ("1M", "1mo", "3mo")
+
+
+def closed_candles(df: pd.DataFrame, timeframe: str, aligned: bool = True, now: float = None) -> pd.DataFrame:
+    """
+    Membuang candle yang masih berjalan dari akhir DataFrame. Candle yang sudah diikuti candle lain
+    pasti sudah ditutup; candle terakhir hanya dianggap ditutup jika sumbernya `aligned` (candle
+    mengikuti batas UTC) dan waktu tutupnya sudah lewat. Untuk sumber lain candle terakhir selalu
+    dibuang, karena waktu tutupnya tidak bisa dihitung dari timeframe saja.
+    """
+    if df.empty:
+        return df
+    now = time.time() if now is None else now
+    last_closed = aligned and next_candle_close(timeframe, df.index[-1].timestamp()) <= now
+    return df if last_closed else df.iloc[:-1]
+
+
+def format_alert(symbol: str, timeframe: str, events: list, last_close: float) -> str:
+    """Menyusun teks alert untuk event SMC baru pada satu pasar."""
+    lines = []
+    for event in events:
+        direction = "Bullish" if event["direction"] == 1 else "Bearish"
+        if event["type"] == "bos":
+            lines.append(f"- Break of Structure (BOS) {direction} menembus level `{event['level']:.2f}`")
+        elif event["type"] == "choch":
+            lines.append(f"- Change of Character (CHoCH) {direction} menembus level `{event['level']:.2f}`")
+        elif event["type"] == "fvg":
+            lines.append(f"- FVG {direction} `{event['bottom']:.2f} - {event['top']:.2f}` telah terisi")
+        elif event["type"] == "liquidity":
+            lines.append(f"- Likuiditas {direction} di sekitar `{event['level']:.2f}` telah tersapu")
+
+    if len(lines) > WATCH_MAX_ALERT_LINES:
+        hidden = len(lines) - WATCH_MAX_ALERT_LINES
+        lines = lines[:WATCH_MAX_ALERT_LINES] + [f"- ... dan {hidden} event lainnya"]
+
+    return (
+        f"🔔 **Alert SMC {symbol} ({timeframe}):**\n"
+        + "\n".join(lines)
+        + f"\n\n**Harga Penutupan Terakhir:** `{last_close:.2f}`"
+    )
+
+
+class MarketWatcher:
+    """
+    Scheduler latar belakang untuk /watch. Langganan dikelompokkan per (sumber, simbol, timeframe)
+    sehingga setiap pasar hanya di-fetch sekali per penutupan candle, berapa pun jumlah
+    pelanggannya. Candle yang sudah ditutup diteruskan ke stream SMC incremental, dan alert
+    hanya dikirim ketika candle baru menghasilkan event struktur baru.
+    """
+
+    def __init__(self, close_delay: float = WATCH_CLOSE_DELAY, max_per_user: int = WATCH_MAX_PER_USER,
+                 fetch_concurrency: int = WATCH_FETCH_CONCURRENCY, max_markets: int = WATCH_MAX_MARKETS):
+        self.close_delay = close_delay
+        self.max_per_user = max_per_user
+        self.max_markets = max(1, max_markets)
+        # Registry harus muat satu stream untuk setiap pasar yang dipantau; jika tidak, LRU membuang
+        # stream sebelum poll berikutnya dan pasar itu tidak pernah menghasilkan alert
+        smc_streams.max_entries = max(smc_streams.max_entries, self.max_markets)
+        self.fetch_concurrency = max(1, fetch_concurrency)
+        self._subscriptions = {}  # (source, symbol, timeframe) -> {(channel_id, user_id): jenis_aset}
+        self._next_poll = {}  # (source, symbol, timeframe) -> epoch detik
+        self._changed = asyncio.Event()
+        self._task = None
+        self._bot = None
+        self.polls = 0
+        self.alerts = 0
+
+    def start(self, bot):
+        self._bot = bot
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            task, self._task = self._task, None
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    @staticmethod
+    def market_key(jenis_aset: str, symbol: str, timeframe: str):
+        return ASSET_SOURCES[jenis_aset], symbol, timeframe
+
+    async def fetch(self, key) -> pd.DataFrame:
+        """Mengambil OHLCV untuk satu pasar lewat cache bersama (dipakai juga oleh /rosa)."""
+        return await get_market_data(*key)
+
+    def prime(self, key, df: pd.DataFrame):
+        """Mengisi stream SMC pasar yang belum punya stream dari data yang sudah diambil, tanpa mengirim alert."""
+        source, symbol, timeframe = key
+        if smc_streams.get(f"{source}:{symbol}", timeframe) is None:
+            smc_streams.sync(f"{source}:{symbol}", timeframe, closed_candles(df, timeframe, source in UTC_ALIGNED_SOURCES))
+
+    def subscribe(self, jenis_aset: str, symbol: str, timeframe: str, channel_id: int, user_id: int) -> bool:
+        """Menambahkan langganan. Mengembalikan False jika langganan yang sama sudah ada."""
+        key = self.market_key(jenis_aset, symbol, timeframe)
+        if (channel_id, user_id) in self._subscriptions.get(key, {}):
+            return False
+        if len(self.subscriptions_for(user_id)) >= self.max_per_user:
+            raise WatchLimitError(f"Maksimum {self.max_per_user} langganan per pengguna.")
+        if key not in self._subscriptions and len(self._subscriptions) >= self.max_markets:
+            raise WatchCapacityError(f"Bot sudah memantau maksimum {self.max_markets} pasar.")
+
+        self._subscriptions.setdefault(key, {})[(channel_id, user_id)] = jenis_aset
+        if key not in self._next_poll:
+            self._next_poll[key] = next_candle_close(timeframe) + self.close_delay
+            self._changed.set()
+        return True
+
+    def unsubscribe(self, jenis_aset: str, symbol: str, timeframe: str, channel_id: int, user_id: int) -> bool:
+        """Menghapus langganan. Mengembalikan False jika langganan tidak ditemukan."""
+        key = self.market_key(jenis_aset, symbol, timeframe)
+        subscribers = self._subscriptions.get(key)
+        if not subscribers or subscribers.pop((channel_id, user_id), None) is None:
+            return False
+        if not subscribers:
+            self._drop_market(key)
+        return True
+
+    def _drop_market(self, key):
+        source, symbol, timeframe = key
+        self._subscriptions.pop(key, None)
+        self._next_poll.pop(key, None)
+        smc_streams.discard(f"{source}:{symbol}", timeframe)
+
+    def subscriptions_for(self, user_id: int) -> list:
+        """Daftar (jenis_aset, simbol, timeframe, channel_id) milik satu pengguna."""
+        return [
+            (jenis_aset, symbol, timeframe, channel_id)
+            for (_, symbol, timeframe), subscribers in self._subscriptions.items()
+            for (channel_id, subscriber_id), jenis_aset in subscribers.items()
+            if subscriber_id == user_id
+        ]
+
+    def stats(self) -> dict:
+        return {
+            "markets": len(self._subscriptions),
+            "max_markets": self.max_markets,
+            "subscriptions": sum(len(subscribers) for subscribers in self._subscriptions.values()),
+            "polls": self.polls,
+            "alerts": self.alerts,
+        }
+
+    async def _run(self):
+        while True:
+            try:
+                now = time.time()
+                due = [key for key, at in self._next_poll.items() if at <= now]
+                if due:
+                    semaphore = asyncio.Semaphore(self.fetch_concurrency)
+
+                    async def poll_limited(key):
+                        async with semaphore:
+                            await self._poll(key)
+
+                    await asyncio.gather(*(poll_limited(key) for key in due))
+
+                self._changed.clear()
+                wake_at = min(self._next_poll.values(), default=None)
+                timeout = None if wake_at is None else max(0.0, wake_at - time.time())
+                try:
+                    # Bangun saat pasar berikutnya jatuh tempo, atau saat ada langganan baru
+                    await asyncio.wait_for(self._changed.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error in market watcher loop: {e}")
+                await asyncio.sleep(5)
+
+    async def _poll(self, key):
+        source, symbol, timeframe = key
+        if key not in self._subscriptions:
+            # Pasar sudah di-/unwatch setelah daftar jatuh tempo dibuat: jangan jadwalkan ulang
+            self._next_poll.pop(key, None)
+            return
+        # Jadwalkan penutupan candle berikutnya lebih dulu agar error tidak membuat pasar di-poll terus
+        self._next_poll[key] = next_candle_close(timeframe) + self.close_delay
+        self.polls += 1
+
+        try:
+            data = await self.fetch(key)
+        except Exception as e:
+            print(f"Error fetching watched market {symbol} {timeframe}: {e}")
+            return
+        if data is None or data.empty or key not in self._subscriptions:
+            return
+
+        closed = closed_candles(data, timeframe, source in UTC_ALIGNED_SOURCES)
+        if closed.empty:
+            return
+        events = smc_streams.sync(f"{source}:{symbol}", timeframe, closed)
+        events = [event for event in events if (event["type"], event["action"]) in ALERT_EVENTS]
+        if not events:
+            return
+
+        text = format_alert(symbol, timeframe, events, closed["close"].iloc[-1])
+        channels = {}
+        for channel_id, user_id in self._subscriptions.get(key, {}):
+            channels.setdefault(channel_id, []).append(user_id)
+        for channel_id, user_ids in channels.items():
+            await self._send(key, channel_id, user_ids, text)
+
+    async def _send(self, key, channel_id: int, user_ids: list, text: str):
+        mentions = " ".join(f"<@{user_id}>" for user_id in user_ids)
+        try:
+            channel = self._bot.get_channel(channel_id) or await self._bot.fetch_channel(channel_id)
+            await channel.send(f"{mentions}\n{text}")
+            self.alerts += 1
+        except (discord.NotFound, discord.Forbidden) as e:
+            # Channel dihapus atau bot tidak lagi punya akses: hentikan langganan di channel ini
+            print(f"Removing watches for channel {channel_id}: {e}")
+            subscribers = self._subscriptions.get(key, {})
+            for subscriber in [s for s in subscribers if s[0] == channel_id]:
+                del subscribers[subscriber]
+            if not subscribers:
+                self._drop_market(key)
+        except Exception as e:
+            print(f"Error sending watch alert to channel {channel_id}: {e}")
+
+
+# Satu watcher untuk seluruh proses bot
+market_watcher = MarketWatcher()
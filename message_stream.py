@@ -0,0 +1,69 @@
+import os
+import time
+
+import discord
+
+# Jarak minimum (detik) antar edit pesan saat jawaban di-stream, agar tidak terkena rate limit edit Discord
+STREAM_EDIT_INTERVAL = float(os.getenv('ROSA_STREAM_EDIT_INTERVAL', '1.0'))
+# Batas karakter satu pesan Discord
+DISCORD_MESSAGE_LIMIT = 2000
+
+
+def split_message(text: str, limit: int = DISCORD_MESSAGE_LIMIT) -> list:
+    """
+    Memecah teks menjadi beberapa bagian yang masing-masing paling banyak `limit` karakter,
+    sebisa mungkin di akhir baris atau spasi. Karena batas setiap bagian hanya bergantung pada
+    teks sebelumnya, bagian yang sudah penuh tidak berubah ketika teks bertambah panjang.
+    """
+    pages = []
+    while len(text) > limit:
+        # Utamakan baris baru, lalu spasi, asalkan bagian yang dihasilkan tidak terlalu pendek
+        cut = text.rfind("\n", 0, limit + 1)
+        if cut < limit // 2:
+            cut = text.rfind(" ", 0, limit + 1)
+        if cut < limit // 2:
+            cut = limit
+        pages.append(text[:cut])
+        # Baris baru atau spasi tempat teks dipotong tidak ikut ke bagian berikutnya
+        text = text[cut + 1:] if text[cut] in "\n " else text[cut:]
+    pages.append(text)
+    return pages
+
+
+class StreamingReply:
+    """
+    Menampilkan jawaban yang datang bertahap sebagai followup interaksi. Potongan pertama langsung
+    dikirim, selanjutnya pesan diedit paling sering sekali per `interval` detik. Jika teks melewati
+    batas 2000 karakter, sisanya dilanjutkan di pesan followup baru.
+    """
+
+    def __init__(self, interaction: discord.Interaction, interval: float = STREAM_EDIT_INTERVAL):
+        self.interaction = interaction
+        self.interval = interval
+        self.text = ""
+        self._messages = []  # (pesan, isi yang sedang ditampilkan)
+        self._flushed_at = None
+
+    async def append(self, text: str):
+        self.text += text
+        if self._flushed_at is None or time.monotonic() - self._flushed_at >= self.interval:
+            await self.flush()
+
+    async def flush(self):
+        self._flushed_at = time.monotonic()
+        pages = [page for page in split_message(self.text) if page.strip()]
+        for i, page in enumerate(pages):
+            if i < len(self._messages):
+                message, shown = self._messages[i]
+                if page != shown:
+                    await message.edit(content=page)
+                    self._messages[i] = (message, page)
+            else:
+                message = await self.interaction.followup.send(page)
+                self._messages.append((message, page))
+
+    async def finish(self, fallback: str = None):
+        """Menampilkan sisa teks; jika tidak ada teks sama sekali, kirim `fallback`."""
+        if not self.text.strip() and fallback:
+            self.text = fallback
+        await self.flush()
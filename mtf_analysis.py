@@ -0,0 +1,157 @@
+import os
+
+import pandas as pd
+
+from compute_pool import compute_stage, frame_to_arrays, arrays_to_frame
+from data_retrieval import resample_ohlcv, timeframe_to_seconds
+from smc_analysis import analyze_smc, active_zones, zone_distance
+
+# Jumlah candle timeframe dasar yang diambil untuk /rosa_mtf (crypto)
+MTF_BASE_CANDLES = int(os.getenv('ROSA_MTF_BASE_CANDLES', '3000'))
+# Jumlah timeframe maksimum dalam satu /rosa_mtf
+MTF_MAX_TIMEFRAMES = 4
+# Jumlah zona konfluensi yang ditampilkan
+MTF_MAX_ZONES = 5
+MTF_DEFAULT_TIMEFRAMES = "15m,1h,4h"
+
+
+def parse_timeframes(text: str) -> list:
+    """
+    Mengubah daftar timeframe (dipisah koma) menjadi list terurut dari yang terendah.
+    Setiap timeframe harus kelipatan timeframe terendah agar bisa dibentuk lewat resample.
+    """
+    timeframes = list(dict.fromkeys(tf.strip() for tf in text.split(",") if tf.strip()))
+    if not timeframes:
+        raise ValueError("Masukkan minimal satu timeframe.")
+    if len(timeframes) > MTF_MAX_TIMEFRAMES:
+        raise ValueError(f"Maksimum {MTF_MAX_TIMEFRAMES} timeframe per analisis.")
+
+    unknown = [tf for tf in timeframes if timeframe_to_seconds(tf) is None]
+    if unknown:
+        raise ValueError(f"Timeframe tidak didukung: {', '.join(unknown)}")
+
+    timeframes.sort(key=timeframe_to_seconds)
+    base_seconds = timeframe_to_seconds(timeframes[0])
+    for tf in timeframes[1:]:
+        if timeframe_to_seconds(tf) % base_seconds != 0:
+            raise ValueError(f"Timeframe `{tf}` bukan kelipatan `{timeframes[0]}`.")
+    return timeframes
+
+
+def mtf_swing_length(candles: int) -> int:
+    """Swing length untuk timeframe hasil resample yang candlenya lebih sedikit (maksimum 50 seperti /rosa)."""
+    return min(50, max(5, candles // 10))
+
+
+def structure_bias(bos_choch_data: pd.DataFrame):
+    """Mengembalikan (arah, jenis, level) dari BOS/CHoCH terakhir, atau None jika belum ada."""
+    events = bos_choch_data[bos_choch_data["BOS"].notna() | bos_choch_data["CHOCH"].notna()]
+    if events.empty:
+        return None
+    last = events.iloc[-1]
+    if pd.notna(last["BOS"]):
+        return int(last["BOS"]), "BOS", float(last["Level"])
+    return int(last["CHOCH"]), "CHoCH", float(last["Level"])
+
+
+def find_confluence(zones_by_timeframe: dict, close: float) -> list:
+    """
+    Mencari area tempat zona FVG/OB searah dari timeframe berbeda saling tumpang tindih.
+    Irisan setiap pasangan zona digabung bila saling bersinggungan; hasil diurutkan dari jumlah
+    timeframe terbanyak, lalu dari yang paling dekat dengan harga.
+    """
+    entries = [(tf, zone) for tf, zones in zones_by_timeframe.items() for zone in zones]
+    overlaps = []
+    for a, (tf_a, zone_a) in enumerate(entries):
+        for tf_b, zone_b in entries[a + 1:]:
+            if tf_a == tf_b or zone_a["direction"] != zone_b["direction"]:
+                continue
+            bottom = max(zone_a["bottom"], zone_b["bottom"])
+            top = min(zone_a["top"], zone_b["top"])
+            if bottom <= top:
+                overlaps.append({
+                    "direction": zone_a["direction"],
+                    "bottom": bottom,
+                    "top": top,
+                    "sources": {(tf_a, zone_a["kind"]), (tf_b, zone_b["kind"])},
+                })
+
+    clusters = []
+    for direction in (1, -1):
+        current = None
+        for overlap in sorted((o for o in overlaps if o["direction"] == direction), key=lambda o: o["bottom"]):
+            if current is not None and overlap["bottom"] <= current["top"]:
+                current["top"] = max(current["top"], overlap["top"])
+                current["sources"] |= overlap["sources"]
+            else:
+                current = dict(overlap, sources=set(overlap["sources"]))
+                clusters.append(current)
+
+    for cluster in clusters:
+        cluster["timeframes"] = {tf for tf, _ in cluster["sources"]}
+        cluster["position"], cluster["distance"] = zone_distance(cluster, close)
+    clusters.sort(key=lambda c: (-len(c["timeframes"]), c["distance"]))
+    return clusters
+
+
+def analyze_mtf(df: pd.DataFrame, symbol: str, timeframes: list) -> tuple:
+    """
+    Analisis SMC multi-timeframe dari satu DataFrame timeframe dasar (timeframes[0]).
+    Timeframe yang lebih tinggi dibentuk dengan resample lokal, lalu analyze_smc dijalankan untuk
+    setiap timeframe. Mengembalikan (ringkasan bias dan zona konfluensi, teks analisis lengkap per timeframe).
+    """
+    base = timeframes[0]
+    close = float(df["close"].iloc[-1])
+    order = {tf: i for i, tf in enumerate(timeframes)}
+
+    details, biases, zones_by_timeframe = [], {}, {}
+    for tf in timeframes:
+        frame = df if tf == base else resample_ohlcv(df, tf)
+        if frame.empty:
+            details.append(f"**{symbol} ({tf}):** data tidak cukup setelah resample.")
+            continue
+        swing_length = mtf_swing_length(len(frame))
+        text, indicators = analyze_smc(frame, symbol, tf, swing_length=swing_length)
+        details.append(f"{text}\n_({len(frame)} candle, swing length {swing_length})_")
+        if indicators:
+            biases[tf] = structure_bias(indicators["bos_choch"])
+            zones_by_timeframe[tf] = active_zones(indicators["fvg"], indicators["ob"])
+
+    summary = [
+        f"**Analisis Multi-Timeframe SMC untuk {symbol} ({' → '.join(timeframes)}):**",
+        f"Data dasar: `{len(df)}` candle {base} (satu kali fetch), timeframe lain dibentuk dengan resample.\n",
+        "**Bias Struktur:**",
+    ]
+    for tf in timeframes:
+        bias = biases.get(tf)
+        if bias is None:
+            summary.append(f"- {tf}: belum ada BOS/CHoCH")
+        else:
+            direction, kind, level = bias
+            summary.append(f"- {tf}: {'Bullish' if direction == 1 else 'Bearish'} ({kind} terakhir di `{level:.2f}`)")
+
+    summary.append("\n**Zona Konfluensi (FVG/OB searah di beberapa timeframe):**")
+    clusters = find_confluence(zones_by_timeframe, close)
+    if not clusters:
+        summary.append("Tidak ada zona FVG/OB yang sejalan antar timeframe saat ini.")
+    for rank, cluster in enumerate(clusters[:MTF_MAX_ZONES], 1):
+        direction = "Bullish" if cluster["direction"] == 1 else "Bearish"
+        sources = ", ".join(f"{kind} {tf}" for tf, kind in sorted(cluster["sources"], key=lambda s: (order[s[0]], s[1])))
+        if cluster["position"] == "inside":
+            where = "harga berada di dalam zona"
+        else:
+            where = f"harga {cluster['distance']:.2f}% {'di atas' if cluster['position'] == 'above' else 'di bawah'} zona"
+        summary.append(f"{rank}. {direction} `{cluster['bottom']:.2f} - {cluster['top']:.2f}` — {sources}; {where}")
+
+    summary.append(f"\n**Harga Penutupan Terakhir:** `{close:.2f}`")
+    return "\n".join(summary), "\n\n".join(details)
+
+
+def _analyze_mtf_job(arrays: dict, symbol: str, timeframes: list) -> tuple:
+    """Job worker untuk analyze_mtf."""
+    return analyze_mtf(arrays_to_frame(arrays), symbol, timeframes)
+
+
+async def run_mtf(df: pd.DataFrame, symbol: str, timeframes: list) -> tuple:
+    """Menjalankan analyze_mtf di process pool. Mengembalikan (ringkasan, detail)."""
+    return await compute_stage.submit(_analyze_mtf_job, frame_to_arrays(df), symbol, timeframes)
@@ -0,0 +1,203 @@
+import asyncio
+import contextlib
+import os
+import re
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+except ImportError:  # pyarrow opsional: tanpa pyarrow store dinonaktifkan
+    pa = None
+    ipc = None
+
+# Direktori store OHLCV di disk, misalnya /var/lib/rosa_bot/ohlcv. Kosong (default) = store nonaktif;
+# isi dengan path absolut agar lokasinya tidak bergantung pada direktori kerja bot
+OHLCV_STORE_DIR = os.getenv('ROSA_OHLCV_STORE_DIR', '')
+# Jumlah file segmen per seri sebelum digabung menjadi satu file
+OHLCV_STORE_MAX_SEGMENTS = int(os.getenv('ROSA_OHLCV_STORE_MAX_SEGMENTS', '16'))
+# Jumlah candle maksimum yang dipertahankan per seri saat segmen digabung
+OHLCV_STORE_MAX_CANDLES = int(os.getenv('ROSA_OHLCV_STORE_MAX_CANDLES', '100000'))
+# Jumlah candle terakhir per seri yang diingat di memori untuk melewati penyimpanan yang tidak mengubah apa pun
+OHLCV_STORE_RECENT_CANDLES = 16
+
+OHLCV_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+
+def _escape(name: str, allowed: str) -> str:
+    """Mengubah karakter di luar `allowed` menjadi _xx agar aman sebagai nama direktori."""
+    return re.sub(f"[^{allowed}]", lambda m: f"_{ord(m.group()):02x}", name)
+
+
+class OHLCVStore:
+    """
+    Store OHLCV di disk, satu direktori per (source, symbol, timeframe). Setiap penyimpanan yang
+    mengubah seri ditulis sebagai file segmen Arrow IPC baru (append-only); penyimpanan yang isinya
+    sama dengan candle yang sudah tersimpan dilewati. Segmen yang lebih baru menggantikan semua
+    candle segmen lama mulai dari timestamp candle pertamanya, sama seperti merge_klines, sehingga
+    candle terakhir yang masih berjalan ikut diperbarui. Jika jumlah segmen melebihi batas,
+    semuanya digabung menjadi satu file.
+    Segmen dibaca lewat memory map tanpa menyalin file; hanya baris yang dibutuhkan (sesuai `limit`
+    dan belum digantikan segmen yang lebih baru) yang dikonversi menjadi DataFrame.
+    """
+
+    def __init__(self, root: str = OHLCV_STORE_DIR, max_segments: int = OHLCV_STORE_MAX_SEGMENTS,
+                 max_candles: int = OHLCV_STORE_MAX_CANDLES):
+        self.root = root
+        self.max_segments = max(1, max_segments)
+        self.max_candles = max_candles
+        self.enabled = pa is not None and bool(root)
+        self._locks = {}  # (source, symbol, timeframe) -> asyncio.Lock
+        self._recent = {}  # (source, symbol, timeframe) -> candle terakhir yang ditulis proses ini
+        self.loads = 0
+        self.hits = 0
+        self.writes = 0
+        self.skipped = 0
+        self.compactions = 0
+
+    def _partition(self, key) -> str:
+        source, symbol, timeframe = key
+        # Timeframe dibedakan huruf besar/kecilnya (1m vs 1M) walaupun filesystem tidak case-sensitive
+        return os.path.join(self.root, source, _escape(symbol, "A-Za-z0-9.-"), _escape(timeframe, "a-z0-9"))
+
+    def _lock(self, key) -> asyncio.Lock:
+        return self._locks.setdefault(key, asyncio.Lock())
+
+    @staticmethod
+    def _segments(partition: str) -> list:
+        try:
+            names = os.listdir(partition)
+        except FileNotFoundError:
+            return []
+        return sorted(os.path.join(partition, name) for name in names if name.endswith(".arrow"))
+
+    def _read(self, partition: str, limit: int = None) -> tuple:
+        """
+        Membaca segmen dari yang terbaru ke yang terlama sampai `limit` candle terpenuhi. Tabel Arrow
+        dari memory map tidak disalin; baris dipilih dengan slice sebelum dikonversi ke pandas.
+        """
+        segments = self._segments(partition)
+        if not segments:
+            return None, pd.DataFrame()
+
+        window, frames, rows, cutoff = None, [], 0, None
+        for path in reversed(segments):
+            with contextlib.closing(pa.memory_map(path)) as source:
+                reader = ipc.open_file(source)
+                if window is None:
+                    window = int(reader.schema.metadata.get(b"window", b"0"))
+                table = reader.read_all()
+                # Timestamp (int64, urut naik) untuk memilih baris yang belum digantikan segmen lebih baru
+                stamps = table.column("timestamp").cast(pa.int64()).to_numpy()
+                end = int(np.searchsorted(stamps, cutoff)) if cutoff is not None else len(stamps)
+                start = max(0, end - (limit - rows)) if limit is not None else 0
+                if end > start:
+                    frames.append(table.slice(start, end - start).to_pandas().set_index("timestamp"))
+                    rows += end - start
+                    cutoff = stamps[start]
+            if limit is not None and rows >= limit:
+                break
+
+        if not frames:
+            return window, pd.DataFrame()
+
+        df = pd.concat(frames[::-1]) if len(frames) > 1 else frames[0]
+        return window, (df.tail(limit) if limit is not None else df)
+
+    def _unchanged(self, key, df: pd.DataFrame) -> bool:
+        """True jika semua candle `df` sudah tersimpan persis sama sebagai candle terakhir seri."""
+        recent = self._recent.get(key)
+        if recent is None or df.index[0] < recent.index[0]:
+            return False
+        return recent[recent.index >= df.index[0]].equals(df)
+
+    def _write(self, partition: str, df: pd.DataFrame, window: int, replace: bool):
+        old = self._segments(partition)
+        os.makedirs(partition, exist_ok=True)
+
+        table = pa.Table.from_pandas(df.reset_index(), preserve_index=False)
+        table = table.replace_schema_metadata({b"window": str(window).encode()})
+        # Nama segmen berurutan menurut waktu tulis; tulis ke file sementara lalu rename agar pembaca
+        # tidak pernah melihat segmen setengah jadi
+        sequence = time.time_ns()
+        if old:
+            sequence = max(sequence, int(os.path.basename(old[-1])[:-len(".arrow")]) + 1)
+        path = os.path.join(partition, f"{sequence:020d}.arrow")
+        with pa.OSFile(path + ".tmp", "wb") as sink, ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(path + ".tmp", path)
+        self.writes += 1
+
+        if replace:
+            for segment in old:
+                os.remove(segment)
+        elif len(old) + 1 > self.max_segments:
+            self._compact(partition)
+
+    def _compact(self, partition: str):
+        window, df = self._read(partition)
+        self._write(partition, df.tail(max(window, self.max_candles)), window, replace=True)
+        self.compactions += 1
+
+    async def load(self, key, limit: int = None) -> tuple:
+        """
+        Mengembalikan (window, DataFrame) untuk seri yang tersimpan, dengan `window` = jumlah candle
+        yang diminta saat seri terakhir disimpan. Tanpa `limit`, DataFrame dipotong menjadi `window`
+        candle terakhir. Mengembalikan (None, DataFrame kosong) jika seri belum ada atau store nonaktif.
+        """
+        if not self.enabled:
+            return None, pd.DataFrame()
+        self.loads += 1
+        try:
+            async with self._lock(key):
+                window, df = await asyncio.to_thread(self._read, self._partition(key), limit)
+        except Exception as e:
+            print(f"Error reading OHLCV store for {key}: {e}")
+            return None, pd.DataFrame()
+        if df.empty:
+            return None, df
+        self.hits += 1
+        return window, (df if limit is not None else df.tail(window))
+
+    async def save(self, key, df: pd.DataFrame, window: int, replace: bool = False):
+        """
+        Menyimpan candle `df` ke seri. Candle tersimpan dengan timestamp >= candle pertama `df`
+        digantikan. Gunakan replace=True jika `df` tidak bersambung dengan seri yang tersimpan.
+        """
+        if not self.enabled or df is None or df.empty:
+            return
+        df = df[OHLCV_COLUMNS].astype("float64")
+        try:
+            async with self._lock(key):
+                if not replace and self._unchanged(key, df):
+                    self.skipped += 1
+                    return
+                # Lupakan candle terakhir dulu: jika penulisan gagal, isi di disk tidak diketahui
+                self._recent.pop(key, None)
+                await asyncio.to_thread(self._write, self._partition(key), df, window, replace)
+                self._recent[key] = df.tail(OHLCV_STORE_RECENT_CANDLES)
+        except Exception as e:
+            print(f"Error writing OHLCV store for {key}: {e}")
+
+    def clear(self):
+        self._recent.clear()
+        if self.enabled:
+            shutil.rmtree(self.root, ignore_errors=True)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "loads": self.loads,
+            "hits": self.hits,
+            "writes": self.writes,
+            "skipped": self.skipped,
+            "compactions": self.compactions,
+        }
+
+
+# Satu store untuk seluruh proses bot
+ohlcv_store = OHLCVStore()
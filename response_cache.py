@@ -0,0 +1,117 @@
+import os
+import re
+import time
+import unicodedata
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+# Jumlah jawaban maksimum di cache; yang paling lama tidak dipakai dibuang lebih dulu
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv('ROSA_ANSWER_CACHE_MAX_ENTRIES', '500'))
+# Berapa lama (detik) jawaban di cache boleh dipakai ulang
+ANSWER_CACHE_TTL = float(os.getenv('ROSA_ANSWER_CACHE_TTL', '21600'))
+# Ambang kemiripan (0-1) untuk memakai jawaban pertanyaan yang mirip; 0 = hanya teks yang sama persis.
+# Gunakan nilai tinggi (>= 0.85): "apa itu inflasi" dan "apa itu deflasi" sudah bernilai sekitar 0.75
+ANSWER_CACHE_SIMILARITY = float(os.getenv('ROSA_ANSWER_CACHE_SIMILARITY', '0'))
+
+# Dimensi vektor n-gram karakter untuk pencocokan kemiripan
+EMBEDDING_DIM = 1024
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Huruf kecil, tanpa tanda baca, spasi dirapikan: "Apa itu FVG?" dan "apa itu fvg" menjadi sama."""
+    text = unicodedata.normalize("NFKC", prompt).lower()
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+
+def embed_prompt(normalized: str) -> np.ndarray:
+    """
+    Embedding lokal yang murah: hitungan trigram karakter yang di-hash ke EMBEDDING_DIM dimensi,
+    dinormalisasi sehingga dot product = cosine similarity. Tidak memerlukan model atau API.
+    """
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    padded = f"  {normalized} "
+    for i in range(len(padded) - 2):
+        vector[zlib.crc32(padded[i:i + 3].encode()) % EMBEDDING_DIM] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class ResponseCache:
+    """
+    Cache jawaban /tanya untuk pertanyaan pertama (tanpa riwayat percakapan), dengan kunci teks
+    pertanyaan yang sudah dinormalisasi. Jika ANSWER_CACHE_SIMILARITY > 0, pertanyaan yang tidak sama
+    persis tetap bisa memakai jawaban pertanyaan yang paling mirip di atas ambang tersebut.
+    Jawaban yang melibatkan function call (harga live) tidak pernah disimpan.
+    """
+
+    def __init__(self, max_entries: int = ANSWER_CACHE_MAX_ENTRIES, ttl: float = ANSWER_CACHE_TTL,
+                 similarity: float = ANSWER_CACHE_SIMILARITY):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.similarity = similarity
+        self._entries = OrderedDict()  # prompt ternormalisasi -> (expires_at, jawaban, embedding)
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    def _expire(self, now: float):
+        for key in [key for key, (expires_at, _, _) in self._entries.items() if expires_at <= now]:
+            del self._entries[key]
+
+    def _most_similar(self, embedding: np.ndarray):
+        keys = list(self._entries)
+        scores = np.stack([self._entries[key][2] for key in keys]) @ embedding
+        best = int(np.argmax(scores))
+        return keys[best] if scores[best] >= self.similarity else None
+
+    def get(self, prompt: str):
+        """Jawaban yang tersimpan untuk `prompt`, atau None."""
+        self._expire(time.monotonic())
+        key = normalize_prompt(prompt)
+        if key not in self._entries and self.similarity > 0 and self._entries:
+            key = self._most_similar(embed_prompt(key))
+            if key is not None:
+                self.similar_hits += 1
+
+        if key is None or key not in self._entries:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return self._entries[key][1]
+
+    def put(self, prompt: str, answer: str):
+        key = normalize_prompt(prompt)
+        if not key or not answer.strip():
+            return
+        embedding = embed_prompt(key) if self.similarity > 0 else None
+        self._entries[key] = (time.monotonic() + self.ttl, answer, embedding)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def bypass(self):
+        """Mencatat jawaban yang tidak disimpan karena memakai function call."""
+        self.bypassed += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# Satu cache jawaban untuk seluruh proses bot
+response_cache = ResponseCache()
@@ -4,6 +4,9 @@ from functools import wraps
 from pandas import DataFrame, Series
 from datetime import datetime
 
+import smc_engine
+from smc_pipeline import SMCPipeline
+
 def inputvalidator(input_="ohlc"):
     def dfcheck(func):
         @wraps(func)
@@ -69,68 +72,12 @@ class smc:
         MitigatedIndex = the index of the candle that mitigated the fair value gap
         """
 
-        fvg = np.where(
-            (
-                (ohlc["high"].shift(1) < ohlc["low"].shift(-1))
-                & (ohlc["close"] > ohlc["open"])
-            )
-            | (
-                (ohlc["low"].shift(1) > ohlc["high"].shift(-1))
-                & (ohlc["close"] < ohlc["open"])
-            ),
-            np.where(ohlc["close"] > ohlc["open"], 1, -1),
-            np.nan,
-        )
-
-        top = np.where(
-            ~np.isnan(fvg),
-            np.where(
-                ohlc["close"] > ohlc["open"],
-                ohlc["low"].shift(-1),
-                ohlc["low"].shift(1),
-            ),
-            np.nan,
-        )
-
-        bottom = np.where(
-            ~np.isnan(fvg),
-            np.where(
-                ohlc["close"] > ohlc["open"],
-                ohlc["high"].shift(1),
-                ohlc["high"].shift(-1),
-            ),
-            np.nan,
-        )
-
-        # if there are multiple consecutive fvg then join them together using the highest top and lowest bottom and the last index
-        if join_consecutive:
-            for i in range(len(fvg) - 1):
-                if fvg[i] == fvg[i + 1]:
-                    top[i + 1] = max(top[i], top[i + 1])
-                    bottom[i + 1] = min(bottom[i], bottom[i + 1])
-                    fvg[i] = top[i] = bottom[i] = np.nan
-
-        mitigated_index = np.zeros(len(ohlc), dtype=np.int32)
-        for i in np.where(~np.isnan(fvg))[0]:
-            mask = np.zeros(len(ohlc), dtype=np.bool_)
-            if fvg[i] == 1:
-                mask = ohlc["low"][i + 2 :] <= top[i]
-            elif fvg[i] == -1:
-                mask = ohlc["high"][i + 2 :] >= bottom[i]
-            if np.any(mask):
-                j = np.argmax(mask) + i + 2
-                mitigated_index[i] = j
-
-        mitigated_index = np.where(np.isnan(fvg), np.nan, mitigated_index)
-
-        return pd.concat(
-            [
-                pd.Series(fvg, name="FVG"),
-                pd.Series(top, name="Top"),
-                pd.Series(bottom, name="Bottom"),
-                pd.Series(mitigated_index, name="MitigatedIndex"),
-            ],
-            axis=1,
+        return smc_engine.fair_value_gaps(
+            ohlc["open"].values,
+            ohlc["high"].values,
+            ohlc["low"].values,
+            ohlc["close"].values,
+            join_consecutive,
         )
 
     @classmethod
@@ -148,79 +95,11 @@ class smc:
         Level = the level of the swing high or low
         """
 
-        swing_length *= 2
-        # set the highs to 1 if the current high is the highest high in the last 5 candles and next 5 candles
-        swing_highs_lows = np.where(
-            ohlc["high"]
-            == ohlc["high"].shift(-(swing_length // 2)).rolling(swing_length).max(),
-            1,
-            np.where(
-                ohlc["low"]
-                == ohlc["low"].shift(-(swing_length // 2)).rolling(swing_length).min(),
-                -1,
-                np.nan,
-            ),
-        )
-
-        while True:
-            positions = np.where(~np.isnan(swing_highs_lows))[0]
-
-            if len(positions) < 2:
-                break
-
-            current = swing_highs_lows[positions[:-1]]
-            next = swing_highs_lows[positions[1:]]
-
-            highs = ohlc["high"].iloc[positions[:-1]].values
-            lows = ohlc["low"].iloc[positions[:-1]].values
-
-            next_highs = ohlc["high"].iloc[positions[1:]].values
-            next_lows = ohlc["low"].iloc[positions[1:]].values
-
-            index_to_remove = np.zeros(len(positions), dtype=bool)
-
-            consecutive_highs = (current == 1) & (next == 1)
-            index_to_remove[:-1] |= consecutive_highs & (highs < next_highs)
-            index_to_remove[1:] |= consecutive_highs & (highs >= next_highs)
-
-            consecutive_lows = (current == -1) & (next == -1)
-            index_to_remove[:-1] |= consecutive_lows & (lows > next_lows)
-            index_to_remove[1:] |= consecutive_lows & (lows <= next_lows)
-
-            if not index_to_remove.any():
-                break
-
-            swing_highs_lows[positions[index_to_remove]] = np.nan
-
-        positions = np.where(~np.isnan(swing_highs_lows))[0]
-
-        if len(positions) > 0:
-            if swing_highs_lows[positions[0]] == 1:
-                swing_highs_lows[0] = -1
-            if swing_highs_lows[positions[0]] == -1:
-                swing_highs_lows[0] = 1
-            if swing_highs_lows[positions[-1]] == -1:
-                swing_highs_lows[-1] = 1
-            if swing_highs_lows[positions[-1]] == 1:
-                swing_highs_lows[-1] = -1
-
-        level = np.where(
-            ~np.isnan(swing_highs_lows),
-            np.where(swing_highs_lows == 1, ohlc["high"], ohlc["low"]),
-            np.nan,
-        )
-
-        return pd.concat(
-            [
-                pd.Series(swing_highs_lows, name="HighLow"),
-                pd.Series(level, name="Level"),
-            ],
-            axis=1,
-        )
+        return smc_engine.swing_highs_lows(ohlc["high"].values, ohlc["low"].values, swing_length)
 
     @classmethod
     def bos_choch(
-        cls, ohlc: DataFrame, swing_highs_lows: DataFrame, close_break: bool = True
+        cls, ohlc: DataFrame, swing_highs_lows: DataFrame, close_break: bool = True, engine: str = "fast"
     ) -> Series:
         """
         BOS - Break of Structure
@@ -230,6 +109,7 @@ class smc:
         parameters:
         swing_highs_lows: DataFrame - provide the dataframe from the swing_highs_lows function
         close_break: bool - if True then the break of structure will be mitigated based on the close of the candle otherwise it will be the high/low.
+        engine: str - "fast" uses the single-pass engine in smc_engine, "legacy" the original nested loops. Both give identical output.
 
         returns:
         BOS = 1 if bullish break of structure, -1 if bearish break of structure
@@ -238,6 +118,18 @@ class smc:
         BrokenIndex = the index of the candle that broke the level
         """
 
+        if engine == "fast":
+            return smc_engine.bos_choch(
+                ohlc["high"].values,
+                ohlc["low"].values,
+                ohlc["close"].values,
+                swing_highs_lows["HighLow"].values,
+                swing_highs_lows["Level"].values,
+                close_break,
+            )
+        if engine != "legacy":
+            raise ValueError('engine must be "fast" or "legacy"')
+
         swing_highs_lows = swing_highs_lows.copy()
 
         level_order = []
@@ -378,6 +270,7 @@ class smc:
         ohlc: DataFrame,
         swing_highs_lows: DataFrame,
         close_mitigation: bool = False,
+        engine: str = "fast",
     ) -> Series:
         """
         OB - Order Blocks
@@ -386,6 +279,7 @@ class smc:
         parameters:
         swing_highs_lows: DataFrame - provide the dataframe from the swing_highs_lows function
         close_mitigation: bool - if True then the order block will be mitigated based on the close of the candle otherwise it will be the high/low.
+        engine: str - "fast" uses the O(n log n) engine in smc_engine, "legacy" the original per-candle loop. Both give identical output.
 
         returns:
         OB = 1 if bullish order block, -1 if bearish order block
@@ -403,6 +297,11 @@ class smc:
         _volume = ohlc["volume"].values
         swing_hl = swing_highs_lows["HighLow"].values
 
+        if engine == "fast":
+            return smc_engine.order_blocks(_open, _high, _low, _close, _volume, swing_hl, close_mitigation)
+        if engine != "legacy":
+            raise ValueError('engine must be "fast" or "legacy"')
+
         # Pre-allocate arrays
         crossed = np.full(ohlc_len, False, dtype=bool)
         ob = np.zeros(ohlc_len, dtype=np.int32)
@@ -564,7 +463,7 @@ class smc:
         )
 
     @classmethod
-    def liquidity(cls, ohlc: DataFrame, swing_highs_lows: DataFrame, range_percent: float = 0.01) -> Series:
+    def liquidity(cls, ohlc: DataFrame, swing_highs_lows: DataFrame, range_percent: float = 0.01, engine: str = "fast") -> Series:
         """
         Liquidity
         Liquidity is when there are multiple highs within a small range of each other,
@@ -573,6 +472,7 @@ class smc:
         parameters:
         swing_highs_lows: DataFrame - provide the dataframe from the swing_highs_lows function
         range_percent: float - the percentage of the range to determine liquidity
+        engine: str - "fast" uses the sorted-level engine in smc_engine, "legacy" the original nested loops. Both give identical output.
 
         returns:
         Liquidity = 1 if bullish liquidity, -1 if bearish liquidity
@@ -581,6 +481,17 @@ class smc:
         Swept = the index of the candle that swept the liquidity
         """
 
+        if engine == "fast":
+            return smc_engine.liquidity(
+                ohlc["high"].values,
+                ohlc["low"].values,
+                swing_highs_lows["HighLow"].values,
+                swing_highs_lows["Level"].values,
+                range_percent,
+            )
+        if engine != "legacy":
+            raise ValueError('engine must be "fast" or "legacy"')
+
         # Work on a copy so the original is not modified.
         shl = swing_highs_lows.copy()
         n = len(ohlc)
@@ -707,52 +618,15 @@ class smc:
 
         ohlc.index = pd.to_datetime(ohlc.index)
 
-        previous_high = np.zeros(len(ohlc), dtype=np.float32)
-        previous_low = np.zeros(len(ohlc), dtype=np.float32)
-        broken_high = np.zeros(len(ohlc), dtype=np.int32)
-        broken_low = np.zeros(len(ohlc), dtype=np.int32)
-
-        resampled_ohlc = ohlc.resample(time_frame).agg(
-            {
-                "open": "first",
-                "high": "max",
-                "low": "min",
-                "close": "last",
-                "volume": "sum",
-            }
-        ).dropna()
-
-        currently_broken_high = False
-        currently_broken_low = False
-        last_broken_time = None
-        for i in range(len(ohlc)):
-            resampled_previous_index = np.where(
-                resampled_ohlc.index < ohlc.index[i]
-            )[0]
-            if len(resampled_previous_index) <= 1:
-                previous_high[i] = np.nan
-                previous_low[i] = np.nan
-                continue
-            resampled_previous_index = resampled_previous_index[-2]
-
-            if last_broken_time != resampled_previous_index:
-                currently_broken_high = False
-                currently_broken_low = False
-                last_broken_time = resampled_previous_index
-
-            previous_high[i] = resampled_ohlc["high"].iloc[resampled_previous_index] 
-            previous_low[i] = resampled_ohlc["low"].iloc[resampled_previous_index]
-            currently_broken_high = ohlc["high"].iloc[i] > previous_high[i] or currently_broken_high
-            currently_broken_low = ohlc["low"].iloc[i] < previous_low[i] or currently_broken_low
-            broken_high[i] = 1 if currently_broken_high else 0
-            broken_low[i] = 1 if currently_broken_low else 0
-
-        previous_high = pd.Series(previous_high, name="PreviousHigh")
-        previous_low = pd.Series(previous_low, name="PreviousLow")
-        broken_high = pd.Series(broken_high, name="BrokenHigh")
-        broken_low = pd.Series(broken_low, name="BrokenLow")
-
-        return pd.concat([previous_high, previous_low, broken_high, broken_low], axis=1)
+        return smc_engine.previous_high_low(
+            ohlc.index,
+            ohlc["open"].values,
+            ohlc["high"].values,
+            ohlc["low"].values,
+            ohlc["close"].values,
+            ohlc["volume"].values,
+            time_frame,
+        )
 
     @classmethod
     def sessions(
@@ -783,38 +657,7 @@ class smc:
             raise ValueError("Custom session requires a start and end time")
 
         default_sessions = {
-            "Sydney": {
-                "start": "21:00",
-                "end": "06:00",
-            },
-            "Tokyo": {
-                "start": "00:00",
-                "end": "09:00",
-            },
-            "London": {
-                "start": "07:00",
-                "end": "16:00",
-            },
-            "New York": {
-                "start": "13:00",
-                "end": "22:00",
-            },
-            "Asian kill zone": {
-                "start": "00:00",
-                "end": "04:00",
-            },
-            "London open kill zone": {
-                "start": "6:00",
-                "end": "9:00",
-            },
-            "New York kill zone": {
-                "start": "11:00",
-                "end": "14:00",
-            },
-            "london close kill zone": {
-                "start": "14:00",
-                "end": "16:00",
-            },
+            **smc_engine.DEFAULT_SESSIONS,
             "Custom": {
                 "start": start_time,
                 "end": end_time,
@@ -827,40 +670,16 @@ class smc:
             time_zone = time_zone.replace("UTC", "Etc/GMT")
             ohlc.index = ohlc.index.tz_localize(time_zone).tz_convert("UTC")
 
-        start_time = datetime.strptime(
-            default_sessions[session]["start"], "%H:%M"
-        ).strftime("%H:%M")
-        start_time = datetime.strptime(start_time, "%H:%M")
-        end_time = datetime.strptime(
-            default_sessions[session]["end"], "%H:%M"
-        ).strftime("%H:%M")
-        end_time = datetime.strptime(end_time, "%H:%M")
-
-        # if the candles are between the start and end time then it is an active session
-        active = np.zeros(len(ohlc), dtype=np.int32)
-        high = np.zeros(len(ohlc), dtype=np.float32)
-        low = np.zeros(len(ohlc), dtype=np.float32)
-
-        for i in range(len(ohlc)):
-            current_time = ohlc.index[i].strftime("%H:%M")
-            # convert current time to the second of the day
-            current_time = datetime.strptime(current_time, "%H:%M")
-            if (start_time < end_time and start_time <= current_time <= end_time) or (
-                start_time >= end_time
-                and (start_time <= current_time or current_time <= end_time)
-            ):
-                active[i] = 1
-                high[i] = max(ohlc["high"].iloc[i], high[i - 1] if i > 0 else 0)
-                low[i] = min(
-                    ohlc["low"].iloc[i],
-                    low[i - 1] if i > 0 and low[i - 1] != 0 else float("inf"),
-                )
-
-        active = pd.Series(active, name="Active")
-        high = pd.Series(high, name="High")
-        low = pd.Series(low, name="Low")
-
-        return pd.concat([active, high, low], axis=1)
+        start_time = datetime.strptime(default_sessions[session]["start"], "%H:%M")
+        end_time = datetime.strptime(default_sessions[session]["end"], "%H:%M")
+
+        return smc_engine.session_ranges(
+            np.asarray(ohlc.index.hour * 60 + ohlc.index.minute),
+            ohlc["high"].values,
+            ohlc["low"].values,
+            start_time.hour * 60 + start_time.minute,
+            end_time.hour * 60 + end_time.minute,
+        )
 
     @classmethod
     def retracements(cls, ohlc: DataFrame, swing_highs_lows: DataFrame) -> Series:
@@ -877,84 +696,20 @@ class smc:
         DeepestRetracement% = the deepest retracement percentage from the swing high or low
         """
 
-        swing_highs_lows = swing_highs_lows.copy()
+        return smc_engine.retracements(
+            ohlc["high"].values,
+            ohlc["low"].values,
+            swing_highs_lows["HighLow"].values,
+            swing_highs_lows["Level"].values,
+        )
 
-        direction = np.zeros(len(ohlc), dtype=np.int32)
-        current_retracement = np.zeros(len(ohlc), dtype=np.float64)
-        deepest_retracement = np.zeros(len(ohlc), dtype=np.float64)
-
-        top = 0
-        bottom = 0
-        for i in range(len(ohlc)):
-            if swing_highs_lows["HighLow"][i] == 1:
-                direction[i] = 1
-                top = swing_highs_lows["Level"][i]
-                # deepest_retracement[i] = 0
-            elif swing_highs_lows["HighLow"][i] == -1:
-                direction[i] = -1
-                bottom = swing_highs_lows["Level"][i]
-                # deepest_retracement[i] = 0
-            else:
-                direction[i] = direction[i - 1] if i > 0 else 0
-
-            if direction[i - 1] == 1:
-                current_retracement[i] = round(
-                    100 - (((ohlc["low"].iloc[i] - bottom) / (top - bottom)) * 100), 1
-                )
-                deepest_retracement[i] = max(
-                    (
-                        deepest_retracement[i - 1]
-                        if i > 0 and direction[i - 1] == 1
-                        else 0
-                    ),
-                    current_retracement[i],
-                )
-            if direction[i] == -1:
-                current_retracement[i] = round(
-                    100 - ((ohlc["high"].iloc[i] - top) / (bottom - top)) * 100, 1
-                )
-                deepest_retracement[i] = max(
-                    (
-                        deepest_retracement[i - 1]
-                        if i > 0 and direction[i - 1] == -1
-                        else 0
-                    ),
-                    current_retracement[i],
-                )
-
-        # shift the arrays by 1
-        current_retracement = np.roll(current_retracement, 1)
-        deepest_retracement = np.roll(deepest_retracement, 1)
-        direction = np.roll(direction, 1)
-
-        # remove the first 3 retracements as they get calculated incorrectly due to not enough data
-        remove_first_count = 0
-        for i in range(len(direction)):
-            if i + 1 == len(direction):
-                break
-            if direction[i] != direction[i + 1]:
-                remove_first_count += 1
-            direction[i] = 0
-            current_retracement[i] = 0
-            deepest_retracement[i] = 0
-            if remove_first_count == 3:
-                direction[i + 1] = 0
-                current_retracement[i + 1] = 0
-                deepest_retracement[i + 1] = 0
-                break
-
-        direction = pd.Series(direction, name="Direction")
-        current_retracement = pd.Series(current_retracement, name="CurrentRetracement%")
-        deepest_retracement = pd.Series(deepest_retracement, name="DeepestRetracement%")
-
-        return pd.concat([direction, current_retracement, deepest_retracement], axis=1)
-    
 
  # JANGAN DI HAPUS  
-def analyze_smc(df: pd.DataFrame, symbol: str, timeframe: str) -> str:
+def analyze_smc(df: pd.DataFrame, symbol: str, timeframe: str, swing_length: int = 50) -> str:
     """
     Melakukan analisis Smart Money Concept (SMC) pada data harga
     menggunakan library SMC yang lebih canggih.
+    `swing_length` menentukan jumlah candle di kiri/kanan sebuah swing high/low.
     """
     if df.empty:
         return "Data tidak tersedia untuk analisis SMC."
@@ -967,8 +722,11 @@ def analyze_smc(df: pd.DataFrame, symbol: str, timeframe: str) -> str:
     analysis_results = [f"**Analisis SMC untuk {symbol} ({timeframe}):**\n"]
 
     try:
+        # Normalisasi OHLCV sekali; setiap indikator perantara (mis. swing high/low) dihitung sekali saja
+        pipeline = SMCPipeline(df, swing_length)
+
         # 1. Analisis Swing Highs/Lows
-        swing_hl_data = smc.swing_highs_lows(df)
+        swing_hl_data = pipeline.swing_highs_lows()
         last_swing_high = swing_hl_data[swing_hl_data["HighLow"] == 1]["Level"].dropna().iloc[-1] if not swing_hl_data[swing_hl_data["HighLow"] == 1]["Level"].dropna().empty else None
         last_swing_low = swing_hl_data[swing_hl_data["HighLow"] == -1]["Level"].dropna().iloc[-1] if not swing_hl_data[swing_hl_data["HighLow"] == -1]["Level"].dropna().empty else None
 
@@ -978,7 +736,7 @@ def analyze_smc(df: pd.DataFrame, symbol: str, timeframe: str) -> str:
             analysis_results.append(f"- Swing Low terakhir: `{last_swing_low:.2f}`")
 
         # 2. Analisis BOS / CHoCH
-        bos_choch_data = smc.bos_choch(df, swing_hl_data)
+        bos_choch_data = pipeline.bos_choch()
         
         bullish_bos = bos_choch_data[(bos_choch_data["BOS"] == 1) & (~bos_choch_data["BrokenIndex"].isna())]
         bearish_bos = bos_choch_data[(bos_choch_data["BOS"] == -1) & (~bos_choch_data["BrokenIndex"].isna())]
@@ -996,7 +754,7 @@ def analyze_smc(df: pd.DataFrame, symbol: str, timeframe: str) -> str:
 
 
         # 3. Analisis Fair Value Gap (FVG)
-        fvg_data = smc.fvg(df)
+        fvg_data = pipeline.fvg()
         unmitigated_bullish_fvg = fvg_data[(fvg_data["FVG"] == 1) & (fvg_data["MitigatedIndex"].isna())]
         unmitigated_bearish_fvg = fvg_data[(fvg_data["FVG"] == -1) & (fvg_data["MitigatedIndex"].isna())]
 
@@ -1006,7 +764,7 @@ def analyze_smc(df: pd.DataFrame, symbol: str, timeframe: str) -> str:
             analysis_results.append(f"- FVG Bearish (belum dimitigasi) terdeteksi di sekitar: `{unmitigated_bearish_fvg['Bottom'].iloc[-1]:.2f} - {unmitigated_bearish_fvg['Top'].iloc[-1]:.2f}`")
 
         # 4. Analisis Order Block (OB)
-        ob_data = smc.ob(df, swing_hl_data)
+        ob_data = pipeline.ob()
         bullish_ob = ob_data[ob_data["OB"] == 1].dropna(subset=["OB"])
         bearish_ob = ob_data[ob_data["OB"] == -1].dropna(subset=["OB"])
 
@@ -1016,7 +774,7 @@ def analyze_smc(df: pd.DataFrame, symbol: str, timeframe: str) -> str:
             analysis_results.append(f"- Order Block Bearish terdeteksi di sekitar: `{bearish_ob['Bottom'].iloc[-1]:.2f} - {bearish_ob['Top'].iloc[-1]:.2f}` (Kekuatan: {bearish_ob['Percentage'].iloc[-1]:.2f}%)")
 
         # 5. Analisis Likuiditas
-        liquidity_data = smc.liquidity(df, swing_hl_data)
+        liquidity_data = pipeline.liquidity()
         bullish_liquidity = liquidity_data[liquidity_data["Liquidity"] == 1].dropna(subset=["Liquidity"])
         bearish_liquidity = liquidity_data[liquidity_data["Liquidity"] == -1].dropna(subset=["Liquidity"])
 
@@ -1025,6 +783,48 @@ def analyze_smc(df: pd.DataFrame, symbol: str, timeframe: str) -> str:
         if not bearish_liquidity.empty:
             analysis_results.append(f"- Area Likuiditas Bearish terdeteksi di sekitar: `{bearish_liquidity['Level'].iloc[-1]:.2f}`")
 
+        # 6. Retracement dari swing terakhir (konteks premium/discount)
+        retracement_data = pipeline.retracements()
+        last_retracement = retracement_data.iloc[-1]
+        if last_retracement["Direction"] != 0:
+            current_retracement = last_retracement["CurrentRetracement%"]
+            from_swing_high = last_retracement["Direction"] == 1
+            # Dari swing high, retracement > 50% berarti harga di bawah equilibrium (discount); dari swing low sebaliknya
+            zone = "Discount" if (current_retracement > 50) == from_swing_high else "Premium"
+            analysis_results.append(
+                f"- Retracement dari swing {'high' if from_swing_high else 'low'} terakhir: `{current_retracement:.1f}%` "
+                f"(terdalam: `{last_retracement['DeepestRetracement%']:.1f}%`), harga berada di zona {zone}"
+            )
+
+        # 7. Level High/Low hari dan minggu sebelumnya (PDH/PDL, PWH/PWL)
+        previous_day_data = pipeline.previous_day()
+        previous_week_data = pipeline.previous_week()
+
+        for (high_label, low_label), previous_data in ((("PDH", "PDL"), previous_day_data), (("PWH", "PWL"), previous_week_data)):
+            last_previous = previous_data.iloc[-1]
+            if not np.isnan(last_previous["PreviousHigh"]):
+                broken_levels = [label for label, column in ((high_label, "BrokenHigh"), (low_label, "BrokenLow")) if last_previous[column] == 1]
+                broken_text = f" ({', '.join(broken_levels)} sudah ditembus)" if broken_levels else ""
+                analysis_results.append(f"- {high_label} / {low_label}: `{last_previous['PreviousHigh']:.2f}` / `{last_previous['PreviousLow']:.2f}`{broken_text}")
+
+        # 8. Range sesi trading dan kill zone (hanya untuk timeframe intraday)
+        session_data = {}
+        if len(df) > 1 and (df.index[1:] - df.index[:-1]).median() < pd.Timedelta("1D"):
+            # Jam sesi dibaca dalam UTC oleh pipeline
+            for label, session_name in (("Asia", "Tokyo"), ("London", "London"), ("New York", "New York")):
+                session_result = pipeline.sessions(session_name)
+                session_data[session_name] = session_result
+                active_session = session_result[session_result["Active"] == 1]
+                if not active_session.empty:
+                    analysis_results.append(f"- Range sesi {label} terakhir: `{active_session['Low'].iloc[-1]:.2f} - {active_session['High'].iloc[-1]:.2f}`")
+
+            active_kill_zones = [
+                kill_zone for kill_zone in ("Asian kill zone", "London open kill zone", "New York kill zone", "london close kill zone")
+                if pipeline.sessions(kill_zone)["Active"].iloc[-1] == 1
+            ]
+            if active_kill_zones:
+                analysis_results.append(f"- Candle terakhir berada di: {', '.join(active_kill_zones)}")
+
         # Ringkasan Akhir
         analysis_results.append(f"\n**Harga Penutupan Terakhir:** `{df['close'].iloc[-1]:.2f}`")
         
@@ -1037,11 +837,43 @@ def analyze_smc(df: pd.DataFrame, symbol: str, timeframe: str) -> str:
             "fvg": fvg_data,
             "bos_choch": bos_choch_data,
             "ob": ob_data,
-            "liquidity": liquidity_data
+            "liquidity": liquidity_data,
+            "retracements": retracement_data,
+            "previous_day": previous_day_data,
+            "previous_week": previous_week_data,
+            "sessions": session_data
         }
 
     # Tangani kasus error agar tetap mengembalikan tuples
     except Exception as e:
         analysis_results.append(f"Terjadi kesalahan saat melakukan analisis SMC: {e}")
         print(f"Error in analyze_smc: {e}")
-        return "\n".join(analysis_results), {} # Kembalikan dict kosong saat error
\ No newline at end of file
+        return "\n".join(analysis_results), {} # Kembalikan dict kosong saat error
+
+
+def active_zones(fvg_data: pd.DataFrame, ob_data: pd.DataFrame) -> list:
+    """
+    Mengumpulkan zona FVG dan Order Block yang belum dimitigasi.
+    Mengembalikan list dict berisi kind ("FVG"/"OB"), direction (1/-1), top, bottom dan index candle.
+    """
+    zones = []
+    for kind, data in (("FVG", fvg_data), ("OB", ob_data)):
+        active = data[data[kind].notna() & (data["MitigatedIndex"] == 0)]
+        for index, direction, top, bottom in zip(active.index, active[kind], active["Top"], active["Bottom"]):
+            zones.append({
+                "kind": kind,
+                "direction": int(direction),
+                "top": float(max(top, bottom)),
+                "bottom": float(min(top, bottom)),
+                "index": int(index),
+            })
+    return zones
+
+
+def zone_distance(zone: dict, close: float) -> tuple:
+    """Posisi harga terhadap zona ("inside"/"above"/"below") dan jaraknya dalam persen dari harga."""
+    if zone["bottom"] <= close <= zone["top"]:
+        return "inside", 0.0
+    if close > zone["top"]:
+        return "above", (close - zone["top"]) / close * 100.0
+    return "below", (zone["bottom"] - close) / close * 100.0
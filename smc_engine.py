@@ -0,0 +1,828 @@
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+import pandas as pd
+
+
+class RangeExtremes:
+    """
+    Sparse table of range minima or maxima over an array.
+    Answers "first index >= start where value < / <= / > / >= threshold" for many starts at once
+    in O(log n) per query, which replaces the per-candle forward scans of the reference implementation.
+
+    parameters:
+    values: np.ndarray - the array to index (NaN never satisfies a comparison)
+    kind: str - "min" for lt/le queries, "max" for gt/ge queries
+    """
+
+    _KIND_FOR_OP = {"lt": "min", "le": "min", "gt": "max", "ge": "max"}
+
+    def __init__(self, values: np.ndarray, kind: str):
+        if kind not in ("min", "max"):
+            raise ValueError('kind must be "min" or "max"')
+        self.kind = kind
+        fill = np.inf if kind == "min" else -np.inf
+        values = np.asarray(values, dtype=np.float64)
+        base = np.where(np.isnan(values), fill, values)
+        reduce = np.minimum if kind == "min" else np.maximum
+
+        # levels[L][p] = min/max of values[p : p + 2**L]
+        self.levels = [base]
+        width = 1
+        while 2 * width <= len(base):
+            previous = self.levels[-1]
+            self.levels.append(reduce(previous[:-width], previous[width:]))
+            width *= 2
+
+    def __len__(self):
+        return len(self.levels[0])
+
+    @staticmethod
+    def _hit(values, thresholds, op):
+        if op == "lt":
+            return values < thresholds
+        if op == "le":
+            return values <= thresholds
+        if op == "gt":
+            return values > thresholds
+        return values >= thresholds
+
+    def first(self, starts, thresholds, op: str) -> np.ndarray:
+        """
+        For every (start, threshold) pair return the first index i >= start where
+        `values[i] <op> threshold`, or -1 if there is none.
+        """
+        if self._KIND_FOR_OP[op] != self.kind:
+            raise ValueError(f'op "{op}" needs a "{self._KIND_FOR_OP[op]}" table')
+
+        n = len(self)
+        pos = np.array(starts, dtype=np.int64, copy=True).reshape(-1)
+        thresholds = np.asarray(thresholds, dtype=np.float64).reshape(-1)
+        pos = np.maximum(pos, 0)
+
+        # binary lifting: skip every block that contains no hit, largest blocks first
+        for level in range(len(self.levels) - 1, -1, -1):
+            width = 1 << level
+            sel = np.flatnonzero(pos + width <= n)
+            if sel.size == 0:
+                continue
+            no_hit = ~self._hit(self.levels[level][pos[sel]], thresholds[sel], op)
+            pos[sel[no_hit]] += width
+
+        result = np.full(len(pos), -1, dtype=np.int64)
+        inside = np.flatnonzero(pos < n)
+        found = self._hit(self.levels[0][pos[inside]], thresholds[inside], op)
+        result[inside[found]] = pos[inside[found]]
+        return result
+
+
+def last_index_before(mask: np.ndarray) -> np.ndarray:
+    """For every position i return the last index j < i where mask[j] is True, or -1."""
+    n = len(mask)
+    marks = np.where(mask, np.arange(n), -1)
+    last = np.full(n, -1, dtype=np.int64)
+    if n > 1:
+        last[1:] = np.maximum.accumulate(marks)[:-1]
+    return last
+
+
+def first_in_group(groups: np.ndarray, condition: np.ndarray):
+    """
+    `groups` is non-decreasing over time. Return (positions, group values) of the first
+    position of every group where `condition` holds, in time order.
+    """
+    candidates = np.flatnonzero(condition)
+    if candidates.size == 0:
+        return candidates, candidates
+    group_values, first = np.unique(groups[candidates], return_index=True)
+    return candidates[first], group_values
+
+
+# Default session times in UTC, shared by smc.sessions and SMCPipeline
+DEFAULT_SESSIONS = {
+    "Sydney": {"start": "21:00", "end": "06:00"},
+    "Tokyo": {"start": "00:00", "end": "09:00"},
+    "London": {"start": "07:00", "end": "16:00"},
+    "New York": {"start": "13:00", "end": "22:00"},
+    "Asian kill zone": {"start": "00:00", "end": "04:00"},
+    "London open kill zone": {"start": "6:00", "end": "9:00"},
+    "New York kill zone": {"start": "11:00", "end": "14:00"},
+    "london close kill zone": {"start": "14:00", "end": "16:00"},
+}
+
+
+def fair_value_gaps(
+    _open: np.ndarray,
+    _high: np.ndarray,
+    _low: np.ndarray,
+    _close: np.ndarray,
+    join_consecutive: bool = False,
+) -> pd.DataFrame:
+    """
+    FVG - Fair Value Gap on plain arrays.
+    The mitigation candle of every gap comes from one batch of RangeExtremes queries.
+
+    returns:
+    FVG, Top, Bottom, MitigatedIndex - see smc.fvg
+    """
+
+    n = len(_close)
+    previous_high = np.r_[np.nan, _high[:-1]] if n else _high
+    previous_low = np.r_[np.nan, _low[:-1]] if n else _low
+    next_high = np.r_[_high[1:], np.nan] if n else _high
+    next_low = np.r_[_low[1:], np.nan] if n else _low
+    bullish_candle = _close > _open
+
+    fvg = np.where(
+        ((previous_high < next_low) & bullish_candle)
+        | ((previous_low > next_high) & (_close < _open)),
+        np.where(bullish_candle, 1, -1),
+        np.nan,
+    )
+    top = np.where(~np.isnan(fvg), np.where(bullish_candle, next_low, previous_low), np.nan)
+    bottom = np.where(~np.isnan(fvg), np.where(bullish_candle, previous_high, next_high), np.nan)
+
+    # if there are multiple consecutive fvg then join them together using the highest top and lowest bottom and the last index
+    if join_consecutive:
+        for i in range(len(fvg) - 1):
+            if fvg[i] == fvg[i + 1]:
+                top[i + 1] = max(top[i], top[i + 1])
+                bottom[i + 1] = min(bottom[i], bottom[i + 1])
+                fvg[i] = top[i] = bottom[i] = np.nan
+
+    mitigated_index = np.zeros(n, dtype=np.int32)
+    bullish = np.flatnonzero(fvg == 1)
+    bearish = np.flatnonzero(fvg == -1)
+    if bullish.size:
+        found = RangeExtremes(_low, "min").first(bullish + 2, top[bullish], "le")
+        mitigated_index[bullish[found >= 0]] = found[found >= 0]
+    if bearish.size:
+        found = RangeExtremes(_high, "max").first(bearish + 2, bottom[bearish], "ge")
+        mitigated_index[bearish[found >= 0]] = found[found >= 0]
+
+    mitigated_index = np.where(np.isnan(fvg), np.nan, mitigated_index)
+
+    return pd.concat(
+        [
+            pd.Series(fvg, name="FVG"),
+            pd.Series(top, name="Top"),
+            pd.Series(bottom, name="Bottom"),
+            pd.Series(mitigated_index, name="MitigatedIndex"),
+        ],
+        axis=1,
+    )
+
+
+def swing_highs_lows(_high: np.ndarray, _low: np.ndarray, swing_length: int = 50) -> pd.DataFrame:
+    """
+    Swing Highs and Lows on plain arrays.
+
+    returns:
+    HighLow, Level - see smc.swing_highs_lows
+    """
+
+    high = pd.Series(_high)
+    low = pd.Series(_low)
+
+    swing_length *= 2
+    # set the highs to 1 if the current high is the highest high in the last 5 candles and next 5 candles
+    swing_highs_lows = np.where(
+        _high == high.shift(-(swing_length // 2)).rolling(swing_length).max().values,
+        1,
+        np.where(
+            _low == low.shift(-(swing_length // 2)).rolling(swing_length).min().values,
+            -1,
+            np.nan,
+        ),
+    )
+
+    while True:
+        positions = np.where(~np.isnan(swing_highs_lows))[0]
+
+        if len(positions) < 2:
+            break
+
+        current = swing_highs_lows[positions[:-1]]
+        next = swing_highs_lows[positions[1:]]
+
+        highs = _high[positions[:-1]]
+        lows = _low[positions[:-1]]
+
+        next_highs = _high[positions[1:]]
+        next_lows = _low[positions[1:]]
+
+        index_to_remove = np.zeros(len(positions), dtype=bool)
+
+        consecutive_highs = (current == 1) & (next == 1)
+        index_to_remove[:-1] |= consecutive_highs & (highs < next_highs)
+        index_to_remove[1:] |= consecutive_highs & (highs >= next_highs)
+
+        consecutive_lows = (current == -1) & (next == -1)
+        index_to_remove[:-1] |= consecutive_lows & (lows > next_lows)
+        index_to_remove[1:] |= consecutive_lows & (lows <= next_lows)
+
+        if not index_to_remove.any():
+            break
+
+        swing_highs_lows[positions[index_to_remove]] = np.nan
+
+    positions = np.where(~np.isnan(swing_highs_lows))[0]
+
+    if len(positions) > 0:
+        if swing_highs_lows[positions[0]] == 1:
+            swing_highs_lows[0] = -1
+        if swing_highs_lows[positions[0]] == -1:
+            swing_highs_lows[0] = 1
+        if swing_highs_lows[positions[-1]] == -1:
+            swing_highs_lows[-1] = 1
+        if swing_highs_lows[positions[-1]] == 1:
+            swing_highs_lows[-1] = -1
+
+    level = np.where(
+        ~np.isnan(swing_highs_lows),
+        np.where(swing_highs_lows == 1, _high, _low),
+        np.nan,
+    )
+
+    return pd.concat(
+        [
+            pd.Series(swing_highs_lows, name="HighLow"),
+            pd.Series(level, name="Level"),
+        ],
+        axis=1,
+    )
+
+
+def order_blocks(
+    _open: np.ndarray,
+    _high: np.ndarray,
+    _low: np.ndarray,
+    _close: np.ndarray,
+    _volume: np.ndarray,
+    swing_hl: np.ndarray,
+    close_mitigation: bool = False,
+) -> pd.DataFrame:
+    """
+    OB - Order Blocks, O(n log n) engine.
+    Produces the same output as the reference loop in smc.ob but finds the crossing candle of
+    every swing with one grouped scan over precomputed last-swing indices, and resolves the
+    mitigation and reset candle of every block with RangeExtremes queries instead of rescanning
+    the list of active blocks on every candle.
+
+    returns:
+    OB, Top, Bottom, OBVolume, MitigatedIndex, Percentage - see smc.ob
+    """
+
+    ohlc_len = len(_high)
+
+    crossed = np.full(ohlc_len, False, dtype=bool)
+    ob = np.zeros(ohlc_len, dtype=np.int32)
+    top_arr = np.zeros(ohlc_len, dtype=np.float32)
+    bottom_arr = np.zeros(ohlc_len, dtype=np.float32)
+    obVolume = np.zeros(ohlc_len, dtype=np.float32)
+    lowVolume = np.zeros(ohlc_len, dtype=np.float32)
+    highVolume = np.zeros(ohlc_len, dtype=np.float32)
+    percentage = np.zeros(ohlc_len, dtype=np.float32)
+    mitigated_index = np.zeros(ohlc_len, dtype=np.int32)
+    breaker = np.full(ohlc_len, False, dtype=bool)
+
+    # min(open, close) / max(open, close) with the same tie and NaN behaviour as Python's min/max
+    if close_mitigation:
+        bullish_mitigation = np.where(_close < _open, _close, _open)
+        bearish_mitigation = np.where(_close > _open, _close, _open)
+    else:
+        bullish_mitigation = _low
+        bearish_mitigation = _high
+
+    low_min = RangeExtremes(_low, "min")
+    high_max = RangeExtremes(_high, "max")
+    mitigation_min = low_min if not close_mitigation else RangeExtremes(bullish_mitigation, "min")
+    mitigation_max = high_max if not close_mitigation else RangeExtremes(bearish_mitigation, "max")
+
+    def reset(indices):
+        ob[indices] = 0
+        top_arr[indices] = 0.0
+        bottom_arr[indices] = 0.0
+        obVolume[indices] = 0.0
+        lowVolume[indices] = 0.0
+        highVolume[indices] = 0.0
+        mitigated_index[indices] = 0
+        percentage[indices] = 0.0
+
+    # ---- bullish order blocks ----
+    last_top = last_index_before(swing_hl == 1)
+    has_top = last_top >= 0
+    crossing = np.zeros(ohlc_len, dtype=bool)
+    crossing[has_top] = _close[has_top] > _high[last_top[has_top]]
+    close_indices, top_indices = first_in_group(last_top, crossing)
+
+    created_at = []
+    created_ob = []
+    for close_index, last_top_index in zip(close_indices.tolist(), top_indices.tolist()):
+        crossed[last_top_index] = True
+        default_index = close_index - 1
+        obBtm = _high[default_index]
+        obTop = _low[default_index]
+        obIndex = default_index
+        if close_index - last_top_index > 1:
+            start = last_top_index + 1
+            end = close_index
+            if end > start:
+                segment = _low[start:end]
+                min_val = segment.min()
+                candidates = np.nonzero(segment == min_val)[0]
+                if candidates.size:
+                    candidate_index = start + candidates[-1]
+                    obBtm = _low[candidate_index]
+                    obTop = _high[candidate_index]
+                    obIndex = candidate_index
+        ob[obIndex] = 1
+        top_arr[obIndex] = obTop
+        bottom_arr[obIndex] = obBtm
+        obVolume[obIndex] = _volume[close_index] + _volume[close_index - 1] + _volume[close_index - 2]
+        lowVolume[obIndex] = _volume[close_index - 2]
+        highVolume[obIndex] = _volume[close_index] + _volume[close_index - 1]
+        max_vol = max(highVolume[obIndex], lowVolume[obIndex])
+        percentage[obIndex] = (min(highVolume[obIndex], lowVolume[obIndex]) / max_vol * 100.0) if max_vol != 0 else 100.0
+        created_at.append(close_index)
+        created_ob.append(obIndex)
+
+    if created_ob:
+        created_at = np.asarray(created_at, dtype=np.int64)
+        created_ob = np.asarray(created_ob, dtype=np.int64)
+        # a block is first checked on the candle after the one that created it
+        mitigated_at = mitigation_min.first(created_at + 1, bottom_arr[created_ob], "lt")
+        mitigated = mitigated_at >= 0
+        breaker[created_ob[mitigated]] = True
+        mitigated_index[created_ob[mitigated]] = mitigated_at[mitigated] - 1
+        # once a breaker, the block is reset when a later high trades above its top
+        reset_at = high_max.first(mitigated_at[mitigated] + 1, top_arr[created_ob[mitigated]], "gt")
+        reset(created_ob[mitigated][reset_at >= 0])
+
+    # ---- bearish order blocks ----
+    last_btm = last_index_before(swing_hl == -1)
+    has_btm = last_btm >= 0
+    crossing = np.zeros(ohlc_len, dtype=bool)
+    crossing[has_btm] = _close[has_btm] < _low[last_btm[has_btm]]
+    close_indices, btm_indices = first_in_group(last_btm, crossing)
+
+    created_at = []
+    created_ob = []
+    for close_index, last_btm_index in zip(close_indices.tolist(), btm_indices.tolist()):
+        crossed[last_btm_index] = True
+        default_index = close_index - 1
+        obTop = _high[default_index]
+        obBtm = _low[default_index]
+        obIndex = default_index
+        if close_index - last_btm_index > 1:
+            start = last_btm_index + 1
+            end = close_index
+            if end > start:
+                segment = _high[start:end]
+                max_val = segment.max()
+                candidates = np.nonzero(segment == max_val)[0]
+                if candidates.size:
+                    candidate_index = start + candidates[-1]
+                    obTop = _high[candidate_index]
+                    obBtm = _low[candidate_index]
+                    obIndex = candidate_index
+        ob[obIndex] = -1
+        top_arr[obIndex] = obTop
+        bottom_arr[obIndex] = obBtm
+        obVolume[obIndex] = _volume[close_index] + _volume[close_index - 1] + _volume[close_index - 2]
+        lowVolume[obIndex] = _volume[close_index] + _volume[close_index - 1]
+        highVolume[obIndex] = _volume[close_index - 2]
+        max_vol = max(highVolume[obIndex], lowVolume[obIndex])
+        percentage[obIndex] = (min(highVolume[obIndex], lowVolume[obIndex]) / max_vol * 100.0) if max_vol != 0 else 100.0
+        created_at.append(close_index)
+        created_ob.append(obIndex)
+
+    if created_ob:
+        created_at = np.asarray(created_at, dtype=np.int64)
+        created_ob = np.asarray(created_ob, dtype=np.int64)
+        # the breaker flag is shared with the bullish pass, so a block on a candle that
+        # already held a mitigated bullish block starts out as a breaker
+        already_breaker = breaker[created_ob]
+
+        fresh = ~already_breaker
+        mitigated_at = mitigation_max.first(created_at[fresh] + 1, top_arr[created_ob[fresh]], "gt")
+        mitigated = mitigated_at >= 0
+        mitigated_ob = created_ob[fresh][mitigated]
+        breaker[mitigated_ob] = True
+        mitigated_index[mitigated_ob] = mitigated_at[mitigated]
+
+        breaker_ob = np.concatenate([created_ob[already_breaker], mitigated_ob])
+        breaker_since = np.concatenate([created_at[already_breaker], mitigated_at[mitigated]])
+        reset_at = low_min.first(breaker_since + 1, bottom_arr[breaker_ob], "lt")
+        reset(breaker_ob[reset_at >= 0])
+
+    ob = np.where(ob != 0, ob, np.nan)
+    top_arr = np.where(~np.isnan(ob), top_arr, np.nan)
+    bottom_arr = np.where(~np.isnan(ob), bottom_arr, np.nan)
+    obVolume = np.where(~np.isnan(ob), obVolume, np.nan)
+    mitigated_index = np.where(~np.isnan(ob), mitigated_index, np.nan)
+    percentage = np.where(~np.isnan(ob), percentage, np.nan)
+
+    return pd.concat(
+        [
+            pd.Series(ob, name="OB"),
+            pd.Series(top_arr, name="Top"),
+            pd.Series(bottom_arr, name="Bottom"),
+            pd.Series(obVolume, name="OBVolume"),
+            pd.Series(mitigated_index, name="MitigatedIndex"),
+            pd.Series(percentage, name="Percentage"),
+        ],
+        axis=1,
+    )
+
+
+def _group_liquidity(indices, levels, swept, pip_range, n):
+    """
+    Group swing levels of one side into liquidity pools.
+    Unused swing points live in a list sorted by (level, index) so the candidates inside
+    [level - pip_range, level + pip_range] of each pool are found with two bisections.
+    """
+    entries = sorted((levels[i], i) for i in indices.tolist() if not np.isnan(levels[i]))
+    used = np.zeros(n, dtype=bool)
+    pools = []
+
+    for i in indices.tolist():
+        if used[i]:
+            # already grouped into an earlier pool (and removed from the index)
+            continue
+        level = levels[i]
+        if not np.isnan(level):
+            # every later pool only groups swing points after its own index
+            del entries[bisect_left(entries, (level, i))]
+
+        range_low = level - pip_range
+        range_high = level + pip_range
+        sweep = swept[i]
+        group = []
+        if not np.isnan(level):
+            lo = bisect_left(entries, (range_low, -1))
+            hi = bisect_right(entries, (range_high, n))
+            group = sorted(j for _, j in entries[lo:hi] if not sweep or j < sweep)
+
+        if group:
+            for j in group:
+                used[j] = True
+                del entries[bisect_left(entries, (levels[j], j))]
+            group_levels = [level] + [levels[j] for j in group]
+            pools.append((i, sum(group_levels) / len(group_levels), group[-1], sweep))
+
+    return pools
+
+
+def liquidity(
+    _high: np.ndarray,
+    _low: np.ndarray,
+    swing_hl: np.ndarray,
+    swing_level: np.ndarray,
+    range_percent: float = 0.01,
+    pip_range: float = None,
+) -> pd.DataFrame:
+    """
+    Liquidity, O((n + k) log n) engine.
+    The sweep candle of every swing point is found with one batch of RangeExtremes queries and the
+    pools are grouped through a sorted level index, instead of an argmax scan and a full pass over
+    the remaining swing points per pool. Output is identical to the reference loop in smc.liquidity.
+
+    parameters:
+    pip_range: float - fixed grouping range; derived from range_percent of the whole window if None
+
+    returns:
+    Liquidity, Level, End, Swept - see smc.liquidity
+    """
+
+    n = len(_high)
+    if pip_range is None:
+        pip_range = (np.nanmax(_high) - np.nanmin(_low)) * range_percent if n else 0.0
+
+    liquidity = np.full(n, np.nan, dtype=np.float32)
+    liquidity_level = np.full(n, np.nan, dtype=np.float32)
+    liquidity_end = np.full(n, np.nan, dtype=np.float32)
+    liquidity_swept = np.full(n, np.nan, dtype=np.float32)
+
+    sides = (
+        (1, RangeExtremes(_high, "max"), "ge", 1.0),
+        (-1, RangeExtremes(_low, "min"), "le", -1.0),
+    )
+    for direction, extremes, op, sign in sides:
+        indices = np.nonzero(swing_hl == direction)[0]
+        if indices.size == 0:
+            continue
+        # bullish pools are swept by a high at or above level + pip_range, bearish by a low at or below level - pip_range
+        thresholds = swing_level[indices] + sign * pip_range
+        first_sweep = extremes.first(indices + 1, thresholds, op)
+        swept = np.zeros(n, dtype=np.int64)
+        swept[indices] = np.where(first_sweep >= 0, first_sweep, 0)
+
+        for i, avg_level, group_end, sweep in _group_liquidity(indices, swing_level, swept, pip_range, n):
+            liquidity[i] = direction
+            liquidity_level[i] = avg_level
+            liquidity_end[i] = group_end
+            liquidity_swept[i] = sweep
+
+    return pd.concat(
+        [
+            pd.Series(liquidity, name="Liquidity"),
+            pd.Series(liquidity_level, name="Level"),
+            pd.Series(liquidity_end, name="End"),
+            pd.Series(liquidity_swept, name="Swept"),
+        ],
+        axis=1,
+    )
+
+
+def previous_high_low(
+    index: pd.DatetimeIndex,
+    _open: np.ndarray,
+    _high: np.ndarray,
+    _low: np.ndarray,
+    _close: np.ndarray,
+    _volume: np.ndarray,
+    time_frame: str = "1D",
+) -> pd.DataFrame:
+    """
+    Previous High Low, vectorized.
+    Every candle is mapped to its previous completed bucket with a single searchsorted over the
+    resampled bucket labels, and the broken flags are a cumulative "any" within each run of
+    candles that share the same previous bucket.
+
+    returns:
+    PreviousHigh, PreviousLow, BrokenHigh, BrokenLow - see smc.previous_high_low
+    """
+
+    n = len(index)
+    resampled_ohlc = pd.DataFrame(
+        {"open": _open, "high": _high, "low": _low, "close": _close, "volume": _volume},
+        index=index,
+    ).resample(time_frame).agg(
+        {
+            "open": "first",
+            "high": "max",
+            "low": "min",
+            "close": "last",
+            "volume": "sum",
+        }
+    ).dropna()
+
+    # number of bucket labels strictly before each candle; the previous bucket is the second to last of them
+    labels_before = resampled_ohlc.index.searchsorted(index, side="left")
+    valid = labels_before >= 2
+    bucket = np.where(valid, labels_before - 2, -1)
+
+    previous_high = np.full(n, np.nan, dtype=np.float32)
+    previous_low = np.full(n, np.nan, dtype=np.float32)
+    previous_high[valid] = resampled_ohlc["high"].values[bucket[valid]]
+    previous_low[valid] = resampled_ohlc["low"].values[bucket[valid]]
+
+    positions = np.arange(n)
+    run_start = valid & (bucket != np.r_[-1, bucket[:-1]])
+    current_run = np.maximum.accumulate(np.where(run_start, positions, -1))
+
+    def broken(crossed):
+        last_cross = np.maximum.accumulate(np.where(valid & crossed, positions, -1))
+        return (valid & (last_cross >= current_run)).astype(np.int32)
+
+    broken_high = broken(_high > previous_high)
+    broken_low = broken(_low < previous_low)
+
+    return pd.concat(
+        [
+            pd.Series(previous_high, name="PreviousHigh"),
+            pd.Series(previous_low, name="PreviousLow"),
+            pd.Series(broken_high, name="BrokenHigh"),
+            pd.Series(broken_low, name="BrokenLow"),
+        ],
+        axis=1,
+    )
+
+
+def session_ranges(
+    minute_of_day: np.ndarray,
+    _high: np.ndarray,
+    _low: np.ndarray,
+    start_minute: int,
+    end_minute: int,
+) -> pd.DataFrame:
+    """
+    Sessions, vectorized.
+    The session mask is computed on minute-of-day integers and the running high/low is a
+    cumulative max/min segmented per contiguous block of in-session candles.
+
+    returns:
+    Active, High, Low - see smc.sessions
+    """
+
+    n = len(minute_of_day)
+    if start_minute < end_minute:
+        in_session = (minute_of_day >= start_minute) & (minute_of_day <= end_minute)
+    else:
+        in_session = (minute_of_day >= start_minute) | (minute_of_day <= end_minute)
+
+    active = in_session.astype(np.int32)
+    high = np.zeros(n, dtype=np.float32)
+    low = np.zeros(n, dtype=np.float32)
+
+    if in_session.any():
+        block_start = in_session & ~np.r_[False, in_session[:-1]]
+        block = np.cumsum(block_start)[in_session]
+        running_high = pd.Series(_high[in_session]).groupby(block).cummax().values
+        running_low = pd.Series(_low[in_session]).groupby(block).cummin().values
+        # the reference loop seeds every block with a running high of 0
+        high[in_session] = np.maximum(running_high, 0.0)
+        low[in_session] = running_low
+
+    return pd.concat(
+        [
+            pd.Series(active, name="Active"),
+            pd.Series(high, name="High"),
+            pd.Series(low, name="Low"),
+        ],
+        axis=1,
+    )
+
+
+def retracements(
+    _high: np.ndarray,
+    _low: np.ndarray,
+    swing_hl: np.ndarray,
+    swing_level: np.ndarray,
+) -> pd.DataFrame:
+    """
+    Retracements, vectorized.
+    The last swing top/bottom and the current direction are forward-filled with a running
+    max over swing positions, the retracement % is computed on whole arrays, and the deepest
+    retracement is a running max segmented per run of candles in the same direction.
+    Bit-for-bit equal to the reference loop.
+
+    returns:
+    Direction, CurrentRetracement%, DeepestRetracement% - see smc.retracements
+    """
+
+    n = len(_high)
+    positions = np.arange(n)
+    is_high = swing_hl == 1
+    is_low = swing_hl == -1
+
+    def last_where(mask):
+        return np.maximum.accumulate(np.where(mask, positions, -1)) if n else positions
+
+    last_swing = last_where(is_high | is_low)
+    last_top = last_where(is_high)
+    last_bottom = last_where(is_low)
+
+    direction = np.where(last_swing >= 0, swing_hl[np.maximum(last_swing, 0)], 0).astype(np.int32)
+    top = np.where(last_top >= 0, swing_level[np.maximum(last_top, 0)], 0.0)
+    bottom = np.where(last_bottom >= 0, swing_level[np.maximum(last_bottom, 0)], 0.0)
+
+    # direction[i - 1]; on the first candle the reference loop reads direction[-1], which is only set when n == 1
+    previous_direction = np.r_[direction[-1:] if n == 1 else np.zeros(min(n, 1), dtype=np.int32), direction[:-1]]
+
+    bullish = previous_direction == 1
+    bearish = direction == -1
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bullish_retracement = np.round(100 - (((_low - bottom) / (top - bottom)) * 100), 1)
+        bearish_retracement = np.round(100 - ((_high - top) / (bottom - top)) * 100, 1)
+
+    current_retracement = np.zeros(n, dtype=np.float64)
+    current_retracement[bullish] = bullish_retracement[bullish]
+    current_retracement[bearish] = bearish_retracement[bearish]
+
+    # the deepest retracement accumulates over each run of candles on the same branch, starting from 0
+    branch = np.where(bearish, 2, np.where(bullish, 1, 0))
+    run = np.cumsum(np.r_[True, branch[1:] != branch[:-1]]) if n else branch
+    running_max = (
+        pd.Series(np.where(np.isnan(current_retracement), -np.inf, current_retracement))
+        .groupby(run)
+        .cummax()
+        .values
+    )
+    deepest_retracement = np.where((branch != 0) & (running_max > 0), running_max, 0.0)
+
+    # shift the arrays by 1
+    current_retracement = np.roll(current_retracement, 1)
+    deepest_retracement = np.roll(deepest_retracement, 1)
+    direction = np.roll(direction, 1)
+
+    # remove the first 3 retracements as they get calculated incorrectly due to not enough data
+    if n > 1:
+        changes = np.flatnonzero(direction[:-1] != direction[1:])
+        cut = changes[2] + 2 if len(changes) >= 3 else n - 1
+        direction[:cut] = 0
+        current_retracement[:cut] = 0
+        deepest_retracement[:cut] = 0
+
+    return pd.concat(
+        [
+            pd.Series(direction, name="Direction"),
+            pd.Series(current_retracement, name="CurrentRetracement%"),
+            pd.Series(deepest_retracement, name="DeepestRetracement%"),
+        ],
+        axis=1,
+    )
+
+
+def bos_choch(
+    _high: np.ndarray,
+    _low: np.ndarray,
+    _close: np.ndarray,
+    swing_hl: np.ndarray,
+    swing_level: np.ndarray,
+    close_break: bool = True,
+) -> pd.DataFrame:
+    """
+    BOS / CHoCH, single-pass engine.
+    The four-swing patterns are evaluated on whole arrays of consecutive swings, the first
+    breaking candle of every level comes from one batch of RangeExtremes queries, and earlier
+    levels are invalidated with a stack of open levels whose break indices are strictly
+    increasing, so each level is pushed and popped at most once.
+    Output is identical to the reference loops in smc.bos_choch.
+
+    returns:
+    BOS, CHOCH, Level, BrokenIndex - see smc.bos_choch
+    """
+
+    n = len(_close)
+    bos = np.zeros(n, dtype=np.int32)
+    choch = np.zeros(n, dtype=np.int32)
+    level = np.zeros(n, dtype=np.float32)
+    broken = np.zeros(n, dtype=np.int32)
+
+    positions = np.flatnonzero(~np.isnan(swing_hl))
+    if len(positions) >= 4:
+        hl = swing_hl[positions]
+        lv = swing_level[positions]
+        # for the k-th swing (k >= 3) the pattern uses swings k-3..k and is stored on swing k-2
+        a, b, c, d = lv[:-3], lv[1:-2], lv[2:-1], lv[3:]
+        h0, h1, h2, h3 = hl[:-3], hl[1:-2], hl[2:-1], hl[3:]
+        bullish_pattern = (h0 == -1) & (h1 == 1) & (h2 == -1) & (h3 == 1)
+        bearish_pattern = (h0 == 1) & (h1 == -1) & (h2 == 1) & (h3 == -1)
+
+        bos_values = np.where(
+            bullish_pattern & (a < c) & (c < b) & (b < d),
+            1,
+            np.where(bearish_pattern & (a > c) & (c > b) & (b > d), -1, 0),
+        )
+        choch_values = np.where(
+            bullish_pattern & (d > b) & (b > a) & (a > c),
+            1,
+            np.where(bearish_pattern & (d < b) & (b < a) & (a < c), -1, 0),
+        )
+        target = positions[1:-2]
+        bos[target] = bos_values
+        choch[target] = choch_values
+        level[target] = np.where((bos_values != 0) | (choch_values != 0), b, 0)
+
+    events = np.flatnonzero((bos != 0) | (choch != 0))
+    if events.size:
+        bullish = (bos[events] == 1) | (choch[events] == 1)
+        break_at = np.full(events.size, -1, dtype=np.int64)
+        up_source = _close if close_break else _high
+        down_source = _close if close_break else _low
+        if bullish.any():
+            break_at[bullish] = RangeExtremes(up_source, "max").first(
+                events[bullish] + 2, level[events[bullish]], "gt"
+            )
+        if (~bullish).any():
+            break_at[~bullish] = RangeExtremes(down_source, "min").first(
+                events[~bullish] + 2, level[events[~bullish]], "lt"
+            )
+
+        # open (broken, still valid) levels; their break indices are strictly increasing
+        open_levels = []
+        for i, j in zip(events.tolist(), break_at.tolist()):
+            if j < 0:
+                continue
+            broken[i] = j
+            # a level broken at or after this one started earlier and ended later: drop it
+            while open_levels and broken[open_levels[-1]] >= j:
+                k = open_levels.pop()
+                bos[k] = 0
+                choch[k] = 0
+                level[k] = 0
+            open_levels.append(i)
+
+        # remove the ones that aren't broken
+        unbroken = events[break_at < 0]
+        bos[unbroken] = 0
+        choch[unbroken] = 0
+        level[unbroken] = 0
+
+    bos = np.where(bos != 0, bos, np.nan)
+    choch = np.where(choch != 0, choch, np.nan)
+    level = np.where(level != 0, level, np.nan)
+    broken = np.where(broken != 0, broken, np.nan)
+
+    return pd.concat(
+        [
+            pd.Series(bos, name="BOS"),
+            pd.Series(choch, name="CHOCH"),
+            pd.Series(level, name="Level"),
+            pd.Series(broken, name="BrokenIndex"),
+        ],
+        axis=1,
+    )
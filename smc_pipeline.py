@@ -0,0 +1,168 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import smc_engine
+
+
+class SMCPipeline:
+    """
+    SMC Pipeline
+    Normalizes an OHLCV frame once into contiguous float64 arrays and computes SMC indicators
+    on demand. Every intermediate (e.g. swing highs/lows, which bos_choch, ob, liquidity and
+    retracements all depend on) is computed once and memoized, so requesting several
+    indicators does not repeat the per-call column renaming and frame copies of the smc class.
+
+    parameters:
+    ohlc: DataFrame - candles with open, high, low, close and volume columns (any case)
+    swing_length: int - swing length used for swing_highs_lows
+    """
+
+    # indicator name -> (method, indicators it depends on)
+    INDICATORS = {
+        "swing_hl": ("swing_highs_lows", ()),
+        "fvg": ("fvg", ()),
+        "bos_choch": ("bos_choch", ("swing_hl",)),
+        "ob": ("ob", ("swing_hl",)),
+        "liquidity": ("liquidity", ("swing_hl",)),
+        "retracements": ("retracements", ("swing_hl",)),
+        "previous_day": ("previous_day", ()),
+        "previous_week": ("previous_week", ()),
+    }
+
+    def __init__(self, ohlc: pd.DataFrame, swing_length: int = 50):
+        columns = {c.lower(): c for c in ohlc.columns}
+        for column in ("open", "high", "low", "close", "volume"):
+            if column not in columns:
+                raise LookupError('Must have a dataframe column named "{0}"'.format(column))
+
+        self.index = pd.DatetimeIndex(pd.to_datetime(ohlc.index))
+        self.open = self._column(ohlc, columns["open"])
+        self.high = self._column(ohlc, columns["high"])
+        self.low = self._column(ohlc, columns["low"])
+        self.close = self._column(ohlc, columns["close"])
+        self.volume = self._column(ohlc, columns["volume"])
+        self.swing_length = swing_length
+        self._memo = {}
+
+    @staticmethod
+    def _column(ohlc: pd.DataFrame, name: str) -> np.ndarray:
+        return np.ascontiguousarray(ohlc[name].to_numpy(dtype=np.float64))
+
+    def __len__(self):
+        return len(self.close)
+
+    def _cached(self, key, compute):
+        if key not in self._memo:
+            self._memo[key] = compute()
+        return self._memo[key]
+
+    def swing_highs_lows(self) -> pd.DataFrame:
+        return self._cached(
+            "swing_hl",
+            lambda: smc_engine.swing_highs_lows(self.high, self.low, self.swing_length),
+        )
+
+    def fvg(self) -> pd.DataFrame:
+        return self._cached(
+            "fvg",
+            lambda: smc_engine.fair_value_gaps(self.open, self.high, self.low, self.close),
+        )
+
+    def bos_choch(self) -> pd.DataFrame:
+        def compute():
+            swing_hl = self.swing_highs_lows()
+            return smc_engine.bos_choch(
+                self.high, self.low, self.close,
+                swing_hl["HighLow"].values, swing_hl["Level"].values,
+            )
+
+        return self._cached("bos_choch", compute)
+
+    def ob(self) -> pd.DataFrame:
+        def compute():
+            swing_hl = self.swing_highs_lows()
+            return smc_engine.order_blocks(
+                self.open, self.high, self.low, self.close, self.volume,
+                swing_hl["HighLow"].values,
+            )
+
+        return self._cached("ob", compute)
+
+    def liquidity(self) -> pd.DataFrame:
+        def compute():
+            swing_hl = self.swing_highs_lows()
+            return smc_engine.liquidity(
+                self.high, self.low, swing_hl["HighLow"].values, swing_hl["Level"].values,
+            )
+
+        return self._cached("liquidity", compute)
+
+    def retracements(self) -> pd.DataFrame:
+        def compute():
+            swing_hl = self.swing_highs_lows()
+            return smc_engine.retracements(
+                self.high, self.low, swing_hl["HighLow"].values, swing_hl["Level"].values,
+            )
+
+        return self._cached("retracements", compute)
+
+    def previous_high_low(self, time_frame: str = "1D") -> pd.DataFrame:
+        return self._cached(
+            ("previous_high_low", time_frame),
+            lambda: smc_engine.previous_high_low(
+                self.index, self.open, self.high, self.low, self.close, self.volume, time_frame,
+            ),
+        )
+
+    def previous_day(self) -> pd.DataFrame:
+        return self.previous_high_low("1D")
+
+    def previous_week(self) -> pd.DataFrame:
+        return self.previous_high_low("1W")
+
+    def minute_of_day(self) -> np.ndarray:
+        """Minute of the day in UTC; naive timestamps are taken as UTC."""
+
+        def compute():
+            index = self.index.tz_convert("UTC") if self.index.tz is not None else self.index
+            return np.asarray(index.hour * 60 + index.minute)
+
+        return self._cached("minute_of_day", compute)
+
+    def sessions(self, session: str) -> pd.DataFrame:
+        def compute():
+            start_time = datetime.strptime(smc_engine.DEFAULT_SESSIONS[session]["start"], "%H:%M")
+            end_time = datetime.strptime(smc_engine.DEFAULT_SESSIONS[session]["end"], "%H:%M")
+            return smc_engine.session_ranges(
+                self.minute_of_day(), self.high, self.low,
+                start_time.hour * 60 + start_time.minute,
+                end_time.hour * 60 + end_time.minute,
+            )
+
+        return self._cached(("sessions", session), compute)
+
+    def run(self, indicators=None) -> dict:
+        """
+        Compute the requested indicators (all of INDICATORS by default) in dependency order
+        and return them as a dict keyed by indicator name.
+        """
+        indicators = list(self.INDICATORS) if indicators is None else list(indicators)
+
+        ordered = []
+
+        def visit(name):
+            if name in ordered:
+                return
+            if name not in self.INDICATORS:
+                raise ValueError(f'Unknown indicator "{name}"')
+            for dependency in self.INDICATORS[name][1]:
+                visit(dependency)
+            ordered.append(name)
+
+        for name in indicators:
+            visit(name)
+
+        results = {name: getattr(self, self.INDICATORS[name][0])() for name in ordered}
+        return {name: results[name] for name in indicators}
@@ -0,0 +1,850 @@
+import heapq
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict, deque
+
+import numpy as np
+import pandas as pd
+
+import smc_engine
+
+
+class _Triggers:
+    """
+    Pending "first index >= start where value <op> threshold" queries over a growing list.
+    Open queries sit in a heap keyed so that the ones a new value hits are always on top,
+    so every new value costs O(1) plus O(log k) per query it resolves. Queries cancelled by
+    clearing their handle are dropped whenever the queue has doubled since the last pruning.
+    """
+
+    def __init__(self, values: list, op: str):
+        self.values = values
+        self.op = op
+        self._heap = []
+        self._deferred = []
+        self._sequence = 0
+        self._pruned_size = 0
+
+    def __len__(self):
+        return len(self._heap) + len(self._deferred)
+
+    def _prune(self):
+        self._heap = [entry for entry in self._heap if entry[4]["active"]]
+        heapq.heapify(self._heap)
+        self._deferred = [(start, entry) for start, entry in self._deferred if entry[4]["active"]]
+        self._pruned_size = len(self)
+
+    def _hit(self, value, threshold) -> bool:
+        if self.op == "lt":
+            return value < threshold
+        if self.op == "le":
+            return value <= threshold
+        if self.op == "gt":
+            return value > threshold
+        return value >= threshold
+
+    def watch(self, start: int, threshold: float, callback):
+        """
+        Return (index, handle). If a value already in the list hits the threshold at or after
+        start, index is the first such position and nothing is queued. Otherwise index is -1 and
+        callback(index) runs on the first later hit, unless handle["active"] is cleared first.
+        """
+        handle = {"active": False}
+        values = self.values
+        for i in range(max(start, 0), len(values)):
+            if self._hit(values[i], threshold):
+                return i, handle
+        if threshold != threshold:
+            # NaN never hits
+            return -1, handle
+
+        handle["active"] = True
+        self._sequence += 1
+        key = threshold if self.op in ("gt", "ge") else -threshold
+        entry = (key, self._sequence, threshold, callback, handle)
+        if start >= len(values):
+            self._deferred.append((start, entry))
+        else:
+            heapq.heappush(self._heap, entry)
+        if len(self) > 2 * self._pruned_size + 64:
+            self._prune()
+        return -1, handle
+
+    def fire(self):
+        """Run the callback of every query the newest value hits."""
+        index = len(self.values) - 1
+        if self._deferred:
+            waiting = []
+            for start, entry in self._deferred:
+                if start <= index:
+                    heapq.heappush(self._heap, entry)
+                else:
+                    waiting.append((start, entry))
+            self._deferred = waiting
+
+        value = self.values[index]
+        heap = self._heap
+        hits = []
+        while heap and self._hit(value, heap[0][2]):
+            _, _, _, callback, handle = heapq.heappop(heap)
+            if handle["active"]:
+                handle["active"] = False
+                hits.append(callback)
+        for callback in hits:
+            callback(index)
+
+
+class SMCStream:
+    """
+    SMC Stream
+    Stateful, incremental SMC engine for one symbol and timeframe. Candles are fed one at a time
+    with update(), which returns the events that candle produced: final swings, new and mitigated
+    FVGs, BOS/CHoCH breaks, new/mitigated/removed order blocks and new/grown/swept liquidity pools.
+    Each update costs amortized O(1) plus O(log k) per resolved level, where k is the number of
+    levels still waiting to be mitigated, broken or swept.
+
+    The batch smc methods look at a fixed window and may revise the latest swing when more
+    candles arrive. The stream instead builds BOS/CHoCH, order blocks and liquidity from final
+    swings only: a swing is final once the next swing of the opposite type is confirmed, and it
+    never changes afterwards. Liquidity uses a fixed pip range. On the same final swings and pip
+    range the stream gives exactly the output of the smc_engine kernels over its whole history,
+    which check_equivalence verifies.
+
+    parameters:
+    swing_length: int - see smc.swing_highs_lows
+    pip_range: float - liquidity grouping range, fixed for the life of the stream. If None it is
+        derived from range_percent of the candles seen when the first swing becomes final
+    range_percent: float - see smc.liquidity
+    close_break: bool - see smc.bos_choch
+    close_mitigation: bool - see smc.ob
+    """
+
+    def __init__(
+        self,
+        swing_length: int = 50,
+        pip_range: float = None,
+        range_percent: float = 0.01,
+        close_break: bool = True,
+        close_mitigation: bool = False,
+    ):
+        self.swing_length = swing_length
+        self.pip_range = pip_range
+        self.range_percent = range_percent
+        self.close_break = close_break
+        self.close_mitigation = close_mitigation
+
+        self.time = []
+        self.open = []
+        self.high = []
+        self.low = []
+        self.close = []
+        self.volume = []
+        # order block mitigation sources, min/max(open, close) with close_mitigation
+        self._bullish_mitigation = [] if close_mitigation else self.low
+        self._bearish_mitigation = [] if close_mitigation else self.high
+
+        self._high_gt = _Triggers(self.high, "gt")
+        self._high_ge = _Triggers(self.high, "ge")
+        self._low_lt = _Triggers(self.low, "lt")
+        self._low_le = _Triggers(self.low, "le")
+        self._close_gt = _Triggers(self.close, "gt")
+        self._close_lt = _Triggers(self.close, "lt")
+        self._triggers = [self._high_gt, self._high_ge, self._low_lt, self._low_le, self._close_gt, self._close_lt]
+        if close_mitigation:
+            self._bullish_mitigation_lt = _Triggers(self._bullish_mitigation, "lt")
+            self._bearish_mitigation_gt = _Triggers(self._bearish_mitigation, "gt")
+            self._triggers += [self._bullish_mitigation_lt, self._bearish_mitigation_gt]
+        else:
+            self._bullish_mitigation_lt = self._low_lt
+            self._bearish_mitigation_gt = self._high_gt
+        self._break_up = self._close_gt if close_break else self._high_gt
+        self._break_down = self._close_lt if close_break else self._low_lt
+
+        self._events = []
+
+        # swings: sliding window extremes, the current (not yet final) run and the final swings
+        self._window_max = deque()
+        self._window_min = deque()
+        self._run_type = None
+        self._run_index = None
+        self._swings = []
+
+        # fvg: candle index -> gap
+        self._fvgs = {}
+
+        # bos / choch: broken levels that are still valid (break indices strictly increasing)
+        self._bos_levels = []
+        self._bos_broken_levels = []
+        self._last_broken_target = -1
+
+        # order blocks: swing type -> group of the last final swing, direction -> candle index -> block
+        self._ob_groups = {1: None, -1: None}
+        self._blocks = {1: {}, -1: {}}
+
+        # liquidity: swing type -> sorted (level, index) anchors, pools and sweep candles
+        self._liquidity = {
+            kind: {"anchors": [], "pools": {}, "sweeps": {}} for kind in (1, -1)
+        }
+
+    @classmethod
+    def from_frame(cls, ohlc: pd.DataFrame, **options) -> "SMCStream":
+        """
+        Build a stream from an OHLCV frame. Unless pip_range is given it is fixed from the range
+        of the whole frame, like smc.liquidity does for its window.
+        """
+        columns = {c.lower(): c for c in ohlc.columns}
+        arrays = [
+            ohlc[columns[name]].to_numpy(dtype=np.float64).tolist()
+            for name in ("open", "high", "low", "close", "volume")
+        ]
+        if options.get("pip_range") is None and len(ohlc):
+            options["pip_range"] = (
+                np.nanmax(arrays[1]) - np.nanmin(arrays[2])
+            ) * options.get("range_percent", 0.01)
+
+        stream = cls(**options)
+        for timestamp, o, h, l, c, v in zip(ohlc.index, *arrays):
+            stream._append(timestamp, o, h, l, c, v)
+        stream._events = []
+        return stream
+
+    def __len__(self):
+        return len(self.close)
+
+    def pending(self) -> int:
+        """Number of queued level watches (FVG mitigation, breaks, order blocks, sweeps)."""
+        return sum(len(triggers) for triggers in self._triggers)
+
+    def tail(self, candles: int) -> "SMCStream":
+        """
+        A new stream built from the last `candles` candles only, with the same options and pip
+        range. State older than the window (mitigated zones, broken levels, swept pools and
+        their pending watches) is dropped.
+        """
+        frame = pd.DataFrame(
+            {
+                "open": self.open[-candles:],
+                "high": self.high[-candles:],
+                "low": self.low[-candles:],
+                "close": self.close[-candles:],
+                "volume": self.volume[-candles:],
+            },
+            index=self.time[-candles:],
+        )
+        return SMCStream.from_frame(
+            frame,
+            swing_length=self.swing_length,
+            pip_range=self.pip_range,
+            range_percent=self.range_percent,
+            close_break=self.close_break,
+            close_mitigation=self.close_mitigation,
+        )
+
+    def update(self, candle) -> list:
+        """
+        Feed the next closed candle (a mapping with open, high, low, close, volume and an
+        optional timestamp) and return the events it produced, oldest first.
+        """
+        self._append(
+            candle.get("timestamp"),
+            float(candle["open"]),
+            float(candle["high"]),
+            float(candle["low"]),
+            float(candle["close"]),
+            float(candle["volume"]),
+        )
+        events, self._events = self._events, []
+        return events
+
+    def _append(self, timestamp, o, h, l, c, v):
+        self.time.append(timestamp)
+        self.open.append(o)
+        self.high.append(h)
+        self.low.append(l)
+        self.close.append(c)
+        self.volume.append(v)
+        if self.close_mitigation:
+            self._bullish_mitigation.append(c if c < o else o)
+            self._bearish_mitigation.append(c if c > o else o)
+
+        t = len(self.close) - 1
+        # levels already waiting for this candle first, then structure that starts on it
+        for triggers in self._triggers:
+            triggers.fire()
+        self._update_fvg(t)
+        self._update_swings(t)
+
+    def _emit(self, kind: str, action: str, index: int, **fields):
+        self._events.append(
+            {"type": kind, "action": action, "index": index, "time": self.time[index], **fields}
+        )
+
+    def _watch(self, owner: dict, triggers: _Triggers, start: int, threshold: float, callback):
+        """Keep the watch handle on owner["watch"], then run callback now if the level was already hit."""
+        index, owner["watch"] = triggers.watch(start, threshold, callback)
+        if index >= 0:
+            callback(index)
+
+    # ---- fair value gaps ----
+
+    def _update_fvg(self, t: int):
+        i = t - 1
+        if i < 1:
+            return
+        high, low = self.high, self.low
+        if self.close[i] > self.open[i]:
+            if not high[i - 1] < low[t]:
+                return
+            gap = {"FVG": 1, "Top": low[t], "Bottom": high[i - 1], "MitigatedIndex": 0}
+            triggers, threshold = self._low_le, gap["Top"]
+        elif self.close[i] < self.open[i]:
+            if not low[i - 1] > high[t]:
+                return
+            gap = {"FVG": -1, "Top": low[i - 1], "Bottom": high[t], "MitigatedIndex": 0}
+            triggers, threshold = self._high_ge, gap["Bottom"]
+        else:
+            return
+
+        self._fvgs[i] = gap
+        self._emit("fvg", "new", i, direction=gap["FVG"], top=gap["Top"], bottom=gap["Bottom"])
+        self._watch(gap, triggers, i + 2, threshold, lambda j: self._fvg_mitigated(i, j))
+
+    def _fvg_mitigated(self, i: int, j: int):
+        gap = self._fvgs[i]
+        gap["MitigatedIndex"] = j
+        self._emit("fvg", "mitigated", i, direction=gap["FVG"], top=gap["Top"], bottom=gap["Bottom"], mitigated_index=j)
+
+    # ---- swings ----
+
+    def _update_swings(self, t: int):
+        high, low = self.high, self.low
+        width = 2 * self.swing_length
+        window_max, window_min = self._window_max, self._window_min
+
+        while window_max and high[window_max[-1]] <= high[t]:
+            window_max.pop()
+        window_max.append(t)
+        if window_max[0] <= t - width:
+            window_max.popleft()
+        while window_min and low[window_min[-1]] >= low[t]:
+            window_min.pop()
+        window_min.append(t)
+        if window_min[0] <= t - width:
+            window_min.popleft()
+
+        # candle i is a swing when it holds the extreme of the swing_length candles on both sides
+        i = t - self.swing_length
+        if i < width - 1:
+            return
+        if high[i] == high[window_max[0]]:
+            self._raw_swing(i, 1)
+        elif low[i] == low[window_min[0]]:
+            self._raw_swing(i, -1)
+
+    def _raw_swing(self, i: int, kind: int):
+        if self._run_type is None:
+            # the first candle takes the opposite side of the first swing
+            self._final_swing(0, -kind)
+        elif kind == self._run_type:
+            # consecutive swings of one type keep the first most extreme one
+            if (kind == 1 and self.high[i] > self.high[self._run_index]) or (
+                kind == -1 and self.low[i] < self.low[self._run_index]
+            ):
+                self._run_index = i
+            return
+        else:
+            self._final_swing(self._run_index, self._run_type)
+        self._run_type, self._run_index = kind, i
+
+    def _final_swing(self, index: int, kind: int):
+        level = self.high[index] if kind == 1 else self.low[index]
+        self._swings.append((index, kind, level))
+        self._emit("swing", "new", index, direction=kind, level=level)
+        self._update_bos_choch()
+        self._update_order_blocks(index, kind)
+        self._update_liquidity(index, kind, level)
+
+    # ---- bos / choch ----
+
+    def _update_bos_choch(self):
+        if len(self._swings) < 4:
+            return
+        (_, h0, a), (target, h1, b), (_, h2, c), (_, h3, d) = self._swings[-4:]
+        bullish_pattern = h0 == -1 and h1 == 1 and h2 == -1 and h3 == 1
+        bearish_pattern = h0 == 1 and h1 == -1 and h2 == 1 and h3 == -1
+
+        bos = 1 if bullish_pattern and a < c < b < d else -1 if bearish_pattern and a > c > b > d else 0
+        choch = 1 if bullish_pattern and d > b > a > c else -1 if bearish_pattern and d < b < a < c else 0
+        if not bos and not choch:
+            return
+
+        level = {"index": target, "BOS": bos, "CHOCH": choch, "Level": np.float32(b), "BrokenIndex": 0}
+        triggers = self._break_up if bos == 1 or choch == 1 else self._break_down
+        self._watch(level, triggers, target + 2, float(level["Level"]), lambda j: self._bos_broken(level, j))
+
+    def _bos_broken(self, level: dict, j: int):
+        level["BrokenIndex"] = j
+        self._bos_broken_levels.append(level)
+        if level["index"] < self._last_broken_target:
+            # a later level already broke at or before j
+            return
+        self._last_broken_target = level["index"]
+
+        # earlier levels broken at or after j are replaced by this one
+        while self._bos_levels and self._bos_levels[-1]["BrokenIndex"] >= j:
+            self._emit_bos(self._bos_levels.pop(), "removed")
+        self._bos_levels.append(level)
+        self._emit_bos(level, "new")
+
+    def _emit_bos(self, level: dict, action: str):
+        kind = "bos" if level["BOS"] else "choch"
+        self._emit(
+            kind, action, level["index"],
+            direction=level["BOS"] or level["CHOCH"],
+            level=float(level["Level"]),
+            broken_index=level["BrokenIndex"],
+        )
+
+    # ---- order blocks ----
+
+    def _update_order_blocks(self, index: int, kind: int):
+        group = self._ob_groups[kind]
+        if group is not None:
+            group["watch"]["active"] = False
+            block = group["block"]
+            if block is not None and block["created"] > index:
+                # the crossing candle belongs to the new swing, so the old swing never crossed
+                self._drop_block(block)
+
+        group = {"swing": index, "direction": kind, "block": None}
+        self._ob_groups[kind] = group
+        if kind == 1:
+            self._watch(group, self._close_gt, index + 1, self.high[index], lambda c: self._create_block(group, c))
+        else:
+            self._watch(group, self._close_lt, index + 1, self.low[index], lambda c: self._create_block(group, c))
+
+    def _create_block(self, group: dict, c: int):
+        p, direction = group["swing"], group["direction"]
+        high, low = self.high, self.low
+        x = c - 1
+        if direction == 1:
+            top, bottom = low[x], high[x]
+            if c - p > 1:
+                segment = low[p + 1:c]
+                x = c - 1 - segment[::-1].index(min(segment))
+                top, bottom = high[x], low[x]
+        else:
+            top, bottom = high[x], low[x]
+            if c - p > 1:
+                segment = high[p + 1:c]
+                x = c - 1 - segment[::-1].index(max(segment))
+                top, bottom = high[x], low[x]
+
+        block = {
+            "index": x,
+            "direction": direction,
+            "created": c,
+            "Top": np.float32(top),
+            "Bottom": np.float32(bottom),
+            "mitigated": None,
+            "reset": None,
+            "breaker_start": False,
+        }
+        group["block"] = block
+        self._blocks[direction][x] = block
+        self._emit_block(block, "new")
+        self._start_block(block)
+
+    def _start_block(self, block: dict):
+        c = block["created"]
+        if block["direction"] == 1:
+            self._watch(
+                block, self._bullish_mitigation_lt, c + 1, float(block["Bottom"]),
+                lambda m: self._block_mitigated(block, m),
+            )
+            return
+
+        # smc.ob shares the breaker flag between both passes: a bearish block on the candle of a
+        # mitigated bullish block is a breaker from the start
+        bullish = self._blocks[1].get(block["index"])
+        block["breaker_start"] = bullish is not None and bullish["mitigated"] is not None
+        if block["breaker_start"]:
+            self._watch(block, self._low_lt, c + 1, float(block["Bottom"]), lambda r: self._block_reset(block, r))
+        else:
+            self._watch(
+                block, self._bearish_mitigation_gt, c + 1, float(block["Top"]),
+                lambda m: self._block_mitigated(block, m),
+            )
+
+    def _restart_block(self, block: dict):
+        block["watch"]["active"] = False
+        block["mitigated"] = None
+        block["reset"] = None
+        self._start_block(block)
+        self._emit_block(block, "changed")
+
+    def _block_mitigated(self, block: dict, m: int):
+        block["mitigated"] = m
+        self._emit_block(block, "mitigated")
+        if block["direction"] == 1:
+            self._watch(block, self._high_gt, m + 1, float(block["Top"]), lambda r: self._block_reset(block, r))
+            bearish = self._blocks[-1].get(block["index"])
+            if bearish is not None and not bearish["breaker_start"]:
+                self._restart_block(bearish)
+        else:
+            self._watch(block, self._low_lt, m + 1, float(block["Bottom"]), lambda r: self._block_reset(block, r))
+
+    def _block_reset(self, block: dict, r: int):
+        block["reset"] = r
+        self._emit_block(block, "removed")
+
+    def _drop_block(self, block: dict):
+        block["watch"]["active"] = False
+        del self._blocks[block["direction"]][block["index"]]
+        if block["reset"] is None:
+            self._emit_block(block, "removed")
+        if block["direction"] == 1 and block["mitigated"] is not None:
+            bearish = self._blocks[-1].get(block["index"])
+            if bearish is not None and bearish["breaker_start"]:
+                self._restart_block(bearish)
+
+    def _block_mitigated_index(self, block: dict) -> int:
+        if block["breaker_start"]:
+            # keeps the index of the bullish block it replaced
+            bullish = self._blocks[1].get(block["index"])
+            if bullish is None or bullish["reset"] is not None:
+                return 0
+            return bullish["mitigated"] - 1
+        if block["mitigated"] is None:
+            return 0
+        return block["mitigated"] - 1 if block["direction"] == 1 else block["mitigated"]
+
+    def _emit_block(self, block: dict, action: str):
+        self._emit(
+            "ob", action, block["index"],
+            direction=block["direction"],
+            top=float(block["Top"]),
+            bottom=float(block["Bottom"]),
+            mitigated_index=self._block_mitigated_index(block),
+        )
+
+    # ---- liquidity ----
+
+    def _update_liquidity(self, index: int, kind: int, level: float):
+        if level != level:
+            return
+        if self.pip_range is None:
+            self.pip_range = (max(self.high) - min(self.low)) * self.range_percent
+        pip_range = self.pip_range
+        side = self._liquidity[kind]
+        anchors, sweeps = side["anchors"], side["sweeps"]
+
+        # a swing joins the earliest unswept anchor within pip_range of the anchor's level
+        margin = 2 * pip_range + abs(level) * 1e-12
+        lo = bisect_left(anchors, (level - margin, -1))
+        hi = bisect_right(anchors, (level + margin, float("inf")))
+        best = None
+        swept = []
+        for k in range(lo, hi):
+            anchor_level, anchor = anchors[k]
+            sweep = sweeps.get(anchor, 0)
+            if sweep and index >= sweep:
+                # swept before this swing, so it cannot take this or any later swing
+                swept.append(k)
+                continue
+            if anchor_level - pip_range <= level <= anchor_level + pip_range and (best is None or anchor < best[1]):
+                best = (anchor_level, anchor)
+        for k in reversed(swept):
+            del anchors[k]
+
+        if best is not None:
+            anchor_level, anchor = best
+            pool = side["pools"].get(anchor)
+            action = "changed"
+            if pool is None:
+                pool = side["pools"][anchor] = {"levels": [anchor_level], "members": []}
+                action = "new"
+            pool["levels"].append(level)
+            pool["members"].append(index)
+            self._emit_pool(kind, anchor, action)
+            return
+
+        insort(anchors, (level, index))
+        if kind == 1:
+            self._watch({}, self._high_ge, index + 1, level + pip_range, lambda s: self._liquidity_swept(kind, index, s))
+        else:
+            self._watch({}, self._low_le, index + 1, level - pip_range, lambda s: self._liquidity_swept(kind, index, s))
+
+    def _liquidity_swept(self, kind: int, anchor: int, s: int):
+        side = self._liquidity[kind]
+        side["sweeps"][anchor] = s
+        if anchor in side["pools"]:
+            self._emit_pool(kind, anchor, "swept")
+
+    def _emit_pool(self, kind: int, anchor: int, action: str):
+        side = self._liquidity[kind]
+        pool = side["pools"][anchor]
+        self._emit(
+            "liquidity", action, anchor,
+            direction=kind,
+            level=sum(pool["levels"]) / len(pool["levels"]),
+            end=pool["members"][-1],
+            swept=side["sweeps"].get(anchor, 0),
+        )
+
+    # ---- snapshots, in the column layout of the smc methods ----
+
+    def _swing_frame(self, swings) -> pd.DataFrame:
+        swing_hl = np.full(len(self), np.nan)
+        for index, kind in swings:
+            swing_hl[index] = kind
+        high = np.asarray(self.high, dtype=np.float64)
+        low = np.asarray(self.low, dtype=np.float64)
+        level = np.where(~np.isnan(swing_hl), np.where(swing_hl == 1, high, low), np.nan)
+        return pd.concat(
+            [pd.Series(swing_hl, name="HighLow"), pd.Series(level, name="Level")],
+            axis=1,
+        )
+
+    def final_swings(self) -> pd.DataFrame:
+        """Final swings only: the swings BOS/CHoCH, order blocks and liquidity are built from."""
+        return self._swing_frame((index, kind) for index, kind, _ in self._swings)
+
+    def swing_highs_lows(self) -> pd.DataFrame:
+        """Same as smc.swing_highs_lows over the whole history, including the open run and the last candle."""
+        swings = [(index, kind) for index, kind, _ in self._swings]
+        if self._run_type is not None:
+            swings.append((self._run_index, self._run_type))
+            swings.append((len(self) - 1, -self._run_type))
+        return self._swing_frame(swings)
+
+    def fvg(self) -> pd.DataFrame:
+        n = len(self)
+        fvg = np.full(n, np.nan)
+        top = np.full(n, np.nan)
+        bottom = np.full(n, np.nan)
+        mitigated_index = np.full(n, np.nan)
+        for i, gap in self._fvgs.items():
+            fvg[i] = gap["FVG"]
+            top[i] = gap["Top"]
+            bottom[i] = gap["Bottom"]
+            mitigated_index[i] = gap["MitigatedIndex"]
+
+        return pd.concat(
+            [
+                pd.Series(fvg, name="FVG"),
+                pd.Series(top, name="Top"),
+                pd.Series(bottom, name="Bottom"),
+                pd.Series(mitigated_index, name="MitigatedIndex"),
+            ],
+            axis=1,
+        )
+
+    def bos_choch(self) -> pd.DataFrame:
+        n = len(self)
+        bos = np.zeros(n, dtype=np.int32)
+        choch = np.zeros(n, dtype=np.int32)
+        level = np.zeros(n, dtype=np.float32)
+        broken = np.zeros(n, dtype=np.int32)
+        # like smc.bos_choch, a replaced level keeps its broken index
+        for item in self._bos_broken_levels:
+            broken[item["index"]] = item["BrokenIndex"]
+        for item in self._bos_levels:
+            bos[item["index"]] = item["BOS"]
+            choch[item["index"]] = item["CHOCH"]
+            level[item["index"]] = item["Level"]
+
+        bos = np.where(bos != 0, bos, np.nan)
+        choch = np.where(choch != 0, choch, np.nan)
+        level = np.where(level != 0, level, np.nan)
+        broken = np.where(broken != 0, broken, np.nan)
+
+        return pd.concat(
+            [
+                pd.Series(bos, name="BOS"),
+                pd.Series(choch, name="CHOCH"),
+                pd.Series(level, name="Level"),
+                pd.Series(broken, name="BrokenIndex"),
+            ],
+            axis=1,
+        )
+
+    def ob(self) -> pd.DataFrame:
+        n = len(self)
+        volume = self.volume
+        ob = np.zeros(n, dtype=np.int32)
+        top_arr = np.zeros(n, dtype=np.float32)
+        bottom_arr = np.zeros(n, dtype=np.float32)
+        obVolume = np.zeros(n, dtype=np.float32)
+        percentage = np.zeros(n, dtype=np.float32)
+        mitigated_index = np.zeros(n, dtype=np.int32)
+
+        # bullish blocks first, then bearish blocks overwrite the candle they share, as in smc.ob
+        for direction in (1, -1):
+            for x, block in self._blocks[direction].items():
+                if block["reset"] is not None:
+                    ob[x] = 0
+                    top_arr[x] = bottom_arr[x] = obVolume[x] = percentage[x] = 0.0
+                    mitigated_index[x] = 0
+                    continue
+                c = block["created"]
+                recent = np.float32(volume[c] + volume[c - 1])
+                older = np.float32(volume[c - 2])
+                high_volume, low_volume = (recent, older) if direction == 1 else (older, recent)
+                max_vol = max(high_volume, low_volume)
+                ob[x] = direction
+                top_arr[x] = block["Top"]
+                bottom_arr[x] = block["Bottom"]
+                obVolume[x] = volume[c] + volume[c - 1] + volume[c - 2]
+                percentage[x] = (min(high_volume, low_volume) / max_vol * 100.0) if max_vol != 0 else 100.0
+                if direction == 1:
+                    mitigated_index[x] = block["mitigated"] - 1 if block["mitigated"] is not None else 0
+                elif not block["breaker_start"] and block["mitigated"] is not None:
+                    mitigated_index[x] = block["mitigated"]
+
+        ob = np.where(ob != 0, ob, np.nan)
+        top_arr = np.where(~np.isnan(ob), top_arr, np.nan)
+        bottom_arr = np.where(~np.isnan(ob), bottom_arr, np.nan)
+        obVolume = np.where(~np.isnan(ob), obVolume, np.nan)
+        mitigated_index = np.where(~np.isnan(ob), mitigated_index, np.nan)
+        percentage = np.where(~np.isnan(ob), percentage, np.nan)
+
+        return pd.concat(
+            [
+                pd.Series(ob, name="OB"),
+                pd.Series(top_arr, name="Top"),
+                pd.Series(bottom_arr, name="Bottom"),
+                pd.Series(obVolume, name="OBVolume"),
+                pd.Series(mitigated_index, name="MitigatedIndex"),
+                pd.Series(percentage, name="Percentage"),
+            ],
+            axis=1,
+        )
+
+    def liquidity(self) -> pd.DataFrame:
+        n = len(self)
+        liquidity = np.full(n, np.nan, dtype=np.float32)
+        liquidity_level = np.full(n, np.nan, dtype=np.float32)
+        liquidity_end = np.full(n, np.nan, dtype=np.float32)
+        liquidity_swept = np.full(n, np.nan, dtype=np.float32)
+        for kind in (1, -1):
+            side = self._liquidity[kind]
+            for anchor, pool in side["pools"].items():
+                liquidity[anchor] = kind
+                liquidity_level[anchor] = sum(pool["levels"]) / len(pool["levels"])
+                liquidity_end[anchor] = pool["members"][-1]
+                liquidity_swept[anchor] = side["sweeps"].get(anchor, 0)
+
+        return pd.concat(
+            [
+                pd.Series(liquidity, name="Liquidity"),
+                pd.Series(liquidity_level, name="Level"),
+                pd.Series(liquidity_end, name="End"),
+                pd.Series(liquidity_swept, name="Swept"),
+            ],
+            axis=1,
+        )
+
+
+def check_equivalence(stream: SMCStream) -> dict:
+    """
+    Recompute every indicator of the stream with the batch smc_engine kernels over the stream's
+    whole history and return {indicator: True if identical}. Swings and FVGs are compared with
+    smc.swing_highs_lows / smc.fvg directly; BOS/CHoCH, order blocks and liquidity with the
+    same kernels fed the stream's final swings and pip range.
+    """
+    _open = np.asarray(stream.open, dtype=np.float64)
+    _high = np.asarray(stream.high, dtype=np.float64)
+    _low = np.asarray(stream.low, dtype=np.float64)
+    _close = np.asarray(stream.close, dtype=np.float64)
+    _volume = np.asarray(stream.volume, dtype=np.float64)
+    final = stream.final_swings()
+    swing_hl, swing_level = final["HighLow"].values, final["Level"].values
+
+    expected = {
+        "swing_hl": (
+            smc_engine.swing_highs_lows(_high, _low, stream.swing_length),
+            stream.swing_highs_lows(),
+        ),
+        "fvg": (smc_engine.fair_value_gaps(_open, _high, _low, _close), stream.fvg()),
+        "bos_choch": (
+            smc_engine.bos_choch(_high, _low, _close, swing_hl, swing_level, stream.close_break),
+            stream.bos_choch(),
+        ),
+        "ob": (
+            smc_engine.order_blocks(_open, _high, _low, _close, _volume, swing_hl, stream.close_mitigation),
+            stream.ob(),
+        ),
+        "liquidity": (
+            smc_engine.liquidity(
+                _high, _low, swing_hl, swing_level,
+                pip_range=stream.pip_range if stream.pip_range is not None else 0.0,
+            ),
+            stream.liquidity(),
+        ),
+    }
+    return {name: batch.equals(incremental) for name, (batch, incremental) in expected.items()}
+
+
+class SMCStreamRegistry:
+    """
+    Keeps one SMCStream per (symbol, timeframe), least recently used streams are dropped first.
+    Each stream covers at most the last max_candles candles: once it holds twice that many it is
+    rebuilt from its last max_candles candles, so a long-running watch uses bounded memory at an
+    amortized O(1) rebuild cost per candle.
+
+    parameters:
+    max_entries: int - maximum number of streams kept
+    max_candles: int - history window kept per stream
+    options: keyword arguments passed to every SMCStream
+    """
+
+    def __init__(self, max_entries: int = 256, max_candles: int = 2000, **options):
+        self.max_entries = max_entries
+        self.max_candles = max(1, max_candles)
+        self.options = options
+        self._streams = OrderedDict()
+        self.rebuilds = 0
+
+    def __len__(self):
+        return len(self._streams)
+
+    def get(self, symbol: str, timeframe: str):
+        return self._streams.get((symbol.upper(), timeframe))
+
+    def discard(self, symbol: str, timeframe: str):
+        self._streams.pop((symbol.upper(), timeframe), None)
+
+    def sync(self, symbol: str, timeframe: str, ohlc: pd.DataFrame) -> list:
+        """
+        Feed the closed candles of `ohlc` that are newer than the stream's last candle and return
+        their events. The first call, or a call whose frame no longer contains the last candle
+        (a gap), seeds a fresh stream from the frame and returns no events.
+        """
+        key = (symbol.upper(), timeframe)
+        stream = self._streams.get(key)
+        if stream is None or not stream.time or stream.time[-1] not in ohlc.index:
+            self._streams[key] = SMCStream.from_frame(ohlc.tail(self.max_candles), **self.options)
+            self._streams.move_to_end(key)
+            while len(self._streams) > self.max_entries:
+                self._streams.popitem(last=False)
+            return []
+
+        self._streams.move_to_end(key)
+        columns = {c.lower(): c for c in ohlc.columns}
+        newer = ohlc[ohlc.index > stream.time[-1]]
+        events = []
+        for timestamp, o, h, l, c, v in zip(
+            newer.index,
+            *(newer[columns[name]].to_numpy(dtype=np.float64).tolist() for name in ("open", "high", "low", "close", "volume")),
+        ):
+            events.extend(
+                stream.update({"timestamp": timestamp, "open": o, "high": h, "low": l, "close": c, "volume": v})
+            )
+        if len(stream) >= 2 * self.max_candles:
+            self._streams[key] = stream.tail(self.max_candles)
+            self.rebuilds += 1
+        return events
+
+
+# Satu registry stream SMC untuk seluruh proses bot
+smc_streams = SMCStreamRegistry()
@@ -0,0 +1,66 @@
+"""
+Benchmark engine="fast" vs engine="legacy" of the SMC indicators.
+Not collected by pytest; run from the repo root:
+
+    python tests/bench_smc_engine.py [--sizes 500 5000 100000] [--swing-length 10]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd  # noqa: E402
+
+from smc_analysis import smc  # noqa: E402
+from test_smc_engine import random_ohlc  # noqa: E402
+
+
+def best_of(repeat: int, func) -> float:
+    """Fastest of `repeat` runs, in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def bench_ob(ohlc, swings, engine):
+    return smc.ob(ohlc, swings, engine=engine)
+
+
+def bench_bos_choch(ohlc, swings, engine):
+    return smc.bos_choch(ohlc, swings, engine=engine)
+
+
+BENCHMARKS = {
+    "ob": bench_ob,
+    "bos_choch": bench_bos_choch,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 5000, 100000])
+    parser.add_argument("--swing-length", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'indicator':<10} {'candles':>8} {'legacy ms':>10} {'fast ms':>9} {'speedup':>8}")
+    for size in args.sizes:
+        ohlc = random_ohlc(0, size)
+        swings = smc.swing_highs_lows(ohlc, swing_length=args.swing_length)
+        # legacy at 100k candles takes seconds, so run it once there
+        repeat = 5 if size <= 5000 else 1
+        for name, bench in BENCHMARKS.items():
+            fast_result = bench(ohlc, swings, "fast")
+            pd.testing.assert_frame_equal(fast_result, bench(ohlc, swings, "legacy"))
+            legacy = best_of(repeat, lambda: bench(ohlc, swings, "legacy"))
+            fast = best_of(repeat, lambda: bench(ohlc, swings, "fast"))
+            print(f"{name:<10} {size:>8} {legacy:>10.1f} {fast:>9.1f} {legacy / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modul bot berada di root repo (tanpa package), jadi tambahkan root ke sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
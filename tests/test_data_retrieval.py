@@ -0,0 +1,65 @@
+import asyncio
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_retrieval
+
+STEP_MS = 60_000
+
+
+@pytest.fixture
+def fake_binance(monkeypatch):
+    """Fake 1m Binance market with a controllable clock; returns the clock dict."""
+    clock = {"now": 1_700_000_000.0}
+    monkeypatch.setattr(data_retrieval.time, "time", lambda: clock["now"])
+    data_retrieval.ohlcv_cache.clear()
+    data_retrieval.kline_series_store.clear()
+    monkeypatch.setattr(data_retrieval.ohlcv_store, "enabled", False)
+
+    async def fetch_page(symbol, timeframe, limit=500, since=None):
+        now_ms = int(clock["now"] * 1000)
+        current_open = now_ms - now_ms % STEP_MS
+        if since is None:
+            since = current_open - (limit - 1) * STEP_MS
+        stamps = np.arange(since, min(since + limit * STEP_MS, current_open + 1), STEP_MS)
+        df = pd.DataFrame({name: 1.0 for name in ("open", "high", "low", "close", "volume")},
+                          index=pd.to_datetime(stamps, unit="ms"))
+        df.index.name = "timestamp"
+        return df
+
+    monkeypatch.setattr(data_retrieval, "_fetch_binance_page", fetch_page)
+    yield clock
+    data_retrieval.ohlcv_cache.clear()
+    data_retrieval.kline_series_store.clear()
+
+
+def current_open(clock) -> pd.Timestamp:
+    return pd.Timestamp(int(clock["now"] // 60 * 60), unit="s")
+
+
+def test_incremental_fetch_reaches_now_after_long_idle(fake_binance):
+    """A small request after a large stored window must still fetch every candle since the last one."""
+    async def scenario():
+        big = await data_retrieval.get_binance_klines("BTCUSDT", "1m", limit=5000, incremental=True)
+        assert len(big) == 5000 and big.index[-1] == current_open(fake_binance)
+
+        fake_binance["now"] += 800 * 60
+        small = await data_retrieval.get_binance_klines("BTCUSDT", "1m", limit=500, incremental=True)
+        assert len(small) == 500
+        assert small.index[-1] == current_open(fake_binance)
+        assert (small.index.to_series().diff().dropna() == pd.Timedelta(minutes=1)).all()
+
+    asyncio.run(scenario())
+
+
+def test_incremental_fetch_matches_full_fetch(fake_binance):
+    async def scenario():
+        await data_retrieval.get_binance_klines("ETHUSDT", "1m", limit=1500, incremental=True)
+        fake_binance["now"] += 37 * 60
+        incremental = await data_retrieval.get_binance_klines("ETHUSDT", "1m", limit=1500, incremental=True)
+        full = await data_retrieval._fetch_binance_klines("ETHUSDT", "1m", 1500)
+        pd.testing.assert_frame_equal(incremental, full)
+
+    asyncio.run(scenario())
@@ -0,0 +1,50 @@
+import asyncio
+
+import pandas as pd
+import pytest
+
+from market_watcher import MarketWatcher, WatchCapacityError
+from smc_stream import smc_streams
+from test_smc_engine import random_ohlc
+
+
+def test_poll_of_unwatched_market_is_not_rescheduled():
+    watcher = MarketWatcher()
+    fetched = []
+
+    async def fetch(key):
+        fetched.append(key)
+
+    watcher.fetch = fetch
+    watcher.subscribe("crypto", "BTCUSDT", "1h", channel_id=1, user_id=2)
+    key = watcher.market_key("crypto", "BTCUSDT", "1h")
+
+    # /unwatch lands after _run collected the due markets but before _poll runs
+    watcher.unsubscribe("crypto", "BTCUSDT", "1h", channel_id=1, user_id=2)
+    asyncio.run(watcher._poll(key))
+
+    assert key not in watcher._next_poll
+    assert fetched == []
+
+
+def test_market_cap_keeps_every_watched_stream():
+    watcher = MarketWatcher(max_markets=300)
+    assert smc_streams.max_entries >= 300
+
+    ohlc = random_ohlc(1, 200)
+    ohlc.index = pd.date_range("2024-01-01", periods=len(ohlc), freq="h")
+    for i in range(300):
+        watcher.subscribe("crypto", f"SYM{i}USDT", "1h", channel_id=1, user_id=i)
+        watcher.prime(watcher.market_key("crypto", f"SYM{i}USDT", "1h"), ohlc)
+    with pytest.raises(WatchCapacityError):
+        watcher.subscribe("crypto", "EXTRAUSDT", "1h", channel_id=1, user_id=999)
+    # an existing market still accepts new subscribers
+    assert watcher.subscribe("crypto", "SYM0USDT", "1h", channel_id=2, user_id=999)
+
+    # no stream of a watched market was evicted by the registry LRU
+    assert all(smc_streams.get(f"binance:SYM{i}USDT", "1h") is not None for i in range(300))
+
+    watcher.unsubscribe("crypto", "SYM0USDT", "1h", channel_id=2, user_id=999)
+    for i in range(300):
+        watcher.unsubscribe("crypto", f"SYM{i}USDT", "1h", channel_id=1, user_id=i)
+    assert len(smc_streams) == 0
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import smc_engine
+from smc_analysis import smc
+
+SEEDS = range(40)
+
+
+def random_ohlc(seed: int, n: int = None) -> pd.DataFrame:
+    """Random walk OHLCV; prices are rounded so equal highs/lows (ties) occur often."""
+    rng = np.random.default_rng(seed)
+    n = n or int(rng.integers(30, 600))
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    open_ = np.r_[close[0], close[:-1]] + rng.normal(0, 0.3, n)
+    high = np.maximum(open_, close) + rng.exponential(0.5, n)
+    low = np.minimum(open_, close) - rng.exponential(0.5, n)
+    frame = pd.DataFrame(
+        {"open": open_, "high": high, "low": low, "close": close, "volume": rng.integers(1, 1000, n).astype(float)},
+        index=pd.date_range("2024-01-01", periods=n, freq="h"),
+    )
+    return frame.round(int(rng.integers(0, 2)))
+
+
+def random_swings(ohlc: pd.DataFrame, seed: int) -> pd.DataFrame:
+    """Swings at random candles (not necessarily alternating), to reach paths the detector rarely produces."""
+    rng = np.random.default_rng(seed + 1000)
+    n = len(ohlc)
+    high_low = np.full(n, np.nan)
+    picks = rng.choice(n, size=max(1, n // 8), replace=False)
+    high_low[picks] = rng.choice([1, -1], size=len(picks))
+    level = np.where(high_low == 1, ohlc["high"].values, np.where(high_low == -1, ohlc["low"].values, np.nan))
+    return pd.DataFrame({"HighLow": high_low, "Level": level})
+
+
+def swing_cases():
+    for seed in SEEDS:
+        ohlc = random_ohlc(seed)
+        swing_length = int(np.random.default_rng(seed).integers(2, 12))
+        yield ohlc, smc.swing_highs_lows(ohlc, swing_length=swing_length)
+        yield ohlc, random_swings(ohlc, seed)
+
+
+@pytest.mark.parametrize("close_mitigation", [False, True])
+def test_ob_fast_matches_legacy(close_mitigation):
+    for ohlc, swings in swing_cases():
+        fast = smc.ob(ohlc, swings, close_mitigation=close_mitigation, engine="fast")
+        legacy = smc.ob(ohlc, swings, close_mitigation=close_mitigation, engine="legacy")
+        pd.testing.assert_frame_equal(fast, legacy)
+
+
+@pytest.mark.parametrize("range_percent", [0.005, 0.01, 0.05])
+def test_liquidity_fast_matches_legacy(range_percent):
+    for ohlc, swings in swing_cases():
+        fast = smc.liquidity(ohlc, swings, range_percent=range_percent, engine="fast")
+        legacy = smc.liquidity(ohlc, swings, range_percent=range_percent, engine="legacy")
+        pd.testing.assert_frame_equal(fast, legacy)
+
+
+def test_unknown_engine_is_rejected():
+    ohlc = random_ohlc(0, 50)
+    swings = smc.swing_highs_lows(ohlc, swing_length=3)
+    with pytest.raises(ValueError):
+        smc.ob(ohlc, swings, engine="turbo")
+
+
+@pytest.mark.parametrize("close_break", [True, False])
+def test_bos_choch_fast_matches_legacy(close_break):
+    for ohlc, swings in swing_cases():
+        fast = smc.bos_choch(ohlc, swings, close_break=close_break, engine="fast")
+        legacy = smc.bos_choch(ohlc, swings, close_break=close_break, engine="legacy")
+        pd.testing.assert_frame_equal(fast, legacy)
+
+
+def brute_first(values, start, threshold, op):
+    compare = {"lt": np.less, "le": np.less_equal, "gt": np.greater, "ge": np.greater_equal}[op]
+    for i in range(max(start, 0), len(values)):
+        if compare(values[i], threshold):
+            return i
+    return -1
+
+
+@pytest.mark.parametrize("op", ["lt", "le", "gt", "ge"])
+def test_range_extremes_first_matches_scan(op):
+    rng = np.random.default_rng(7)
+    for n in [0, 1, 2, 3, 7, 8, 9, 64, 100, 257]:
+        values = rng.integers(0, 20, n).astype(float)
+        if n:
+            values[rng.random(n) < 0.1] = np.nan
+        table = smc_engine.RangeExtremes(values, "min" if op in ("lt", "le") else "max")
+        starts = rng.integers(-2, n + 3, 200)
+        thresholds = rng.integers(-1, 22, 200).astype(float)
+        thresholds[::17] = np.nan
+        expected = [brute_first(values, s, t, op) for s, t in zip(starts, thresholds)]
+        np.testing.assert_array_equal(table.first(starts, thresholds, op), expected)
+
+
+def test_range_extremes_rejects_wrong_table():
+    with pytest.raises(ValueError):
+        smc_engine.RangeExtremes(np.arange(5.0), "min").first([0], [1.0], "gt")
@@ -0,0 +1,231 @@
+"""
+Regression tests for the vectorized smc indicators against the original per-candle loops,
+kept here as the reference with their logic unchanged (they only take their input as arguments).
+"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from smc_analysis import smc
+from test_smc_engine import random_ohlc, swing_cases
+
+
+def reference_previous_high_low(ohlc: pd.DataFrame, time_frame: str) -> pd.DataFrame:
+    ohlc.index = pd.to_datetime(ohlc.index)
+
+    previous_high = np.zeros(len(ohlc), dtype=np.float32)
+    previous_low = np.zeros(len(ohlc), dtype=np.float32)
+    broken_high = np.zeros(len(ohlc), dtype=np.int32)
+    broken_low = np.zeros(len(ohlc), dtype=np.int32)
+
+    resampled_ohlc = ohlc.resample(time_frame).agg(
+        {
+            "open": "first",
+            "high": "max",
+            "low": "min",
+            "close": "last",
+            "volume": "sum",
+        }
+    ).dropna()
+
+    currently_broken_high = False
+    currently_broken_low = False
+    last_broken_time = None
+    for i in range(len(ohlc)):
+        resampled_previous_index = np.where(
+            resampled_ohlc.index < ohlc.index[i]
+        )[0]
+        if len(resampled_previous_index) <= 1:
+            previous_high[i] = np.nan
+            previous_low[i] = np.nan
+            continue
+        resampled_previous_index = resampled_previous_index[-2]
+
+        if last_broken_time != resampled_previous_index:
+            currently_broken_high = False
+            currently_broken_low = False
+            last_broken_time = resampled_previous_index
+
+        previous_high[i] = resampled_ohlc["high"].iloc[resampled_previous_index]
+        previous_low[i] = resampled_ohlc["low"].iloc[resampled_previous_index]
+        currently_broken_high = ohlc["high"].iloc[i] > previous_high[i] or currently_broken_high
+        currently_broken_low = ohlc["low"].iloc[i] < previous_low[i] or currently_broken_low
+        broken_high[i] = 1 if currently_broken_high else 0
+        broken_low[i] = 1 if currently_broken_low else 0
+
+    previous_high = pd.Series(previous_high, name="PreviousHigh")
+    previous_low = pd.Series(previous_low, name="PreviousLow")
+    broken_high = pd.Series(broken_high, name="BrokenHigh")
+    broken_low = pd.Series(broken_low, name="BrokenLow")
+
+    return pd.concat([previous_high, previous_low, broken_high, broken_low], axis=1)
+
+
+def timed_ohlc(seed: int, n: int, freq: str, tz: str = None) -> pd.DataFrame:
+    ohlc = random_ohlc(seed, n)
+    ohlc.index = pd.date_range("2024-01-03 05:00", periods=n, freq=freq, tz=tz)
+    return ohlc
+
+
+@pytest.mark.parametrize("tz", [None, "UTC", "America/New_York"])
+@pytest.mark.parametrize("time_frame,freq", [("4h", "15min"), ("1D", "1h"), ("1W", "4h")])
+def test_previous_high_low_matches_reference(tz, time_frame, freq):
+    for seed in range(5):
+        ohlc = timed_ohlc(seed, 400, freq, tz)
+        expected = reference_previous_high_low(ohlc.copy(), time_frame)
+        pd.testing.assert_frame_equal(smc.previous_high_low(ohlc.copy(), time_frame), expected)
+
+
+def reference_sessions(ohlc: pd.DataFrame, session: str, start_time: str = "", end_time: str = "",
+                       time_zone: str = "UTC") -> pd.DataFrame:
+    default_sessions = {
+        "Sydney": {"start": "21:00", "end": "06:00"},
+        "Tokyo": {"start": "00:00", "end": "09:00"},
+        "London": {"start": "07:00", "end": "16:00"},
+        "New York": {"start": "13:00", "end": "22:00"},
+        "Asian kill zone": {"start": "00:00", "end": "04:00"},
+        "London open kill zone": {"start": "6:00", "end": "9:00"},
+        "New York kill zone": {"start": "11:00", "end": "14:00"},
+        "london close kill zone": {"start": "14:00", "end": "16:00"},
+        "Custom": {"start": start_time, "end": end_time},
+    }
+
+    ohlc.index = pd.to_datetime(ohlc.index)
+    if time_zone != "UTC":
+        time_zone = time_zone.replace("GMT", "Etc/GMT")
+        time_zone = time_zone.replace("UTC", "Etc/GMT")
+        ohlc.index = ohlc.index.tz_localize(time_zone).tz_convert("UTC")
+
+    start_time = datetime.strptime(default_sessions[session]["start"], "%H:%M").strftime("%H:%M")
+    start_time = datetime.strptime(start_time, "%H:%M")
+    end_time = datetime.strptime(default_sessions[session]["end"], "%H:%M").strftime("%H:%M")
+    end_time = datetime.strptime(end_time, "%H:%M")
+
+    active = np.zeros(len(ohlc), dtype=np.int32)
+    high = np.zeros(len(ohlc), dtype=np.float32)
+    low = np.zeros(len(ohlc), dtype=np.float32)
+
+    for i in range(len(ohlc)):
+        current_time = ohlc.index[i].strftime("%H:%M")
+        current_time = datetime.strptime(current_time, "%H:%M")
+        if (start_time < end_time and start_time <= current_time <= end_time) or (
+            start_time >= end_time
+            and (start_time <= current_time or current_time <= end_time)
+        ):
+            active[i] = 1
+            high[i] = max(ohlc["high"].iloc[i], high[i - 1] if i > 0 else 0)
+            low[i] = min(
+                ohlc["low"].iloc[i],
+                low[i - 1] if i > 0 and low[i - 1] != 0 else float("inf"),
+            )
+
+    active = pd.Series(active, name="Active")
+    high = pd.Series(high, name="High")
+    low = pd.Series(low, name="Low")
+
+    return pd.concat([active, high, low], axis=1)
+
+
+SESSIONS = [
+    "Sydney", "Tokyo", "London", "New York", "Asian kill zone",
+    "London open kill zone", "New York kill zone", "london close kill zone",
+]
+
+
+@pytest.mark.parametrize("session", SESSIONS)
+@pytest.mark.parametrize("tz,time_zone", [(None, "UTC"), ("UTC", "UTC"), (None, "GMT+2")])
+def test_sessions_match_reference(session, tz, time_zone):
+    for seed, freq in ((0, "15min"), (1, "1h"), (2, "7min")):
+        ohlc = timed_ohlc(seed, 500, freq, tz)
+        expected = reference_sessions(ohlc.copy(), session, time_zone=time_zone)
+        pd.testing.assert_frame_equal(smc.sessions(ohlc.copy(), session, time_zone=time_zone), expected)
+
+
+@pytest.mark.parametrize("start_time,end_time", [("08:30", "10:15"), ("22:45", "01:30"), ("12:00", "12:00")])
+def test_custom_session_matches_reference(start_time, end_time):
+    ohlc = timed_ohlc(3, 500, "15min")
+    expected = reference_sessions(ohlc.copy(), "Custom", start_time, end_time)
+    pd.testing.assert_frame_equal(smc.sessions(ohlc.copy(), "Custom", start_time, end_time), expected)
+
+
+def reference_retracements(ohlc: pd.DataFrame, swing_highs_lows: pd.DataFrame) -> pd.DataFrame:
+    swing_highs_lows = swing_highs_lows.copy()
+
+    direction = np.zeros(len(ohlc), dtype=np.int32)
+    current_retracement = np.zeros(len(ohlc), dtype=np.float64)
+    deepest_retracement = np.zeros(len(ohlc), dtype=np.float64)
+
+    top = 0
+    bottom = 0
+    for i in range(len(ohlc)):
+        if swing_highs_lows["HighLow"][i] == 1:
+            direction[i] = 1
+            top = swing_highs_lows["Level"][i]
+        elif swing_highs_lows["HighLow"][i] == -1:
+            direction[i] = -1
+            bottom = swing_highs_lows["Level"][i]
+        else:
+            direction[i] = direction[i - 1] if i > 0 else 0
+
+        if direction[i - 1] == 1:
+            current_retracement[i] = round(
+                100 - (((ohlc["low"].iloc[i] - bottom) / (top - bottom)) * 100), 1
+            )
+            deepest_retracement[i] = max(
+                (
+                    deepest_retracement[i - 1]
+                    if i > 0 and direction[i - 1] == 1
+                    else 0
+                ),
+                current_retracement[i],
+            )
+        if direction[i] == -1:
+            current_retracement[i] = round(
+                100 - ((ohlc["high"].iloc[i] - top) / (bottom - top)) * 100, 1
+            )
+            deepest_retracement[i] = max(
+                (
+                    deepest_retracement[i - 1]
+                    if i > 0 and direction[i - 1] == -1
+                    else 0
+                ),
+                current_retracement[i],
+            )
+
+    # shift the arrays by 1
+    current_retracement = np.roll(current_retracement, 1)
+    deepest_retracement = np.roll(deepest_retracement, 1)
+    direction = np.roll(direction, 1)
+
+    # remove the first 3 retracements as they get calculated incorrectly due to not enough data
+    remove_first_count = 0
+    for i in range(len(direction)):
+        if i + 1 == len(direction):
+            break
+        if direction[i] != direction[i + 1]:
+            remove_first_count += 1
+        direction[i] = 0
+        current_retracement[i] = 0
+        deepest_retracement[i] = 0
+        if remove_first_count == 3:
+            direction[i + 1] = 0
+            current_retracement[i + 1] = 0
+            deepest_retracement[i + 1] = 0
+            break
+
+    direction = pd.Series(direction, name="Direction")
+    current_retracement = pd.Series(current_retracement, name="CurrentRetracement%")
+    deepest_retracement = pd.Series(deepest_retracement, name="DeepestRetracement%")
+
+    return pd.concat([direction, current_retracement, deepest_retracement], axis=1)
+
+
+def test_retracements_match_reference_exactly():
+    for ohlc, swings in swing_cases():
+        with np.errstate(divide="ignore", invalid="ignore"):
+            expected = reference_retracements(ohlc, swings)
+            result = smc.retracements(ohlc, swings)
+        # bit-for-bit, not within a tolerance
+        pd.testing.assert_frame_equal(result, expected, check_exact=True)
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from smc_stream import SMCStream, SMCStreamRegistry, check_equivalence
+from test_smc_engine import random_ohlc
+
+
+@pytest.mark.parametrize("close_mitigation", [False, True])
+def test_stream_matches_batch_engines(close_mitigation):
+    for seed in range(10):
+        ohlc = random_ohlc(seed, 800)
+        head = int(np.random.default_rng(seed).integers(0, 400))
+        stream = SMCStream.from_frame(ohlc.iloc[:head], swing_length=5, close_mitigation=close_mitigation,
+                                      pip_range=(ohlc["high"].max() - ohlc["low"].min()) * 0.01)
+        for _, candle in ohlc.iloc[head:].iterrows():
+            stream.update(candle)
+        assert all(check_equivalence(stream).values())
+
+
+def test_registry_bounds_stream_history():
+    ohlc = random_ohlc(3, 6000)
+    registry = SMCStreamRegistry(max_candles=500, swing_length=5)
+    registry.sync("BTCUSDT", "1h", ohlc.iloc[:600])
+    assert len(registry.get("BTCUSDT", "1h")) == 500
+
+    pending = []
+    for end in range(601, len(ohlc) + 1, 7):
+        registry.sync("BTCUSDT", "1h", ohlc.iloc[:end])
+        stream = registry.get("BTCUSDT", "1h")
+        assert len(stream) < 1000
+        assert stream.time[-1] == ohlc.index[end - 1]
+        pending.append(stream.pending())
+
+    assert registry.rebuilds > 5
+    # queued watches stay proportional to the window instead of growing with the candle count
+    assert max(pending) < 2 * max(pending[: len(pending) // 4])
+    assert all(check_equivalence(registry.get("BTCUSDT", "1h")).values())